@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Kategori Birliktelik Analizi
+----------------------------
+Fişlerdeki kategori sepetlerinden sık öğe kümelerini ve birliktelik
+kurallarını çıkaran yardımcı fonksiyonlar.
+"""
+import os
+import logging
+import traceback
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from mlxtend.frequent_patterns import apriori, fpgrowth, association_rules
+
+from metrics import count, span
+
+logger = logging.getLogger(__name__)
+
+# Kullanılabilir sık öğe kümesi algoritmaları
+ASSOCIATION_ENGINES = ('apriori', 'fpgrowth', 'tidlist')
+DEFAULT_ASSOCIATION_ENGINE = os.environ.get('ASSOCIATION_ENGINE', 'apriori')
+
+# --- Seyrek İşlem Matrisi ---
+class TransactionMatrix:
+    """Fiş x kategori ikili matrisini seyrek (CSR) olarak tutar.
+
+    Sütunlar TransactionEncoder ile aynı şekilde alfabetik sıralıdır.
+    """
+
+    def __init__(self, transactions):
+        # NumPy skalerleri (örn. np.str_) mlxtend kural üretiminde sorun çıkardığı için Python tiplerine çevrilir
+        self.columns = [
+            item.item() if isinstance(item, np.generic) else item
+            for item in sorted({item for transaction in transactions for item in transaction})
+        ]
+        column_index = {item: index for index, item in enumerate(self.columns)}
+        
+        indptr = [0]
+        indices = []
+        for transaction in transactions:
+            indices.extend(sorted({column_index[item] for item in transaction}))
+            indptr.append(len(indices))
+        
+        self.n_transactions = len(transactions)
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=bool), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(self.n_transactions, len(self.columns))
+        )
+        self.item_counts = np.bincount(self.matrix.indices, minlength=len(self.columns))
+
+    def item_supports(self):
+        """Tekli kategorilerin destek değerlerini döndürür."""
+        return self.item_counts / float(self.n_transactions)
+
+    def to_sparse_frame(self):
+        """mlxtend algoritmaları için seyrek boolean DataFrame döndürür."""
+        return pd.DataFrame.sparse.from_spmatrix(self.matrix, columns=self.columns)
+
+    def item_bitsets(self):
+        """Her kategori için, içeren fişlerin bit kümesini (Python int) döndürür."""
+        csc = self.matrix.tocsc()
+        bitsets = []
+        for column in range(len(self.columns)):
+            present = np.zeros(self.n_transactions, dtype=bool)
+            present[csc.indices[csc.indptr[column]:csc.indptr[column + 1]]] = True
+            bitsets.append(int.from_bytes(np.packbits(present, bitorder='little').tobytes(), 'little'))
+        return bitsets
+
+# --- Yardımcı Fonksiyon: Destek Eşiği Seçimi ---
+def support_ladder(transaction_count):
+    """Sık öğe kümesi bulunamadığında sırayla denenen min_support değerleri."""
+    return [0.1, 2 / transaction_count, 1 / transaction_count]
+
+def resolve_min_support(transactions):
+    """Merdivende sık öğe kümesi üreten ilk min_support değerini döndürür.
+
+    Bir eşikte sık öğe kümesi olması için en az bir kategorinin tek başına
+    o eşiği geçmesi gerekir; bu yüzden uygun eşik yalnızca tekli destek
+    değerlerinden bulunur ve madencilik tekrar tekrar çalıştırılmaz.
+    Hiçbir eşik uymazsa merdivenin son değeri döner.
+    """
+    return choose_min_support(transactions.item_supports(), transactions.n_transactions)
+
+def choose_min_support(item_supports, transaction_count):
+    """Tekli destek değerlerine göre merdivenden min_support seçer."""
+    item_supports = np.asarray(item_supports, dtype=float)
+    ladder = support_ladder(transaction_count)
+    for min_support in ladder:
+        if (item_supports >= min_support).any():
+            return min_support
+    return ladder[-1]
+
+# --- Sık Öğe Kümesi Algoritmaları ---
+def _build_itemset(columns, item_indices):
+    """Sütun sıralarından apriori ile aynı yineleme sırasına sahip bir frozenset üretir."""
+    # apriori önce sıralı indekslerden frozenset kurup sonra isimlere eşler;
+    # kural yönleri frozenset yineleme sırasına bağlı olduğu için aynısı yapılır.
+    return frozenset([columns[index] for index in frozenset(sorted(item_indices))])
+
+def _canonical_order(frequent_itemsets, columns):
+    """Öğe kümelerini apriori çıktısındaki sıraya (uzunluk, sütun sırası) dizer."""
+    column_index = {item: index for index, item in enumerate(columns)}
+    index_tuples = [
+        tuple(sorted(column_index[item] for item in itemset))
+        for itemset in frequent_itemsets['itemsets']
+    ]
+    order = sorted(range(len(index_tuples)), key=lambda row: (len(index_tuples[row]), index_tuples[row]))
+    return pd.DataFrame({
+        'support': frequent_itemsets['support'].to_numpy()[order],
+        'itemsets': [_build_itemset(columns, index_tuples[row]) for row in order]
+    }, columns=['support', 'itemsets'])
+
+def _mine_apriori(transactions, min_support):
+    return apriori(transactions.to_sparse_frame(), min_support=min_support, use_colnames=True)
+
+def _mine_fpgrowth(transactions, min_support):
+    frequent_itemsets = fpgrowth(transactions.to_sparse_frame(), min_support=min_support, use_colnames=True)
+    return _canonical_order(frequent_itemsets, transactions.columns)
+
+def _mine_tidlist(transactions, min_support):
+    """Dikey tid-listesi (bit kümesi) kesişimleriyle Eclat madenciliği yapar."""
+    n_transactions = transactions.n_transactions
+    found = []
+
+    def extend(prefix, candidates):
+        for position, (item, bitset, count) in enumerate(candidates):
+            itemset = prefix + (item,)
+            found.append((itemset, count))
+            next_candidates = []
+            for other_item, other_bitset, _ in candidates[position + 1:]:
+                joined = bitset & other_bitset
+                joined_count = joined.bit_count()
+                if joined_count / n_transactions >= min_support:
+                    next_candidates.append((other_item, joined, joined_count))
+            if next_candidates:
+                extend(itemset, next_candidates)
+
+    frequent_items = []
+    for item, bitset in enumerate(transactions.item_bitsets()):
+        count = int(transactions.item_counts[item])
+        if count / n_transactions >= min_support:
+            frequent_items.append((item, bitset, count))
+    extend((), frequent_items)
+    
+    # apriori ile aynı sırada döndür
+    found.sort(key=lambda entry: (len(entry[0]), entry[0]))
+    return pd.DataFrame({
+        'support': [count / n_transactions for _, count in found],
+        'itemsets': [_build_itemset(transactions.columns, itemset) for itemset, _ in found]
+    }, columns=['support', 'itemsets'])
+
+_ENGINE_FUNCTIONS = {
+    'apriori': _mine_apriori,
+    'fpgrowth': _mine_fpgrowth,
+    'tidlist': _mine_tidlist
+}
+
+def mine_frequent_itemsets(transactions, min_support, engine=None):
+    """Seçilen algoritma ile sık öğe kümelerini bulur (mlxtend apriori çıktı biçiminde)."""
+    engine = engine or DEFAULT_ASSOCIATION_ENGINE
+    if engine not in _ENGINE_FUNCTIONS:
+        raise ValueError(f'Geçersiz birliktelik algoritması: {engine}')
+    return _ENGINE_FUNCTIONS[engine](transactions, min_support)
+
+# --- Yardımcı Fonksiyon: Kural Seçimi ---
+def select_positive_rules(positive_rules):
+    """Lift'e göre sıralanmış kurallardan çift yönlü tekrarları ayıklar.
+
+    Her (öncül, sonuç) çifti için yalnızca bir kural tutulur: ters kural
+    daha yüksek güvene sahipse o, değilse kuralın kendisi seçilir. Ters
+    kurallar (öncül, sonuç) anahtarlı bir sözlükten bulunduğu için işlem
+    kural sayısında doğrusaldır.
+    """
+    antecedents = positive_rules['antecedents'].tolist()
+    consequents = positive_rules['consequents'].tolist()
+    supports = positive_rules['support'].tolist()
+    confidences = positive_rules['confidence'].tolist()
+    lifts = positive_rules['lift'].tolist()
+    
+    # Her (öncül, sonuç) için sıralamadaki ilk kuralın konumu
+    first_position = {}
+    for position, rule_key in enumerate(zip(antecedents, consequents)):
+        first_position.setdefault(rule_key, position)
+    
+    positive_rules_list = []
+    processed_pairs = set()
+    
+    for position, (rule_antecedents, rule_consequents) in enumerate(zip(antecedents, consequents)):
+        pair_key = frozenset([rule_antecedents, rule_consequents])
+        
+        # Zaten işlenmiş bir çift ise atla
+        if pair_key in processed_pairs:
+            continue
+        processed_pairs.add(pair_key)
+        
+        # Ters kural daha yüksek güvene sahipse onu seç
+        reverse_position = first_position.get((rule_consequents, rule_antecedents))
+        if reverse_position is not None and confidences[reverse_position] > confidences[position]:
+            position = reverse_position
+        
+        positive_rules_list.append({
+            'if_categories': list(antecedents[position]),
+            'then_categories': list(consequents[position]),
+            'support': float(supports[position]),
+            'confidence': float(confidences[position]),
+            'lift': float(lifts[position])
+        })
+    
+    return positive_rules_list
+
+# --- Yardımcı Fonksiyon: Kural Özeti ---
+def summarize_rules(rules, min_support, total_transactions):
+    """Kural tablosundan pozitif kuralları seçip analiz sonucunu hazırlar.
+
+    `rules` en az antecedents, consequents, support, confidence ve lift
+    sütunlarını içermelidir.
+    """
+    if rules.empty:
+        return {
+            'message': 'Belirlenen destek eşiğinde ilişki kuralı bulunamadı.',
+            'min_support_used': min_support,
+            'total_transactions': total_transactions
+        }
+    
+    # Lift > 1 olan pozitif kuralları filtrele
+    positive_rules = rules[rules['lift'] > 1].copy()
+    
+    if positive_rules.empty:
+        return {
+            'message': 'Pozitif ilişki (lift > 1) gösteren kural bulunamadı.',
+            'min_support_used': min_support,
+            'total_transactions': total_transactions
+        }
+    
+    positive_rules.sort_values(by='lift', ascending=False, inplace=True)
+    
+    # Kuralları temizle (çift yönlü tekrarları kaldır)
+    with span('association.select_rules'):
+        positive_rules_list = select_positive_rules(positive_rules)
+    count('rules', len(positive_rules_list))
+    
+    # Sonuçları sırala ve hazırla
+    positive_rules_list = sorted(positive_rules_list, key=lambda x: x['lift'], reverse=True)
+    top_rules_display = positive_rules_list[:min(10, len(positive_rules_list))]
+    
+    return {
+        'rules_for_display': top_rules_display,
+        'all_positive_rules': positive_rules_list,
+        'total_positive_rules_found': len(positive_rules_list),
+        'min_support_used': min_support,
+        'total_transactions': total_transactions
+    }
+
+# --- Yardımcı Fonksiyon: Birliktelik Analizi ---
+def perform_association_analysis(all_categories_by_receipt, engine=None):
+    """Kategori birliktelik analizi yapar.
+
+    `engine` sık öğe kümesi algoritmasını seçer (apriori, fpgrowth veya
+    tidlist); verilmezse ASSOCIATION_ENGINE ayarı kullanılır.
+    """
+    if len(all_categories_by_receipt) <= 1:
+        return {'message': 'Birliktelik analizi için yeterli sipariş sayısı yok. En az 2 sipariş gerekiyor.'}
+
+    try:
+        # Fişleri seyrek kategori matrisine dönüştür
+        with span('association.transactions'):
+            transactions = TransactionMatrix(all_categories_by_receipt)
+        count('baskets', len(all_categories_by_receipt))
+        
+        # Eşik merdiveninden gereken destek değerini seç ve bir kez madencilik yap
+        with span('association.mine'):
+            min_support = resolve_min_support(transactions)
+            frequent_itemsets = mine_frequent_itemsets(transactions, min_support, engine)
+        
+        # Yeterli sıklıkta kategori bulunamadıysa
+        if frequent_itemsets.empty:
+            return {
+                'message': 'Yeterli sıklıkta birlikte bulunan kategori bulunamadı.',
+                'min_support_used': min_support,
+                'total_transactions': len(all_categories_by_receipt)
+            }
+        
+        # Birliktelik kurallarını oluştur
+        with span('association.rules'):
+            rules = association_rules(frequent_itemsets, metric="lift", min_threshold=0.0)
+        return summarize_rules(rules, min_support, len(all_categories_by_receipt))
+    
+    except Exception as e:
+        logger.error(f"Birliktelik analizi hatası: {e}")
+        traceback.print_exc()
+        return {'error': f'Birliktelik analizi sırasında bir hata oluştu: {str(e)}'}
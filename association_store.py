@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Artımlı Birliktelik İstatistikleri Deposu
+-----------------------------------------
+Fiş kategori sepetlerinden tekli, ikili ve üçlü kategori sayılarını gün
+bazında diske kaydeder. Yeni günler toplamlara eklenir, pencere dışına
+çıkan günler toplamlardan çıkarılır; destek, güven ve lift değerleri
+geçmiş yeniden taranmadan doğrudan bu sayılardan hesaplanır.
+
+Depo birden çok süreç (gunicorn işçileri, iş kuyruğu süreçleri) tarafından
+paylaşılabilir: güncellemeler (fcntl varsa) depo dizinindeki kilit
+dosyasıyla sıraya sokulur ve toplamlar her güncellemede diskten yeniden
+okunur. Toplamlar dosyasıyla birlikte kalıcı bir revizyon numarası yazılır;
+bellekteki toplamlar ve analiz sonucu, dosya değiştiyse okumadan önce
+yenilenir.
+"""
+import os
+import datetime
+import threading
+import contextlib
+from collections import Counter, defaultdict
+from itertools import combinations
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from association_analysis import choose_min_support, summarize_rules
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Varsayılan kayan pencere uzunluğu (gün)
+DEFAULT_WINDOW_DAYS = 90
+# Sayılan en büyük öğe kümesi boyutu (tekli, ikili, üçlü)
+DEFAULT_MAX_ITEMSET_SIZE = 3
+
+def count_itemsets(baskets, max_itemset_size=DEFAULT_MAX_ITEMSET_SIZE):
+    """Sepetlerdeki 1..max_itemset_size boyutlu kategori kümelerini sayar.
+
+    Anahtarlar alfabetik sıralı kategori demetleridir (tuple). Aynı
+    uzunluktaki sepetler tek bir NumPy dizisinde toplanır ve kombinasyonlar
+    sepet başına Python döngüsü yerine dizi indekslemesiyle sayılır.
+    """
+    vocabulary = {}
+    baskets_by_length = defaultdict(list)
+    transaction_count = 0
+    for basket in baskets:
+        item_ids = {vocabulary.setdefault(item, len(vocabulary)) for item in basket}
+        if not item_ids:
+            continue
+        transaction_count += 1
+        baskets_by_length[len(item_ids)].append(list(item_ids))
+
+    # Kimlikleri alfabetik sıraya göre yeniden numarala
+    names = sorted(vocabulary)
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[[vocabulary[name] for name in names]] = np.arange(len(names))
+    base = max(len(names), 1)
+
+    counts = Counter()
+    for length, rows in baskets_by_length.items():
+        item_matrix = np.sort(rank[np.array(rows, dtype=np.int64)], axis=1)
+        for size in range(1, min(max_itemset_size, length) + 1):
+            positions = np.array(list(combinations(range(length), size)), dtype=np.int64)
+            subsets = item_matrix[:, positions].reshape(-1, size)
+            # Her alt kümeyi tek bir tam sayı anahtar olarak kodla
+            keys = np.zeros(len(subsets), dtype=np.int64)
+            for column in range(size):
+                keys = keys * base + subsets[:, column]
+            unique_keys, key_counts = np.unique(keys, return_counts=True)
+            for key, count in zip(unique_keys.tolist(), key_counts.tolist()):
+                itemset = []
+                for _ in range(size):
+                    key, item = divmod(key, base)
+                    itemset.append(names[item])
+                counts[tuple(reversed(itemset))] += count
+    return transaction_count, counts
+
+def _parse_day(day):
+    """Tarih bilgisini datetime.date nesnesine dönüştürür."""
+    if day is None:
+        return datetime.date.today()
+    if isinstance(day, datetime.date):
+        return day
+    return datetime.date.fromisoformat(str(day))
+
+def _pack_counts(counts):
+    """Sayaçları diske hızlı yazılabilen NumPy dizilerine dönüştürür."""
+    categories = sorted({item for itemset in counts for item in itemset})
+    category_ids = {category: index for index, category in enumerate(categories)}
+    itemsets_by_size = defaultdict(list)
+    for itemset, count in counts.items():
+        itemsets_by_size[len(itemset)].append([category_ids[item] for item in itemset] + [count])
+    return {
+        'categories': categories,
+        'itemsets': {
+            size: np.array(rows, dtype=np.int64).reshape(-1, size + 1)
+            for size, rows in itemsets_by_size.items()
+        }
+    }
+
+def _unpack_counts(packed):
+    """_pack_counts ile saklanan dizilerden sayaçları geri kurar."""
+    categories = packed['categories']
+    counts = Counter()
+    for rows in packed['itemsets'].values():
+        for row in rows.tolist():
+            counts[tuple(categories[index] for index in row[:-1])] = row[-1]
+    return counts
+
+def _atomic_dump(data, path):
+    """Sayaçları paketleyip dosyayı önce geçici ada yazar, ardından yerine taşır."""
+    temp_path = f"{path}.tmp"
+    joblib.dump(dict(data, counts=_pack_counts(data['counts'])), temp_path)
+    os.replace(temp_path, path)
+
+def _load(path):
+    """_atomic_dump ile yazılmış bir dosyayı okur."""
+    data = joblib.load(path)
+    data['counts'] = _unpack_counts(data['counts'])
+    return data
+
+def _file_signature(path):
+    """Dosya başka bir süreç tarafından değiştirildi mi diye (inode, mtime, boyut) döndürür."""
+    try:
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+class AssociationStatisticsStore:
+    """Gün bazlı kategori öğe kümesi sayılarını tutan kalıcı ve artımlı depo."""
+
+    def __init__(self, store_dir, window_days=DEFAULT_WINDOW_DAYS, max_itemset_size=DEFAULT_MAX_ITEMSET_SIZE):
+        self.store_dir = store_dir
+        self.window_days = window_days
+        self.max_itemset_size = max_itemset_size
+        self._days_dir = os.path.join(store_dir, 'days')
+        self._totals_path = os.path.join(store_dir, 'totals.joblib')
+        self._totals = None
+        self._totals_signature = None
+        # (revizyon, analiz sonucu)
+        self._analysis = None
+        self._lock = threading.Lock()
+
+    # --- Dosya İşlemleri ---
+    def _day_path(self, day):
+        return os.path.join(self._days_dir, f"{day.isoformat()}.joblib")
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Güncellemeleri süreç içinde kilitle, süreçler arasında kilit dosyasıyla sıraya sokar."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.store_dir, exist_ok=True)
+            with open(os.path.join(self.store_dir, '.lock'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_totals(self):
+        """Toplamları döndürür; dosya bellektekinden farklıysa (başka süreç yazdıysa) yeniden okur."""
+        signature = _file_signature(self._totals_path)
+        if self._totals is None or signature != self._totals_signature:
+            if signature is not None:
+                self._totals = _load(self._totals_path)
+            else:
+                self._totals = {'transactions': 0, 'counts': Counter(), 'days': {}, 'revision': 0}
+            self._totals_signature = signature
+            self._analysis = None
+        return self._totals
+
+    def _save_totals(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        # Revizyon dosyayla birlikte yazılır; tüm süreçler aynı değeri görür
+        self._totals['revision'] = self._totals.get('revision', 0) + 1
+        _atomic_dump(self._totals, self._totals_path)
+        self._totals_signature = _file_signature(self._totals_path)
+        # Toplamlar değişti, önbellekteki analiz sonucu geçersiz
+        self._analysis = None
+
+    @property
+    def revision(self):
+        """Diskteki toplamların revizyonu; her güncellemede artar."""
+        with self._lock:
+            return self._load_totals().get('revision', 0)
+
+    # --- Güncelleme ---
+    def add_receipts(self, baskets, day=None):
+        """Bir güne ait fiş sepetlerini depoya ekler ve pencere dışındaki günleri siler."""
+        day = _parse_day(day)
+        transaction_count, counts = count_itemsets(baskets, self.max_itemset_size)
+
+        with self._exclusive():
+            # Başka süreçlerin eklediği sayılar kaybolmasın diye kilit altında diskten oku
+            totals = self._load_totals()
+
+            # Günün mevcut sayılarıyla birleştir
+            os.makedirs(self._days_dir, exist_ok=True)
+            day_path = self._day_path(day)
+            if os.path.exists(day_path):
+                day_data = _load(day_path)
+            else:
+                day_data = {'transactions': 0, 'counts': Counter()}
+            day_data['transactions'] += transaction_count
+            day_data['counts'].update(counts)
+            _atomic_dump(day_data, day_path)
+
+            # Toplamları güncelle
+            totals['transactions'] += transaction_count
+            totals['counts'].update(counts)
+            totals['days'][day.isoformat()] = day_data['transactions']
+
+            expired_days = self._expire_locked(datetime.date.today())
+            self._save_totals()
+
+        return {
+            'date': day.isoformat(),
+            'added_transactions': transaction_count,
+            'total_transactions': totals['transactions'],
+            'expired_days': expired_days,
+            'days': sorted(totals['days'])
+        }
+
+    def expire(self, today=None):
+        """Pencere dışına çıkan günlerin sayılarını toplamlardan çıkarır."""
+        with self._exclusive():
+            expired_days = self._expire_locked(_parse_day(today))
+            if expired_days:
+                self._save_totals()
+            return expired_days
+
+    def _expire_locked(self, today):
+        totals = self._load_totals()
+        cutoff = today - datetime.timedelta(days=self.window_days - 1)
+        expired_days = sorted(day for day in totals['days'] if datetime.date.fromisoformat(day) < cutoff)
+
+        for day in expired_days:
+            day_path = self._day_path(datetime.date.fromisoformat(day))
+            if os.path.exists(day_path):
+                day_data = _load(day_path)
+                totals['transactions'] -= day_data['transactions']
+                totals['counts'].subtract(day_data['counts'])
+                os.remove(day_path)
+            del totals['days'][day]
+
+        if expired_days:
+            # Sıfıra inen sayıları temizle
+            totals['counts'] = Counter({itemset: count for itemset, count in totals['counts'].items() if count > 0})
+        return expired_days
+
+    # --- Analiz ---
+    def analyze(self):
+        """Penceredeki sayılardan perform_association_analysis ile aynı biçimde sonuç üretir."""
+        return self.analyze_with_revision()[1]
+
+    def analyze_with_revision(self):
+        """(revizyon, analiz sonucu) döndürür; revizyon sonucun hesaplandığı toplamlara aittir."""
+        with self._lock:
+            totals = self._load_totals()
+            if self._analysis is None:
+                self._analysis = (totals.get('revision', 0), self._analyze_locked())
+            return self._analysis
+
+    def _analyze_locked(self):
+        totals = self._load_totals()
+        counts = totals['counts']
+        transaction_count = totals['transactions']
+
+        if transaction_count <= 1:
+            return {'message': 'Birliktelik analizi için yeterli sipariş sayısı yok. En az 2 sipariş gerekiyor.'}
+
+        # Tekli destek değerlerine göre eşik merdiveninden min_support seç
+        item_supports = [count / transaction_count for itemset, count in counts.items() if len(itemset) == 1]
+        min_support = choose_min_support(item_supports, transaction_count)
+        frequent_itemsets = {
+            itemset: count for itemset, count in counts.items()
+            if count / transaction_count >= min_support
+        }
+
+        if not frequent_itemsets:
+            return {
+                'message': 'Yeterli sıklıkta birlikte bulunan kategori bulunamadı.',
+                'min_support_used': min_support,
+                'total_transactions': transaction_count
+            }
+
+        # Her sık öğe kümesinin alt kümelerinden kuralları üret
+        columns = {'antecedents': [], 'consequents': [], 'support': [], 'confidence': [], 'lift': []}
+        for itemset, count in frequent_itemsets.items():
+            if len(itemset) < 2:
+                continue
+            support = count / transaction_count
+            for size in range(1, len(itemset)):
+                for antecedents in combinations(itemset, size):
+                    consequents = tuple(item for item in itemset if item not in antecedents)
+                    confidence = count / counts[antecedents]
+                    columns['antecedents'].append(frozenset(antecedents))
+                    columns['consequents'].append(frozenset(consequents))
+                    columns['support'].append(support)
+                    columns['confidence'].append(confidence)
+                    columns['lift'].append(confidence / (counts[consequents] / transaction_count))
+
+        rules = pd.DataFrame(columns)
+        return summarize_rules(rules, min_support, transaction_count)
+
+    def summary(self):
+        """Depodaki günleri ve toplam fiş sayısını döndürür."""
+        with self._lock:
+            totals = self._load_totals()
+            return {
+                'window_days': self.window_days,
+                'total_transactions': totals['transactions'],
+                'days': dict(sorted(totals['days'].items()))
+            }
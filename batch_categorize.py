@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Toplu Kategorilendirme (Komut Satırı)
+-------------------------------------
+Sipariş dosyalarını (order_data_*.csv biçimi: her satır bir fişin ürünleri)
+veya ürün kataloğunu (item_name sütunlu CSV ya da satır başına bir ürün)
+diskten akış halinde okur, web servisinin kullandığı model artefaktlarıyla
+tahmin eder ve sonuçları parça parça sütunlu dosyalara yazar:
+
+    <çıktı>/predictions.parquet   source, receipt_id, position, product, category
+    <çıktı>/baskets.parquet       source, receipt_id, categories (liste; sadece sipariş dosyaları)
+
+pyarrow kuruluysa Parquet yazılır (her parça bir satır grubu), değilse
+gzip sıkıştırılmış CSV (.csv.gz; sepet kategorileri ';' ile birleşik).
+Bellek kullanımı parça boyutuyla sınırlıdır; tekrar eden ürün isimleri
+parçalar arasında da bir kez tahmin edilir. Bitişte verim ve en yüksek
+bellek kullanımı (RSS) raporlanır.
+
+Kullanım:
+    python batch_categorize.py order_data_1.csv order_data_2.csv -o kategoriler/
+    python batch_categorize.py market_data.csv --format csv --workers 4
+"""
+import os
+import csv
+import sys
+import gzip
+import time
+import argparse
+import resource
+
+from parallel_prediction import ParallelPredictor, ShardPredictor, read_product_names
+from receipt_reader import iter_csv_receipts, iter_receipt_products
+from text_normalizer import normalize_product_names
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# --- Ayarlar ---
+# Bir parçada tahmin edilip yazılacak en fazla ürün (satır) sayısı
+DEFAULT_CHUNK_SIZE = 100000
+# Parçalar arasında saklanan en fazla (normalize isim -> kategori) kaydı
+PREDICTION_CACHE_LIMIT = 1000000
+# Bu başlıkla başlayan CSV dosyaları katalog olarak okunur
+CATALOGUE_HEADERS = ('item_name', 'product', 'product_name')
+
+PREDICTION_COLUMNS = ('source', 'receipt_id', 'position', 'product', 'category')
+BASKET_COLUMNS = ('source', 'receipt_id', 'categories')
+
+# --- Çıktı Yazıcıları ---
+class ParquetChunkWriter:
+    """Her parçayı Parquet dosyasına ayrı bir satır grubu olarak ekler."""
+
+    extension = '.parquet'
+
+    def __init__(self, path, columns):
+        list_columns = {'categories'}
+        integer_columns = {'position'}
+        self.schema = pa.schema([
+            (name, pa.list_(pa.string()) if name in list_columns
+             else pa.int64() if name in integer_columns else pa.string())
+            for name in columns
+        ])
+        self._writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, data):
+        self._writer.write_table(pa.Table.from_pydict(data, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+class CsvChunkWriter:
+    """Parçaları gzip sıkıştırılmış CSV dosyasına ekler; liste sütunları ';' ile birleştirilir."""
+
+    extension = '.csv.gz'
+
+    def __init__(self, path, columns):
+        self.columns = columns
+        self._file = gzip.open(path, 'wt', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, data):
+        values = [
+            [';'.join(value) for value in data[name]] if name == 'categories' else data[name]
+            for name in self.columns
+        ]
+        self._writer.writerows(zip(*values))
+
+    def close(self):
+        self._file.close()
+
+OUTPUT_WRITERS = {'parquet': ParquetChunkWriter, 'csv': CsvChunkWriter}
+
+# --- Girdi ---
+def detect_input_format(path):
+    """Dosyanın ilk satırına bakarak 'catalogue' veya 'orders' döndürür."""
+    with open(path, encoding='utf-8-sig', errors='replace') as file:
+        first_line = file.readline().strip().lower()
+    return 'catalogue' if first_line.split(',')[0] in CATALOGUE_HEADERS else 'orders'
+
+def iter_input_receipts(path, input_format):
+    """(fiş_id, ürünler) çiftleri üretir; katalogda her ürün fiş kimliği olmayan tek satırdır."""
+    if input_format == 'catalogue':
+        for product in read_product_names(path):
+            yield None, [product]
+        return
+    with open(path, 'rb') as file:
+        yield from iter_receipt_products(iter_csv_receipts(file))
+
+def iter_chunks(receipts, chunk_size):
+    """Fişleri toplam ürün sayısı chunk_size'a ulaşana kadar gruplar."""
+    chunk = []
+    product_count = 0
+    for receipt_id, products in receipts:
+        chunk.append((receipt_id, products))
+        product_count += len(products)
+        if product_count >= chunk_size:
+            yield chunk
+            chunk = []
+            product_count = 0
+    if chunk:
+        yield chunk
+
+# --- Kategorilendirme ---
+class BatchCategorizer:
+    """Parçaları tahmin eder; daha önce görülen normalize isimleri tekrar modele göndermez."""
+
+    def __init__(self, parallel):
+        self.parallel = parallel
+        self.cache = {}
+        self.predicted_names = 0
+
+    def categorize(self, products):
+        normalized = normalize_product_names(products)
+        missing = [name for name in dict.fromkeys(normalized) if name not in self.cache]
+        if missing:
+            if len(self.cache) + len(missing) > PREDICTION_CACHE_LIMIT:
+                self.cache.clear()
+                missing = list(dict.fromkeys(normalized))
+            self.cache.update(zip(missing, self.parallel.predict(missing)))
+            self.predicted_names += len(missing)
+        return [self.cache[name] for name in normalized]
+
+def peak_rss_bytes():
+    """Bu sürecin ve sonlanmış alt süreçlerin en yüksek RSS değerlerini bayt olarak döndürür."""
+    # ru_maxrss Linux'ta KB, macOS'ta bayt cinsindendir
+    scale = 1 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return own, children
+
+def categorize_files(input_paths, output_dir, model_name='naive_bayes', output_format=None,
+                     input_format='auto', chunk_size=DEFAULT_CHUNK_SIZE, n_workers=1):
+    """Dosyaları kategorize edip sütunlu çıktıları yazar; özet istatistikleri döndürür."""
+    if output_format is None:
+        output_format = 'parquet' if pa is not None else 'csv'
+    if output_format == 'parquet' and pa is None:
+        raise RuntimeError("Parquet çıktısı için 'pyarrow' kurulmalıdır (pip install pyarrow) veya --format csv kullanın")
+    writer_class = OUTPUT_WRITERS[output_format]
+    os.makedirs(output_dir, exist_ok=True)
+
+    start_time = time.perf_counter()
+    predictor = ShardPredictor.load(model_name)
+    paths = {
+        'predictions': os.path.join(output_dir, f"predictions{writer_class.extension}"),
+        'baskets': os.path.join(output_dir, f"baskets{writer_class.extension}")
+    }
+    prediction_writer = writer_class(paths['predictions'], PREDICTION_COLUMNS)
+    basket_writer = None
+    stats = {'rows': 0, 'receipts': 0, 'chunks': 0}
+
+    try:
+        with ParallelPredictor(predictor, n_workers) as parallel:
+            categorizer = BatchCategorizer(parallel)
+            for path in input_paths:
+                file_format = detect_input_format(path) if input_format == 'auto' else input_format
+                source = os.path.basename(path)
+                catalogue_position = 0
+                for chunk in iter_chunks(iter_input_receipts(path, file_format), chunk_size):
+                    products = [product for _, receipt_products in chunk for product in receipt_products]
+                    categories = categorizer.categorize(products)
+
+                    predictions = {name: [] for name in PREDICTION_COLUMNS}
+                    baskets = {name: [] for name in BASKET_COLUMNS}
+                    offset = 0
+                    for receipt_id, receipt_products in chunk:
+                        receipt_categories = categories[offset:offset + len(receipt_products)]
+                        offset += len(receipt_products)
+                        predictions['source'].extend([source] * len(receipt_products))
+                        predictions['receipt_id'].extend([receipt_id] * len(receipt_products))
+                        if receipt_id is None:
+                            # Katalog satırı: sıra, dosyadaki ürün numarasıdır
+                            predictions['position'].append(catalogue_position)
+                            catalogue_position += 1
+                            continue
+                        predictions['position'].extend(range(len(receipt_products)))
+                        baskets['source'].append(source)
+                        baskets['receipt_id'].append(receipt_id)
+                        baskets['categories'].append(list(dict.fromkeys(receipt_categories)))
+                    predictions['product'] = products
+                    predictions['category'] = categories
+
+                    prediction_writer.write(predictions)
+                    if baskets['receipt_id']:
+                        if basket_writer is None:
+                            basket_writer = writer_class(paths['baskets'], BASKET_COLUMNS)
+                        basket_writer.write(baskets)
+                        stats['receipts'] += len(baskets['receipt_id'])
+                    stats['rows'] += len(products)
+                    stats['chunks'] += 1
+            stats['predicted_names'] = categorizer.predicted_names
+    finally:
+        prediction_writer.close()
+        if basket_writer is not None:
+            basket_writer.close()
+
+    stats['seconds'] = time.perf_counter() - start_time
+    stats['rows_per_second'] = stats['rows'] / max(stats['seconds'], 1e-9)
+    stats['peak_rss_bytes'], stats['peak_child_rss_bytes'] = peak_rss_bytes()
+    stats['outputs'] = [paths['predictions']] + ([paths['baskets']] if basket_writer is not None else [])
+    stats['format'] = output_format
+    return stats
+
+def main():
+    model_names = ['naive_bayes', 'decision_tree', 'logistic_regression']
+    parser = argparse.ArgumentParser(description='Sipariş veya katalog dosyalarını kategorize edip Parquet/CSV yazar.')
+    parser.add_argument('inputs', nargs='+', help='Sipariş CSV dosyaları veya ürün katalogları')
+    parser.add_argument('-o', '--output-dir', default='categorized', help='Çıktı dizini')
+    parser.add_argument('--model', choices=model_names, default='naive_bayes')
+    parser.add_argument('--format', choices=list(OUTPUT_WRITERS), default=None,
+                        help='Çıktı biçimi (varsayılan: pyarrow varsa parquet, yoksa csv)')
+    parser.add_argument('--input-format', choices=['auto', 'orders', 'catalogue'], default='auto')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Parça başına ürün sayısı')
+    parser.add_argument('--workers', type=int, default=1, help='Tahmin için işçi süreç sayısı')
+    args = parser.parse_args()
+
+    try:
+        stats = categorize_files(args.inputs, args.output_dir, args.model, args.format,
+                                 args.input_format, args.chunk_size, args.workers)
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    print(f"Satır (ürün):        {stats['rows']:,}")
+    print(f"Fiş:                 {stats['receipts']:,}")
+    print(f"Modele giden isim:   {stats['predicted_names']:,}")
+    print(f"Parça:               {stats['chunks']:,}")
+    print(f"Süre:                {stats['seconds']:.2f} s ({stats['rows_per_second']:,.0f} satır/s)")
+    print(f"En yüksek RSS:       {stats['peak_rss_bytes'] / 2**20:.1f} MB "
+          f"(işçiler: {stats['peak_child_rss_bytes'] / 2**20:.1f} MB)")
+    for path in stats['outputs']:
+        print(f"Yazıldı ({stats['format']}): {path}")
+
+if __name__ == '__main__':
+    main()
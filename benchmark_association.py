@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Birliktelik Kuralı Seçimi Performans Testi
+------------------------------------------
+Sentetik kural kümeleri (varsayılan 1k/10k/100k kural) üzerinde çift yönlü
+kural ayıklamasının süresini ölçer. Küçük kümelerde eski O(R²) döngü ile
+sonuçların birebir aynı olduğu da doğrulanır.
+
+Kullanım:
+    python benchmark_association.py --sizes 1000 10000 100000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from association_analysis import select_positive_rules
+
+def generate_synthetic_rules(rule_count, seed=42):
+    """Lift'e göre sıralanmış, ters kuralları da içeren sentetik bir kural tablosu üretir."""
+    rng = random.Random(seed)
+    category_count = max(20, int((rule_count * 2) ** 0.5))
+    categories = [f"kategori_{i}" for i in range(category_count)]
+    
+    rows = []
+    seen = set()
+    while len(rows) < rule_count:
+        itemset = rng.sample(categories, rng.choice([2, 2, 3]))
+        split = rng.randint(1, len(itemset) - 1)
+        antecedents = frozenset(itemset[:split])
+        consequents = frozenset(itemset[split:])
+        support = rng.uniform(0.01, 0.3)
+        lift = rng.uniform(1.01, 5.0)
+        
+        # Kuralların yaklaşık yarısı için ters kuralı da ekle
+        candidates = [(antecedents, consequents)]
+        if rng.random() < 0.5:
+            candidates.append((consequents, antecedents))
+        for rule_antecedents, rule_consequents in candidates:
+            if (rule_antecedents, rule_consequents) in seen or len(rows) >= rule_count:
+                continue
+            seen.add((rule_antecedents, rule_consequents))
+            rows.append({
+                'antecedents': rule_antecedents,
+                'consequents': rule_consequents,
+                'support': support,
+                'confidence': rng.uniform(0.05, 1.0),
+                'lift': lift
+            })
+    
+    rules = pd.DataFrame(rows)
+    rules.sort_values(by='lift', ascending=False, inplace=True)
+    return rules
+
+def select_positive_rules_legacy(positive_rules):
+    """Karşılaştırma için eski, her kural için tüm tabloyu tarayan O(R²) uygulama."""
+    positive_rules_list = []
+    processed_pairs = set()
+    
+    for _, row in positive_rules.iterrows():
+        antecedents = frozenset(row['antecedents'])
+        consequents = frozenset(row['consequents'])
+        pair_key = frozenset([antecedents, consequents])
+        
+        if pair_key in processed_pairs:
+            continue
+        
+        processed_pairs.add(pair_key)
+        reverse_found = False
+        higher_confidence_rule = None
+        
+        for _, rev_row in positive_rules.iterrows():
+            rev_antecedents = frozenset(rev_row['antecedents'])
+            rev_consequents = frozenset(rev_row['consequents'])
+            
+            if antecedents == rev_consequents and consequents == rev_antecedents:
+                reverse_found = True
+                if rev_row['confidence'] > row['confidence']:
+                    higher_confidence_rule = {
+                        'if_categories': list(rev_row['antecedents']),
+                        'then_categories': list(rev_row['consequents']),
+                        'support': float(rev_row['support']),
+                        'confidence': float(rev_row['confidence']),
+                        'lift': float(rev_row['lift'])
+                    }
+                break
+        
+        if not reverse_found or higher_confidence_rule is None:
+            positive_rules_list.append({
+                'if_categories': list(row['antecedents']),
+                'then_categories': list(row['consequents']),
+                'support': float(row['support']),
+                'confidence': float(row['confidence']),
+                'lift': float(row['lift'])
+            })
+        else:
+            positive_rules_list.append(higher_confidence_rule)
+    
+    return positive_rules_list
+
+def time_call(function, *args, repeat=3):
+    """Fonksiyonu birkaç kez çalıştırıp en iyi süreyi ve son sonucu döndürür."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Birliktelik kuralı seçimi performans testi')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Test edilecek kural sayıları')
+    parser.add_argument('--legacy-limit', type=int, default=1000,
+                        help='Eski O(R²) uygulamanın çalıştırılacağı en büyük kural sayısı')
+    args = parser.parse_args()
+    
+    print(f"{'Kural':>10} {'Yeni (s)':>12} {'Eski (s)':>12} {'Hızlanma':>10} {'Aynı':>6}")
+    for rule_count in args.sizes:
+        rules = generate_synthetic_rules(rule_count)
+        new_time, new_result = time_call(select_positive_rules, rules)
+        
+        if rule_count <= args.legacy_limit:
+            legacy_time, legacy_result = time_call(select_positive_rules_legacy, rules, repeat=1)
+            identical = 'evet' if legacy_result == new_result else 'HAYIR'
+            print(f"{rule_count:>10} {new_time:>12.4f} {legacy_time:>12.4f} {legacy_time / new_time:>9.0f}x {identical:>6}")
+        else:
+            print(f"{rule_count:>10} {new_time:>12.4f} {'-':>12} {'-':>10} {'-':>6}")
+
+if __name__ == '__main__':
+    main()
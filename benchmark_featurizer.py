@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Özellik Çıkarıcı Karşılaştırması
+--------------------------------
+Sözlük tabanlı TfidfVectorizer ('vocabulary') ile hash tabanlı
+HashingTfidfVectorizer'ı ('hashing') aynı temizlenmiş veri ve aynı
+eğitim/test bölmesi üzerinde karşılaştırır:
+
+    - eğitim süresi ve eğitim sırasındaki en yüksek Python bellek tahsisi
+    - vektörleştirici artefakt boyutu
+    - dönüşüm hızı (isim/s, ürün isimleri --rows satıra çoğaltılarak)
+    - seçilen modellerin doğruluğu, makro F1 skoru ve model boyutu
+
+Kullanım:
+    python benchmark_featurizer.py
+    python benchmark_featurizer.py --hash-features 4096 16384 65536 --models naive_bayes
+"""
+import io
+import time
+import argparse
+import contextlib
+import tracemalloc
+
+import joblib
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score
+
+from data_preprocessing import DATA_FILE, DEFAULT_PARAMS, build_vectorizer, clean_stage, labels_stage, split_stage
+from train_models import MODEL_SPECS
+
+def artifact_size(obj):
+    """Nesnenin joblib ile kaydedildiğindeki boyutunu bayt olarak döndürür."""
+    buffer = io.BytesIO()
+    joblib.dump(obj, buffer)
+    return buffer.tell()
+
+def fit_featurizer(params, texts):
+    """Vektörleştiriciyi eğitir; (vektörleştirici, X, süre, en yüksek tahsis) döndürür."""
+    vectorizer = build_vectorizer(params)
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    X = vectorizer.fit_transform(texts)
+    seconds = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return vectorizer, X, seconds, peak
+
+def transform_rate(vectorizer, texts, rows, chunk_size=100000):
+    """Çoğaltılmış isimlerde saniyedeki dönüşüm sayısını ölçer."""
+    repeats = -(-rows // len(texts))
+    scaled = np.tile(np.asarray(texts, dtype=object), repeats)[:rows]
+    seconds = 0.0
+    for start in range(0, len(scaled), chunk_size):
+        chunk = scaled[start:start + chunk_size]
+        start_time = time.perf_counter()
+        vectorizer.transform(chunk)
+        seconds += time.perf_counter() - start_time
+    return len(scaled) / seconds
+
+def evaluate_featurizer(label, params, df, y, model_names, rows):
+    """Bir özellik çıkarıcı ayarını eğitip ölçer; sonuç sözlüğü döndürür."""
+    texts = df['processed_item_name'].tolist()
+    vectorizer, X, fit_seconds, fit_peak = fit_featurizer(params, texts)
+    with contextlib.redirect_stdout(io.StringIO()):
+        split = split_stage(X, y, DEFAULT_PARAMS['split'])
+    X_train, y_train = split['train_data.joblib']['X_train'], split['train_data.joblib']['y_train']
+    X_test, y_test = split['test_data.joblib']['X_test'], split['test_data.joblib']['y_test']
+
+    result = {
+        'label': label,
+        'n_features': X.shape[1],
+        'fit_seconds': fit_seconds,
+        'fit_peak_bytes': fit_peak,
+        'artifact_bytes': artifact_size(vectorizer),
+        'transform_rate': transform_rate(vectorizer, texts, rows),
+        'models': {}
+    }
+    for name in model_names:
+        spec = MODEL_SPECS[name]
+        model = spec['estimator'](**spec['params'])
+        start_time = time.perf_counter()
+        model.fit(X_train, y_train)
+        train_seconds = time.perf_counter() - start_time
+        y_pred = model.predict(X_test)
+        result['models'][name] = {
+            'accuracy': accuracy_score(y_test, y_pred),
+            'macro_f1': f1_score(y_test, y_pred, average='macro', zero_division=0),
+            'train_seconds': train_seconds,
+            'model_bytes': artifact_size(model)
+        }
+    return result
+
+def print_results(results, model_names):
+    print(f"\n{'Özellik çıkarıcı':<22} {'Sütun':>7} {'Eğitim (s)':>11} {'Tepe bellek':>12} "
+          f"{'Artefakt':>10} {'Dönüşüm (isim/s)':>17}")
+    for result in results:
+        print(f"{result['label']:<22} {result['n_features']:>7} {result['fit_seconds']:>11.3f} "
+              f"{result['fit_peak_bytes'] / 2**20:>9.1f} MB {result['artifact_bytes'] / 2**10:>7.0f} KB "
+              f"{result['transform_rate']:>17,.0f}")
+    for name in model_names:
+        print(f"\n{MODEL_SPECS[name]['label']}:")
+        print(f"{'Özellik çıkarıcı':<22} {'Doğruluk':>9} {'Makro F1':>9} {'Eğitim (s)':>11} {'Model':>10}")
+        for result in results:
+            metrics = result['models'][name]
+            print(f"{result['label']:<22} {metrics['accuracy']:>9.4f} {metrics['macro_f1']:>9.4f} "
+                  f"{metrics['train_seconds']:>11.2f} {metrics['model_bytes'] / 2**10:>7.0f} KB")
+
+def main():
+    parser = argparse.ArgumentParser(description='Sözlük tabanlı ve hash tabanlı TF-IDF karşılaştırması.')
+    parser.add_argument('--data-file', default=DATA_FILE, help='Girdi CSV dosyası')
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_SPECS), default=['naive_bayes', 'logistic_regression'])
+    parser.add_argument('--max-features', type=int, default=DEFAULT_PARAMS['tfidf']['max_features'])
+    parser.add_argument('--hash-features', type=int, nargs='+', default=[DEFAULT_PARAMS['tfidf']['n_features']],
+                        help="Denenecek 'hashing' sütun sayıları")
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Dönüşüm hızı için çoğaltılmış satır sayısı')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = clean_stage(args.data_file, DEFAULT_PARAMS['clean'])['clean_data.joblib']
+        y = labels_stage(df, DEFAULT_PARAMS['labels'])['labels.joblib']
+    print(f"{len(df)} ürün, {len(np.unique(y))} kategori.")
+
+    configs = [('vocabulary', dict(DEFAULT_PARAMS['tfidf'], featurizer='vocabulary', max_features=args.max_features))]
+    configs += [(f"hashing ({n_features})", dict(DEFAULT_PARAMS['tfidf'], featurizer='hashing', n_features=n_features))
+                for n_features in args.hash_features]
+
+    results = []
+    for label, params in configs:
+        print(f"Ölçülüyor: {label}")
+        results.append(evaluate_featurizer(label, params, df, y, args.models, args.rows))
+    print_results(results, args.models)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Metin Normalizasyonu Performans Testi
+-------------------------------------
+market_data.csv ürün isimlerini istenen satır sayısına (varsayılan 10M)
+çoğaltır ve eski satır bazlı fonksiyonlar (`df.apply(preprocess_text)`,
+14 ardışık `str.replace`) ile text_normalizer toplu API'lerinin
+saniyedeki isim sayısını karşılaştırır. Sonuçların birebir aynı olduğu
+da doğrulanır.
+
+Kullanım:
+    python benchmark_normalizer.py --rows 10000000
+"""
+import re
+import time
+import argparse
+
+import pandas as pd
+
+from text_normalizer import normalize_product_names, preprocess_texts
+
+def preprocess_text_legacy(text):
+    """data_preprocessing.py içindeki eski üç geçişli re.sub sürümü."""
+    if not isinstance(text, str):
+        text = str(text)
+    text = text.lower()
+    text = re.sub(r'[^a-zçğıöşü\s]', ' ', text)
+    text = re.sub(r'\d+', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+def convert_turkish_to_english_legacy(text):
+    """web.py içindeki eski ardışık str.replace sürümü."""
+    if not text:
+        return text
+    turkish_chars = {
+        'ç': 'c', 'Ç': 'C',
+        'ğ': 'g', 'Ğ': 'G',
+        'ı': 'i', 'I': 'I',
+        'İ': 'I', 'i': 'i',
+        'ö': 'o', 'Ö': 'O',
+        'ş': 's', 'Ş': 'S',
+        'ü': 'u', 'Ü': 'U'
+    }
+    for turkish_char, english_char in turkish_chars.items():
+        text = text.replace(turkish_char, english_char)
+    return text
+
+def normalize_product_names_legacy(products):
+    """web.py içindeki eski ürün başına normalizasyon döngüsü."""
+    return [' '.join(convert_turkish_to_english_legacy(str(product)).lower().split()) for product in products]
+
+def time_call(function, *args):
+    """Fonksiyonu bir kez çalıştırır; (süre, sonuç) döndürür."""
+    start_time = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start_time, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Metin normalizasyonu performans testi.')
+    parser.add_argument('--data-file', default='market_data.csv', help='Ürün isimlerinin okunacağı CSV')
+    parser.add_argument('--rows', type=int, default=10_000_000, help='Çoğaltılmış satır sayısı')
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help='Tek seferde ölçülen satır sayısı')
+    args = parser.parse_args()
+
+    names = pd.read_csv(args.data_file)['item_name'].dropna()
+    repeats = -(-args.rows // len(names))
+    scaled = pd.concat([names] * repeats, ignore_index=True).iloc[:args.rows]
+    print(f"{len(names)} benzersiz satır {len(scaled):,} satıra çoğaltıldı.\n")
+
+    cases = [
+        ('preprocess_text', lambda chunk: chunk.apply(preprocess_text_legacy).tolist(), preprocess_texts),
+        ('normalize_product_name', normalize_product_names_legacy, normalize_product_names)
+    ]
+
+    # Bellek kullanımını sınırlamak için satırlar parça parça işlenir
+    print(f"{'Fonksiyon':<24} {'Eski (isim/s)':>15} {'Yeni (isim/s)':>15} {'Hızlanma':>10} {'Aynı':>6}")
+    for label, legacy_function, new_function in cases:
+        legacy_time = new_time = 0.0
+        identical = True
+        for start in range(0, len(scaled), args.chunk_size):
+            chunk = scaled.iloc[start:start + args.chunk_size]
+            elapsed, legacy_result = time_call(legacy_function, chunk)
+            legacy_time += elapsed
+            elapsed, new_result = time_call(new_function, chunk)
+            new_time += elapsed
+            identical = identical and legacy_result == new_result
+        print(f"{label:<24} {len(scaled) / legacy_time:>15,.0f} {len(scaled) / new_time:>15,.0f} "
+              f"{legacy_time / new_time:>9.1f}x {'evet' if identical else 'HAYIR':>6}")
+
+if __name__ == '__main__':
+    main()
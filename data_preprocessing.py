@@ -1,143 +1,285 @@
-# Gerekli kütüphanelerin import edilmesi
-import pandas as pd
-import numpy as np
+# -*- coding: utf-8 -*-
+"""
+Veri Ön İşleme
+--------------
+market_data.csv dosyasını temizler, ürün isimlerini normalize eder,
+TF-IDF özelliklerini ve etiket kodlamasını üretir ve veriyi eğitim/test
+setlerine ayırır.
+
+İşlem aşamalara bölünmüştür. Her aşamanın anahtarı girdi dosyasının
+içerik özetinden, aşama parametrelerinden ve önceki aşamaların
+anahtarlarından üretilir ve `processed_data/manifest.json` dosyasına yazılır.
+Anahtarı değişmeyen ve çıktıları yerinde olan aşamalar `processed_data/`
+dizininden yüklenir; örneğin sadece test oranı değiştiğinde TF-IDF yeniden
+eğitilmez.
+
+TF-IDF aşaması iki özellik çıkarıcıdan birini kullanır: 'vocabulary'
+(TfidfVectorizer, en sık max_features kelime/ikili) veya 'hashing'
+(hashing_featurizer.HashingTfidfVectorizer: n_features sütuna hash'leme ve
+sadece IDF dizisi). Her ikisi de 'tfidf_vectorizer.joblib' adıyla kaydedilir;
+eğitim, çıkarım hattı ve web servisi hangisinin seçildiğini bilmek zorunda
+değildir.
+
+Kullanım:
+    python data_preprocessing.py
+    python data_preprocessing.py --test-size 0.25   # Sadece bölme aşaması çalışır
+    python data_preprocessing.py --force            # Tüm aşamaları yeniden çalıştır
+    python data_preprocessing.py --featurizer hashing --hash-features 16384
+"""
+import os
+import json
+import hashlib
+import argparse
 from collections import Counter
+
+import joblib # Model ve diğer nesneleri kaydetmek için
+import numpy as np
+import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import LabelEncoder
-import re # Metin temizleme için regular expression kütüphanesi
-import joblib # Model ve diğer nesneleri kaydetmek için
-import os # Dizin oluşturmak için
 
+from hashing_featurizer import DEFAULT_N_FEATURES, HashingTfidfVectorizer
+from text_normalizer import preprocess_texts
 
-# --- Veri Yükleme ---
+# --- Ayarlar ---
 # Veri setinin bulunduğu dosya yolu (Bu dosyanın kodla aynı dizinde olduğu varsayılır)
-data_file = 'market_data.csv' # CSV dosyasının adı
-output_dir = 'processed_data' # İşlenmiş verilerin ve nesnelerin kaydedileceği dizin
-
-# Dizin yoksa oluştur
-os.makedirs(output_dir, exist_ok=True)
-
-print(f"{data_file} dosyası okunuyor...")
-try:
-    # CSV dosyasını pandas DataFrame olarak oku
-    # Not: Eğer dosya farklı bir kodlama ile kaydedilmişse (örn: 'iso-8859-9' veya 'windows-1254'), encoding parametresi eklenmelidir.
-    # df = pd.read_csv(data_file, encoding='utf-8') # veya 'iso-8859-9', 'windows-1254'
-    df = pd.read_csv(data_file)
-    print("Veri başarıyla yüklendi.")
-    print("Veri setinin ilk 5 satırı:")
+DATA_FILE = 'market_data.csv'
+# İşlenmiş verilerin ve nesnelerin kaydedileceği dizin
+OUTPUT_DIR = 'processed_data'
+# Aşama anahtarlarının tutulduğu dosya
+MANIFEST_FILENAME = 'manifest.json'
+
+# Aşama parametreleri (değişen parametre sadece ilgili aşamayı ve sonrasını geçersiz kılar)
+DEFAULT_PARAMS = {
+    'clean': {'required_columns': ['item_name', 'category_name'], 'text_version': 1},
+    # featurizer: 'vocabulary' (öğrenilmiş sözlük) veya 'hashing' (sözlüksüz, sabit boyutlu)
+    # max_features: En sık geçen N kelimeyi dikkate al (sadece 'vocabulary')
+    # n_features: Hash sütun sayısı (sadece 'hashing')
+    # ngram_range: Tekli kelimeler ve ikili kelime grupları
+    'tfidf': {'featurizer': 'vocabulary', 'max_features': 5000, 'n_features': DEFAULT_N_FEATURES, 'ngram_range': [1, 2]},
+    'labels': {},
+    # min_samples: Bu sayıdan az örneğe sahip kategoriler stratify için çıkarılır
+    'split': {'min_samples': 2, 'test_size': 0.2, 'random_state': 42}
+}
+
+# --- Manifesto Yardımcıları ---
+def file_digest(path, chunk_size=1024 * 1024):
+    """Dosya içeriğinin SHA-256 özetini döndürür."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def stage_key(*parts):
+    """Aşama girdilerinden (özetler ve parametreler) aşama anahtarı üretir."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+class StageManifest:
+    """Aşama anahtarlarını ve çıktı dosyalarını `manifest.json` içinde tutar."""
+
+    def __init__(self, output_dir, force=False):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self.force = force
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                self.stages = json.load(file)
+        except (OSError, ValueError):
+            self.stages = {}
+
+    def output_path(self, filename):
+        return os.path.join(self.output_dir, filename)
+
+    def is_fresh(self, stage, key):
+        """Aşamanın anahtarı aynıysa ve tüm çıktıları mevcutsa True döner."""
+        entry = self.stages.get(stage)
+        if self.force or not entry or entry.get('key') != key:
+            return False
+        return all(os.path.exists(self.output_path(filename)) for filename in entry['outputs'])
+
+    def run(self, stage, key, compute, outputs):
+        """Aşamayı günceller; güncelse çıktıları diskten yükler.
+
+        compute() çıktı dosya adı -> nesne sözlüğü döndürmelidir.
+        """
+        if self.is_fresh(stage, key):
+            print(f"[{stage}] değişmedi, '{self.output_dir}' dizininden yükleniyor.")
+            return {filename: joblib.load(self.output_path(filename)) for filename in outputs}
+
+        print(f"[{stage}] çalıştırılıyor...")
+        results = compute()
+        for filename in outputs:
+            # Yarım yazılmış dosya bırakmamak için önce geçici dosyaya yaz
+            temp_path = f"{self.output_path(filename)}.tmp"
+            joblib.dump(results[filename], temp_path)
+            os.replace(temp_path, self.output_path(filename))
+        self.stages[stage] = {'key': key, 'outputs': list(outputs)}
+        self.save()
+        return results
+
+    def save(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.stages, file, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+# --- Aşamalar ---
+def clean_stage(data_file, params):
+    """CSV'yi okur, eksik satırları atar ve ürün isimlerini ön işler."""
+    try:
+        # Not: Eğer dosya farklı bir kodlama ile kaydedilmişse (örn: 'iso-8859-9' veya 'windows-1254'), encoding parametresi eklenmelidir.
+        df = pd.read_csv(data_file)
+    except Exception:
+        print("Dosya kodlamasını (encoding) kontrol etmeniz gerekebilir. Örn: encoding='utf-8' veya encoding='iso-8859-9'")
+        raise
+    print(f"Veri setinin boyutu: {df.shape}")
+
+    # Eksik değer içeren satırları sil (varsa)
+    print(df.isnull().sum())
+    df = df.dropna(subset=params['required_columns'])
+    print(f"Temizlenmiş veri setinin boyutu: {df.shape}")
+
+    # 'item_name' sütununu toplu olarak ön işle (text_normalizer.preprocess_texts)
+    df = pd.DataFrame({
+        'processed_item_name': preprocess_texts(df['item_name']),
+        'category_name': df['category_name'].to_numpy()
+    })
     print(df.head())
-    print(f"\nVeri setinin boyutu: {df.shape}")
-except FileNotFoundError:
-    print(f"Hata: {data_file} dosyası bulunamadı. Lütfen dosyanın doğru yolda olduğundan emin olun.")
-    exit() # Dosya yoksa programdan çık
-except Exception as e:
-    print(f"Veri okunurken bir hata oluştu: {e}")
-    print("Dosya kodlamasını (encoding) kontrol etmeniz gerekebilir. Örn: encoding='utf-8' veya encoding='iso-8859-9'")
-    exit()
-
-# --- Veri Kontrolü ve Temizleme ---
-print("\nEksik veri kontrolü yapılıyor...")
-# Eksik değerleri kontrol et
-print(df.isnull().sum())
-# Eğer eksik değer varsa, bunları doldurabilir veya satırları silebiliriz.
-# Bu örnekte eksik değer içeren satırları silelim (varsa)
-df.dropna(subset=['item_name', 'category_name'], inplace=True)
-print("Eksik değerler (varsa) temizlendi.")
-print(f"Temizlenmiş veri setinin boyutu: {df.shape}")
-
-# --- Metin Ön İşleme Fonksiyonu ---
-# Türkçe karakterleri ve temel metin temizliğini içeren fonksiyon
-def preprocess_text(text):
-    # Gelen verinin string olduğundan emin olalım
-    if not isinstance(text, str):
-        text = str(text)
-    # Küçük harfe çevirme
-    text = text.lower()
-    # Sayıları ve noktalama işaretlerini boşlukla değiştirme (kelimelerin birleşmesini önlemek için)
-    text = re.sub(r'[^a-zçğıöşü\s]', ' ', text) # Sadece Türkçe harfler ve boşluk kalsın
-    text = re.sub(r'\d+', ' ', text) # Sayıları boşlukla değiştir (yukarıdaki regex bunu zaten yapıyor ama garanti olsun)
-    # Ekstra boşlukları tek boşluğa indirgeme
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-print("\n'item_name' sütunu için metin ön işleme uygulanıyor...")
-# 'item_name' sütununa ön işleme fonksiyonunu uygula
-df['processed_item_name'] = df['item_name'].apply(preprocess_text)
-print("Metin ön işleme tamamlandı. İşlenmiş metin örneği:")
-print(df[['item_name', 'processed_item_name']].head())
-
-# --- Özellik Çıkarımı (TF-IDF) ---
-print("\nTF-IDF vektörizasyonu yapılıyor...")
-# TF-IDF Vectorizer nesnesi oluşturma
-# max_features: En sık geçen N kelimeyi dikkate al (isteğe bağlı, performansı etkileyebilir)
-# ngram_range: Tekli kelimeler (1,1) veya ikili kelime grupları (1,2) gibi n-gram'ları kullan
-# analyzer='char_wb': Karakter seviyesinde n-gram kullanmak bazen kelime hatalarına karşı daha dirençli olabilir.
-# Ancak genellikle 'word' daha iyi sonuç verir. Şimdilik 'word' kullanalım.
-tfidf_vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1, 2))
-
-# 'processed_item_name' sütununu kullanarak TF-IDF matrisini oluştur ve eğit
-X = tfidf_vectorizer.fit_transform(df['processed_item_name'])
-print("TF-IDF matrisi oluşturuldu.")
-print(f"Özellik matrisinin boyutu (X): {X.shape}")
-
-# TF-IDF Vectorizer nesnesini kaydet
-vectorizer_path = os.path.join(output_dir, 'tfidf_vectorizer.joblib')
-joblib.dump(tfidf_vectorizer, vectorizer_path)
-print(f"TF-IDF Vectorizer '{vectorizer_path}' olarak kaydedildi.")
-
-# --- Hedef Değişkeni Kodlama (Label Encoding) ---
-print("\n'category_name' sütunu için etiket kodlama yapılıyor...")
-# LabelEncoder nesnesi oluşturma
-label_encoder = LabelEncoder()
-
-# 'category_name' sütununu sayısal değerlere dönüştür ve eğit
-y = label_encoder.fit_transform(df['category_name'])
-print("Etiket kodlama tamamlandı.")
-print(f"Kodlanmış etiket (y) örnekleri: {y[:5]}")
-print(f"Toplam kategori sayısı: {len(label_encoder.classes_)}")
-# print(f"Kategori isimleri ve kodları: {dict(zip(label_encoder.classes_, label_encoder.transform(label_encoder.classes_)))}") # Çok fazla kategori varsa yazdırmak sorun olabilir
-
-# LabelEncoder nesnesini kaydet
-encoder_path = os.path.join(output_dir, 'label_encoder.joblib')
-joblib.dump(label_encoder, encoder_path)
-print(f"Label Encoder '{encoder_path}' olarak kaydedildi.")
-
-print("\nAz örnekli kategoriler filtreleniyor...")
-# Kategorilerin örnek sayısını kontrol et
-category_counts = Counter(y)
-print(f"Kategori başına örnek sayıları: {category_counts.most_common(10)}")  # En yoğun 10 kategoriyi göster
-print(f"Sadece 1 örneğe sahip kategori sayısı: {sum(1 for count in category_counts.values() if count == 1)}")
-
-# En az 2 örneğe sahip kategorileri içeren maskeyi oluştur
-valid_categories_mask = np.isin(y, [cat for cat, count in category_counts.items() if count >= 2])
-print(f"Çok az örneğe sahip kategoriler kaldırıldıktan sonra kalan örnek sayısı: {sum(valid_categories_mask)}")
-print(f"Kaldırılan örnek sayısı: {len(y) - sum(valid_categories_mask)}")
-
-# Sadece geçerli kategorilere sahip örnekleri seç
-X_filtered = X[valid_categories_mask]
-y_filtered = y[valid_categories_mask]
-
-# --- Veriyi Eğitim ve Test Setlerine Ayırma ---
-print("\nVeri eğitim ve test setlerine ayrılıyor...")
-# Veriyi %80 eğitim, %20 test olarak ayır
-# stratify=y_filtered: Kategorilerin dağılımını eğitim ve test setlerinde benzer tutar (önemli!)
-X_train, X_test, y_train, y_test = train_test_split(X_filtered, y_filtered, test_size=0.2, random_state=42, stratify=y_filtered)
-
-print("Veri başarıyla ayrıldı.")
-print(f"Eğitim seti boyutu (X_train): {X_train.shape}")
-print(f"Test seti boyutu (X_test): {X_test.shape}")
-print(f"Eğitim seti etiket boyutu (y_train): {y_train.shape}")
-print(f"Test seti etiket boyutu (y_test): {y_test.shape}")
-
-# Eğitim ve test setlerini kaydet (sparse matrix olarak kaydedilecekler)
-train_data_path = os.path.join(output_dir, 'train_data.joblib')
-test_data_path = os.path.join(output_dir, 'test_data.joblib')
-joblib.dump({'X_train': X_train, 'y_train': y_train}, train_data_path)
-joblib.dump({'X_test': X_test, 'y_test': y_test}, test_data_path)
-print(f"Eğitim verisi '{train_data_path}' olarak kaydedildi.")
-print(f"Test verisi '{test_data_path}' olarak kaydedildi.")
-
-print("\nVeri ön işleme tamamlandı ve gerekli dosyalar kaydedildi.")
-print(f"İşlenmiş veriler ve nesneler '{output_dir}' dizinine kaydedildi.")
+    return {'clean_data.joblib': df}
+
+FEATURIZERS = ('vocabulary', 'hashing')
+
+def build_vectorizer(params):
+    """Aşama parametrelerine göre eğitilmemiş TF-IDF vektörleştiricisini oluşturur."""
+    if params['featurizer'] == 'hashing':
+        return HashingTfidfVectorizer(n_features=params['n_features'], ngram_range=tuple(params['ngram_range']))
+    if params['featurizer'] == 'vocabulary':
+        return TfidfVectorizer(max_features=params['max_features'], ngram_range=tuple(params['ngram_range']))
+    raise ValueError(f"Bilinmeyen özellik çıkarıcı: {params['featurizer']}")
+
+def featurizer_params(params):
+    """Aşama anahtarı için sadece seçilen özellik çıkarıcının kullandığı parametreleri döndürür.
+
+    'vocabulary' anahtarı özellik çıkarıcı seçeneği eklenmeden önceki
+    anahtarla aynıdır; mevcut manifest'ler geçersiz olmaz.
+    """
+    if params['featurizer'] == 'hashing':
+        return {'featurizer': 'hashing', 'n_features': params['n_features'], 'ngram_range': params['ngram_range']}
+    if params['featurizer'] == 'vocabulary':
+        return {'max_features': params['max_features'], 'ngram_range': params['ngram_range']}
+    raise ValueError(f"Bilinmeyen özellik çıkarıcı: {params['featurizer']}")
+
+def tfidf_stage(df, params):
+    """TF-IDF vektörleştiricisini eğitir ve özellik matrisini üretir."""
+    tfidf_vectorizer = build_vectorizer(params)
+    X = tfidf_vectorizer.fit_transform(df['processed_item_name'])
+    print(f"Özellik matrisinin boyutu (X): {X.shape}")
+    return {'tfidf_vectorizer.joblib': tfidf_vectorizer, 'features.joblib': X}
+
+def labels_stage(df, params):
+    """'category_name' sütununu sayısal etiketlere dönüştürür."""
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform(df['category_name'])
+    print(f"Toplam kategori sayısı: {len(label_encoder.classes_)}")
+    return {'label_encoder.joblib': label_encoder, 'labels.joblib': y}
+
+def split_stage(X, y, params):
+    """Az örnekli kategorileri çıkarır ve veriyi eğitim/test setlerine ayırır."""
+    category_counts = Counter(y)
+    print(f"Kategori başına örnek sayıları: {category_counts.most_common(10)}")  # En yoğun 10 kategoriyi göster
+
+    # En az min_samples örneğe sahip kategorileri içeren maske
+    valid_categories_mask = np.isin(y, [cat for cat, count in category_counts.items() if count >= params['min_samples']])
+    print(f"Kaldırılan örnek sayısı: {len(y) - sum(valid_categories_mask)}")
+    X_filtered = X[valid_categories_mask]
+    y_filtered = y[valid_categories_mask]
+
+    # stratify=y_filtered: Kategorilerin dağılımını eğitim ve test setlerinde benzer tutar (önemli!)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_filtered, y_filtered,
+        test_size=params['test_size'],
+        random_state=params['random_state'],
+        stratify=y_filtered
+    )
+    print(f"Eğitim seti boyutu (X_train): {X_train.shape}")
+    print(f"Test seti boyutu (X_test): {X_test.shape}")
+    return {
+        'train_data.joblib': {'X_train': X_train, 'y_train': y_train},
+        'test_data.joblib': {'X_test': X_test, 'y_test': y_test}
+    }
+
+def run_pipeline(data_file=DATA_FILE, output_dir=OUTPUT_DIR, params=None, force=False):
+    """Tüm aşamaları sırayla çalıştırır; güncel aşamalar diskten yüklenir."""
+    params = params or DEFAULT_PARAMS
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = StageManifest(output_dir, force=force)
+
+    # Aşama anahtarları zincir halindedir: bir aşama değişirse sonrakiler de geçersiz olur
+    clean_key = stage_key('clean', file_digest(data_file), params['clean'])
+    tfidf_key = stage_key('tfidf', clean_key, featurizer_params(params['tfidf']))
+    labels_key = stage_key('labels', clean_key, params['labels'])
+    split_key = stage_key('split', tfidf_key, labels_key, params['split'])
+
+    # Sonraki aşamalar güncelse ara çıktıların yüklenmesine gerek yok
+    if manifest.is_fresh('split', split_key) and manifest.is_fresh('tfidf', tfidf_key) and manifest.is_fresh('labels', labels_key):
+        print("Tüm aşamalar güncel, yeniden hesaplama yapılmadı.")
+        return manifest
+
+    cache = {}
+    def clean_data():
+        if 'df' not in cache:
+            cache['df'] = manifest.run('clean', clean_key, lambda: clean_stage(data_file, params['clean']),
+                                       ['clean_data.joblib'])['clean_data.joblib']
+        return cache['df']
+
+    if manifest.is_fresh('tfidf', tfidf_key):
+        X = joblib.load(manifest.output_path('features.joblib'))
+        print("[tfidf] değişmedi, TF-IDF yeniden eğitilmedi.")
+    else:
+        X = manifest.run('tfidf', tfidf_key, lambda: tfidf_stage(clean_data(), params['tfidf']),
+                         ['tfidf_vectorizer.joblib', 'features.joblib'])['features.joblib']
+
+    if manifest.is_fresh('labels', labels_key):
+        y = joblib.load(manifest.output_path('labels.joblib'))
+        print("[labels] değişmedi, etiket kodlama yeniden yapılmadı.")
+    else:
+        y = manifest.run('labels', labels_key, lambda: labels_stage(clean_data(), params['labels']),
+                         ['label_encoder.joblib', 'labels.joblib'])['labels.joblib']
+
+    manifest.run('split', split_key, lambda: split_stage(X, y, params['split']),
+                 ['train_data.joblib', 'test_data.joblib'])
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='market_data.csv için aşamalı ve önbellekli veri ön işleme.')
+    parser.add_argument('--data-file', default=DATA_FILE, help='Girdi CSV dosyası')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='Çıktı dizini')
+    parser.add_argument('--featurizer', choices=FEATURIZERS, default=DEFAULT_PARAMS['tfidf']['featurizer'],
+                        help="TF-IDF özellik çıkarıcı: öğrenilmiş sözlük veya hash'leme")
+    parser.add_argument('--max-features', type=int, default=DEFAULT_PARAMS['tfidf']['max_features'])
+    parser.add_argument('--hash-features', type=int, default=DEFAULT_PARAMS['tfidf']['n_features'],
+                        help="'hashing' için sütun sayısı")
+    parser.add_argument('--test-size', type=float, default=DEFAULT_PARAMS['split']['test_size'])
+    parser.add_argument('--random-state', type=int, default=DEFAULT_PARAMS['split']['random_state'])
+    parser.add_argument('--force', action='store_true', help='Tüm aşamaları yeniden çalıştır')
+    args = parser.parse_args(argv)
+
+    params = json.loads(json.dumps(DEFAULT_PARAMS))
+    params['tfidf']['featurizer'] = args.featurizer
+    params['tfidf']['max_features'] = args.max_features
+    params['tfidf']['n_features'] = args.hash_features
+    params['split']['test_size'] = args.test_size
+    params['split']['random_state'] = args.random_state
+
+    try:
+        run_pipeline(args.data_file, args.output_dir, params, force=args.force)
+    except FileNotFoundError:
+        print(f"Hata: {args.data_file} dosyası bulunamadı. Lütfen dosyanın doğru yolda olduğundan emin olun.")
+        exit() # Dosya yoksa programdan çık
+
+    print(f"\nVeri ön işleme tamamlandı. İşlenmiş veriler ve nesneler '{args.output_dir}' dizinine kaydedildi.")
 
+if __name__ == '__main__':
+    main()
@@ -1,138 +1,325 @@
-# Gerekli kütüphanelerin import edilmesi
-import joblib # Kaydedilmiş nesneleri (veri, model vb.) yüklemek için
-from sklearn.metrics import accuracy_score, classification_report, precision_score, log_loss, roc_auc_score # Model performansını değerlendirme metrikleri
-import numpy as np # Sayısal işlemler için
-import os # Dizin işlemleri için
-import warnings # Uyarıları yönetmek için
+# -*- coding: utf-8 -*-
+"""
+Model Değerlendirme ve Performans Testi
+---------------------------------------
+Her model için test verisinde tek bir predict_proba geçişi yapar ve tüm
+metrikleri (doğruluk, sınıf bazlı precision/recall/F1, ağırlıklı
+precision, log loss, ağırlıklı OvR ROC AUC) bu olasılıklardan türetir;
+tahmin edilen sınıf olasılıkların argmax'ıdır. Sınıf bazlı metrikler tek
+bir karışıklık matrisinden hesaplanır.
+
+Doğruluğun yanında servis hattının (ShardPredictor: birleşik hat veya
+vektörleştirici + model) performansı da ölçülür:
+  - tekil ürün tahmin gecikmesi (p50/p95/p99, ms)
+  - farklı parti boyutlarında (1 ... 100k) saniyedeki ürün sayısı
+  - model yükleme süresi, yükleme sonrası bellek artışı ve en yüksek RSS
+
+Modeller ayrı süreçlerde eşzamanlı değerlendirilir (her model kendi
+sürecinde, bellek ölçümleri karışmaz). Aynı çekirdekleri paylaşan
+modellerin gecikme ölçümleri birbirini etkileyebilir; temiz gecikme
+değerleri için --n-jobs 1 kullanın. Sonuçlar sürümler arası karşılaştırma
+için JSON olarak yazılır.
+
+Kullanım:
+    python evaluate_models.py                               # models/evaluation_report.json
+    python evaluate_models.py --models naive_bayes --report --n-jobs 1
+    python evaluate_models.py --batch-sizes 1 100 10000 --output sonuc.json
+"""
+import os
+import sys
+import csv
+import json
+import time
+import platform
+import argparse
+import datetime
+import resource
+import warnings
+import multiprocessing
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.metrics import classification_report, log_loss, roc_auc_score
+
+from model_registry import current_rss_bytes
+from parallel_prediction import ShardPredictor
+from text_normalizer import normalize_product_names
+from train_models import MODEL_SPECS, MODEL_OUTPUT_DIR, PROCESSED_DATA_DIR
 
 # Olası uyarıları (örn. zero_division) bastırmak için
 warnings.filterwarnings("ignore")
 
 # --- Ayarlar ---
-# İşlenmiş verilerin ve kaydedilmiş nesnelerin bulunduğu dizin
-processed_data_dir = 'processed_data'
-# Eğitilmiş modellerin bulunduğu dizin
-model_dir = 'models'
-
-# Model isimleri ve dosya yolları
-model_files = {
-    "Decision Tree": os.path.join(model_dir, 'decision_tree_model.joblib'),
-    "Logistic Regression": os.path.join(model_dir, 'logistic_regression_model.joblib'),
-    "Naive Bayes": os.path.join(model_dir, 'naive_bayes_model.joblib')
-}
-
-# --- Veri Yükleme ---
-print("Önceden işlenmiş test verileri ve label encoder yükleniyor...")
-try:
-    # Test verisini yükle
-    test_data_path = os.path.join(processed_data_dir, 'test_data.joblib')
-    test_data = joblib.load(test_data_path)
-    X_test = test_data['X_test']
-    y_test = test_data['y_test']
-
-    # Label Encoder'ı yükle
-    encoder_path = os.path.join(processed_data_dir, 'label_encoder.joblib')
-    label_encoder = joblib.load(encoder_path)
-    all_classes = label_encoder.classes_ # Tüm sınıf etiketleri
-    encoded_all_classes = label_encoder.transform(all_classes) # Tüm sınıfların kodlanmış hali
-
-    print("Veriler başarıyla yüklendi.")
-    print(f"Test seti boyutu (X_test): {X_test.shape}")
-    print(f"Test seti etiket boyutu (y_test): {y_test.shape}")
-    print(f"Toplam sınıf sayısı: {len(all_classes)}")
-
-except FileNotFoundError as e:
-    print(f"Hata: Gerekli veri veya encoder dosyaları bulunamadı ({e}).")
-    print(f"Lütfen önce 'data_preprocessing.py' betiğini çalıştırdığınızdan emin olun.")
-    exit()
-except Exception as e:
-    print(f"Veri yüklenirken bir hata oluştu: {e}")
-    exit()
-
-# --- Model Değerlendirme Fonksiyonu ---
-def evaluate_model(model_name, model_path, X_test, y_test, label_encoder):
-    """Belirtilen modeli yükler ve çeşitli metriklerle değerlendirir."""
-    print(f"\n--- {model_name} Modeli Değerlendiriliyor ---")
+# Gecikme ve verim ölçümünde kullanılan ham ürün isimleri
+PRODUCT_NAMES_PATH = 'market_data.csv'
+DEFAULT_OUTPUT_PATH = os.path.join(MODEL_OUTPUT_DIR, 'evaluation_report.json')
+DEFAULT_BATCH_SIZES = (1, 10, 100, 1000, 10000, 100000)
+# Tekil tahmin gecikmesi için ölçülen istek sayısı
+DEFAULT_LATENCY_SAMPLES = 1000
+# Her parti boyutu için en az ölçüm süresi (saniye)
+MIN_THROUGHPUT_SECONDS = 0.5
+LATENCY_PERCENTILES = (50, 95, 99)
+
+def peak_rss_bytes():
+    """Sürecin en yüksek RSS değerini bayt olarak döndürür."""
+    # ru_maxrss Linux'ta KB, macOS'ta bayt cinsindendir
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+# --- Metrikler ---
+def classification_metrics(y_true, probabilities, model_classes, class_names):
+    """Tek olasılık matrisinden tüm sınıflandırma metriklerini hesaplar."""
+    y_pred = model_classes[probabilities.argmax(axis=1)]
+    # Rapor sadece test ve tahminde bulunan etiketleri içerir
+    labels = np.unique(np.concatenate((y_true, y_pred)))
+    label_positions = np.searchsorted(labels, [y_true, y_pred])
+    confusion = np.bincount(label_positions[0] * len(labels) + label_positions[1],
+                            minlength=len(labels) ** 2).reshape(len(labels), len(labels))
+
+    true_positives = np.diag(confusion).astype(np.float64)
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    precision = np.divide(true_positives, predicted, out=np.zeros_like(true_positives), where=predicted > 0)
+    recall = np.divide(true_positives, support, out=np.zeros_like(true_positives), where=support > 0)
+    denominator = precision + recall
+    f1 = np.divide(2 * precision * recall, denominator, out=np.zeros_like(true_positives), where=denominator > 0)
+    weights = support / support.sum()
+
+    metrics = {
+        'accuracy': float(true_positives.sum() / len(y_true)),
+        'weighted_precision': float(weights @ precision),
+        'weighted_recall': float(weights @ recall),
+        'weighted_f1': float(weights @ f1),
+        'macro_f1': float(f1[support > 0].mean()) if (support > 0).any() else 0.0,
+        'per_class': {
+            str(class_names[label]): {
+                'precision': float(precision[i]), 'recall': float(recall[i]),
+                'f1': float(f1[i]), 'support': int(support[i])
+            }
+            for i, label in enumerate(labels)
+        }
+    }
+
+    # Log loss: olasılık sütunları modelin sınıf sırasındadır
+    metrics['log_loss'] = float(log_loss(y_true, probabilities, labels=model_classes))
+
+    # Ağırlıklı OvR ROC AUC: testte bulunan her sınıf için ikili AUC, destek ağırlıklı
+    column_of = {label: column for column, label in enumerate(model_classes)}
+    present, counts = np.unique(y_true, return_counts=True)
+    aucs, auc_weights = [], []
+    for label, count in zip(present, counts):
+        if label in column_of and count < len(y_true):
+            aucs.append(roc_auc_score(y_true == label, probabilities[:, column_of[label]]))
+            auc_weights.append(count)
+    metrics['roc_auc_weighted_ovr'] = float(np.average(aucs, weights=auc_weights)) if aucs else None
+    return metrics, y_pred, labels
+
+# --- Performans Ölçümleri ---
+def load_product_names(path=PRODUCT_NAMES_PATH):
+    with open(path, encoding='utf-8-sig', newline='') as file:
+        return [row['item_name'] for row in csv.DictReader(file) if row.get('item_name')]
+
+def predict_raw(predictor, names):
+    """Servis hattındaki gibi ham isimleri normalize edip tahmin eder."""
+    return predictor.predict_indices(normalize_product_names(names))
+
+def measure_latency(predictor, names, samples):
+    """Tekil ürün tahmininin gecikme yüzdeliklerini (ms) ölçer."""
+    # İlk çağrıdaki tembel başlatmaları ölçüme katma
+    predict_raw(predictor, names[:1])
+    durations = np.empty(samples)
+    for i in range(samples):
+        name = [names[i % len(names)]]
+        start_time = time.perf_counter()
+        predict_raw(predictor, name)
+        durations[i] = time.perf_counter() - start_time
+    durations *= 1000
+    result = {f"p{percentile}": float(np.percentile(durations, percentile)) for percentile in LATENCY_PERCENTILES}
+    result.update(mean=float(durations.mean()), samples=samples)
+    return result
+
+def measure_throughput(predictor, names, batch_sizes):
+    """Her parti boyutu için saniyedeki ürün sayısını ölçer."""
+    results = {}
+    for batch_size in batch_sizes:
+        repeats = -(-batch_size // len(names))
+        batch = (names * repeats)[:batch_size]
+        products = 0
+        start_time = time.perf_counter()
+        while True:
+            predict_raw(predictor, batch)
+            products += batch_size
+            elapsed = time.perf_counter() - start_time
+            if elapsed >= MIN_THROUGHPUT_SECONDS:
+                break
+        results[str(batch_size)] = {'products_per_second': products / elapsed, 'batches': products // batch_size}
+    return results
+
+# --- Değerlendirme ---
+# Süreçlerin paylaştığı test verisi (fork ile kopyalanmadan devralınır)
+_worker_data = {}
+
+def _init_worker(data):
+    _worker_data.update(data)
+
+def evaluate_model(name, options):
+    """Tek bir modeli yükler, değerlendirir ve performansını ölçer."""
+    data = _worker_data
+    spec = MODEL_SPECS[name]
+    baseline_rss = current_rss_bytes()
+
+    start_time = time.perf_counter()
+    model = joblib.load(os.path.join(options['models_dir'], spec['filename']))
+    load_seconds = time.perf_counter() - start_time
+
+    # Tek olasılık geçişi
+    start_time = time.perf_counter()
+    probabilities = model.predict_proba(data['X_test'])
+    inference_seconds = time.perf_counter() - start_time
+    metrics, y_pred, labels = classification_metrics(data['y_test'], probabilities, model.classes_, data['classes'])
+
+    result = {
+        'name': name,
+        'label': spec['label'],
+        'metrics': metrics,
+        'test_inference_seconds': inference_seconds,
+        'model_load_seconds': load_seconds
+    }
+    if options['report']:
+        result['report'] = classification_report(data['y_test'], y_pred, labels=labels,
+                                                 target_names=data['classes'][labels], zero_division=0)
+    del model, probabilities
+
+    if not options['skip_benchmark']:
+        start_time = time.perf_counter()
+        predictor = ShardPredictor.load(name, options['models_dir'], options['processed_data_dir'])
+        result['serving_load_seconds'] = time.perf_counter() - start_time
+        result['serving_path'] = 'fused_pipeline' if predictor.pipeline is not None else 'vectorizer_model'
+        rss_after_load = current_rss_bytes()
+        if baseline_rss is not None and rss_after_load is not None:
+            result['serving_load_rss_bytes'] = rss_after_load - baseline_rss
+        result['latency_ms'] = measure_latency(predictor, data['names'], options['latency_samples'])
+        result['throughput'] = measure_throughput(predictor, data['names'], options['batch_sizes'])
+
+    result['peak_rss_bytes'] = peak_rss_bytes()
+    return result
+
+def evaluate_models(model_names, n_jobs=None, report=False, skip_benchmark=False,
+                    batch_sizes=DEFAULT_BATCH_SIZES, latency_samples=DEFAULT_LATENCY_SAMPLES,
+                    processed_data_dir=PROCESSED_DATA_DIR, models_dir=MODEL_OUTPUT_DIR):
+    """Modelleri eşzamanlı değerlendirir; JSON'a yazılabilir rapor sözlüğü döndürür."""
+    test_data = joblib.load(os.path.join(processed_data_dir, 'test_data.joblib'))
+    label_encoder = joblib.load(os.path.join(processed_data_dir, 'label_encoder.joblib'))
+    data = {
+        'X_test': test_data['X_test'],
+        'y_test': np.asarray(test_data['y_test']),
+        'classes': np.asarray(label_encoder.classes_, dtype=object),
+        'names': load_product_names() if not skip_benchmark else []
+    }
+    options = {
+        'report': report,
+        'skip_benchmark': skip_benchmark,
+        'batch_sizes': list(batch_sizes),
+        'latency_samples': latency_samples,
+        'processed_data_dir': processed_data_dir,
+        'models_dir': models_dir
+    }
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, len(model_names)))
+
+    start_time = time.perf_counter()
+    results = {}
+    if n_jobs == 1:
+        _init_worker(data)
+        for name in model_names:
+            results[name] = evaluate_model(name, options)
+    else:
+        # Her model ayrı bir süreçte çalışır (maxtasksperchild=1), böylece bellek ölçümleri karışmaz
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with context.Pool(n_jobs, initializer=_init_worker, initargs=(data,), maxtasksperchild=1) as pool:
+            for result in pool.starmap(evaluate_model, [(name, options) for name in model_names]):
+                results[result['name']] = result
+
+    return {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'wall_seconds': time.perf_counter() - start_time,
+        'environment': {
+            'python': platform.python_version(),
+            'sklearn': sklearn.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'settings': {
+            'n_jobs': n_jobs,
+            'test_samples': int(data['X_test'].shape[0]),
+            'batch_sizes': options['batch_sizes'],
+            'latency_samples': latency_samples,
+            'skip_benchmark': skip_benchmark
+        },
+        'models': results
+    }
+
+def print_summary(evaluation):
+    print(f"\n{'Model':<22} {'Doğruluk':>9} {'F1 (ağ.)':>9} {'LogLoss':>9} {'ROC AUC':>8} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'Yükleme s':>10} {'Tepe RSS MB':>12}")
+    for result in evaluation['models'].values():
+        metrics = result['metrics']
+        latency = result.get('latency_ms', {})
+        roc_auc = metrics['roc_auc_weighted_ovr']
+        print(f"{result['label']:<22} {metrics['accuracy']:>9.4f} {metrics['weighted_f1']:>9.4f} "
+              f"{metrics['log_loss']:>9.4f} {roc_auc if roc_auc is not None else float('nan'):>8.4f} "
+              f"{latency.get('p50', float('nan')):>8.3f} {latency.get('p99', float('nan')):>8.3f} "
+              f"{result['model_load_seconds']:>10.3f} {result['peak_rss_bytes'] / 2**20:>12.1f}")
+
+    throughput_rows = [result for result in evaluation['models'].values() if 'throughput' in result]
+    if throughput_rows:
+        batch_sizes = list(throughput_rows[0]['throughput'])
+        print(f"\n{'Verim (ürün/s)':<22} " + ' '.join(f"{size:>10}" for size in batch_sizes))
+        for result in throughput_rows:
+            print(f"{result['label']:<22} " + ' '.join(
+                f"{result['throughput'][size]['products_per_second']:>10,.0f}" for size in batch_sizes))
+    print(f"\nToplam süre: {evaluation['wall_seconds']:.2f} s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Modelleri tek olasılık geçişiyle değerlendirir ve performanslarını ölçer.')
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_SPECS), default=list(MODEL_SPECS),
+                        help='Değerlendirilecek modeller (varsayılan: hepsi)')
+    parser.add_argument('--n-jobs', type=int, default=None, help='Eşzamanlı süreç sayısı (varsayılan: CPU sayısı)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(DEFAULT_BATCH_SIZES),
+                        help='Verim ölçümündeki parti boyutları')
+    parser.add_argument('--latency-samples', type=int, default=DEFAULT_LATENCY_SAMPLES,
+                        help='Tekil tahmin gecikmesi için istek sayısı')
+    parser.add_argument('--skip-benchmark', action='store_true', help='Sadece doğruluk metriklerini hesapla')
+    parser.add_argument('--report', action='store_true', help='Her model için sınıflandırma raporunu yazdır')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help='JSON sonuç dosyası')
+    args = parser.parse_args(argv)
+
+    print("Modeller değerlendiriliyor...")
     try:
-        # Modeli yükle
-        model = joblib.load(model_path)
-        print(f"'{model_path}' model dosyası başarıyla yüklendi.")
-
-        # Tahminleri yap (hem sınıf etiketi hem de olasılık)
-        y_pred = model.predict(X_test)
-        # Olasılık tahminleri ROC AUC ve Log Loss için gereklidir
-        try:
-            y_pred_proba = model.predict_proba(X_test)
-            has_proba = True
-        except AttributeError:
-            print("Uyarı: Bu model 'predict_proba' metodunu desteklemiyor. ROC AUC ve Log Loss hesaplanamayacak.")
-            y_pred_proba = None
-            has_proba = False
-
-        # 1. Doğruluk (Accuracy)
-        accuracy = accuracy_score(y_test, y_pred)
-        print(f"1. Doğruluk (Accuracy): {accuracy:.4f}")
-
-        # 2. Sınıflandırma Raporu (Precision, Recall, F1-score içerir)
-        print("\n2. Sınıflandırma Raporu:")
-        # Raporda gösterilecek etiketleri belirle (y_test ve y_pred'de bulunanlar)
-        unique_labels_in_report = np.unique(np.concatenate((y_test, y_pred)))
-        # target_names: Raporda sayısal etiketler yerine gerçek kategori isimlerini gösterir
-        # labels: Rapora dahil edilecek sınıfları belirtir
-        # zero_division=0: Bir sınıfta hiç doğru tahmin yoksa uyarı yerine 0 değeri basar
-        report = classification_report(
-            y_test,
-            y_pred,
-            labels=unique_labels_in_report, # Sadece mevcut etiketleri kullan
-            target_names=label_encoder.classes_[unique_labels_in_report], # Mevcut etiketlere karşılık gelen isimleri kullan
-            zero_division=0
-        )
+        evaluation = evaluate_models(args.models, args.n_jobs, args.report, args.skip_benchmark,
+                                     args.batch_sizes, args.latency_samples)
+    except FileNotFoundError as e:
+        print(f"Hata: Gerekli veri veya model dosyaları bulunamadı ({e}).")
+        print("Lütfen önce 'data_preprocessing.py' ve 'train_models.py' betiklerini çalıştırdığınızdan emin olun.")
+        sys.exit(1)
+
+    reports = {name: result.pop('report') for name, result in evaluation['models'].items() if 'report' in result}
+    print_summary(evaluation)
+    for name, report in reports.items():
+        print(f"\n{MODEL_SPECS[name]['label']} Sınıflandırma Raporu:")
         print(report)
 
-        # 3. Ağırlıklı Ortalama Hassasiyet (Weighted Average Precision)
-        # Çok sınıflı durumda genel bir precision değeri verir, sınıf dengesizliğini dikkate alır.
-        weighted_precision = precision_score(y_test, y_pred, average='weighted', zero_division=0)
-        print(f"3. Ağırlıklı Ortalama Hassasiyet (Weighted Precision): {weighted_precision:.4f}")
-
-        if has_proba:
-            # 4. Log Kaybı (Log Loss)
-            # Modelin tahmin olasılıklarının doğruluğunu ölçer. Daha düşük değer daha iyidir.
-            # labels parametresi, yalnızca y_test ve y_pred içinde bulunan sınıfları dikkate almasını sağlar.
-            try:
-                # unique_labels_in_report, y_test ve y_pred'deki benzersiz kodlanmış etiketleri içerir
-                logloss = log_loss(y_test, y_pred_proba, labels=unique_labels_in_report)
-                print(f"4. Log Kaybı (Log Loss): {logloss:.4f}")
-            except ValueError as e:
-                print(f"Log Loss hesaplanırken hata: {e}")
-                # Bu hata genellikle y_pred_proba'nın sütun sayısıyla unique_labels_in_report'un eşleşmemesinden kaynaklanır,
-                # ancak önceki düzeltmelerle bu durumun oluşmaması gerekir.
-                print("Olası neden: Modelin olasılık tahminlerinin formatında beklenmedik bir durum.")
-
-
-            # 5. ROC AUC Skoru (One-vs-Rest, Ağırlıklı Ortalama)
-            # Modelin sınıfları ne kadar iyi ayırabildiğini ölçer. 1'e yakın olması iyidir.
-            # labels parametresi, yalnızca y_test ve y_pred içinde bulunan sınıfları dikkate almasını sağlar.
-            try:
-                # ROC AUC için y_test'in one-hot encoding'e ihtiyacı olabilir, ancak scikit-learn bunu genellikle predict_proba ile halleder.
-                # unique_labels_in_report, y_test ve y_pred'deki benzersiz kodlanmış etiketleri içerir
-                roc_auc = roc_auc_score(y_test, y_pred_proba, multi_class='ovr', average='weighted', labels=unique_labels_in_report)
-                print(f"5. ROC AUC Skoru (Weighted OvR): {roc_auc:.4f}")
-            except ValueError as e:
-                 print(f"ROC AUC hesaplanırken hata: {e}")
-                 # Bu hata genellikle test setinde tek bir sınıf olması veya labels ile y_pred_proba uyumsuzluğundan kaynaklanır.
-                 print("Olası neden: Test setinde sadece bir sınıf bulunması veya olasılık tahminlerinde sorun.")
-
-        print(f"--- {model_name} Değerlendirmesi Tamamlandı ---")
-
-    except FileNotFoundError:
-        print(f"Hata: {model_path} model dosyası bulunamadı.")
-    except Exception as e:
-        print(f"{model_name} değerlendirilirken bir hata oluştu: {e}")
-
-# --- Modelleri Değerlendirme ---
-print("\nEğitilmiş modeller test verisi üzerinde değerlendiriliyor...")
-
-for model_name, model_path in model_files.items():
-    evaluate_model(model_name, model_path, X_test, y_test, label_encoder)
-
-print("\nTüm modellerin değerlendirilmesi tamamlandı.")
+    # Yarım yazılmış dosya bırakmamak için önce geçici dosyaya yaz
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(f"{args.output}.tmp", 'w', encoding='utf-8') as file:
+        json.dump(evaluation, file, indent=2, ensure_ascii=False)
+    os.replace(f"{args.output}.tmp", args.output)
+    print(f"\nSonuçlar '{args.output}' dosyasına yazıldı.")
+
+if __name__ == '__main__':
+    main()
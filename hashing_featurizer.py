@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Hash Tabanlı TF-IDF Özellikleri
+-------------------------------
+TfidfVectorizer'a alternatif, sözlük tutmayan özellik çıkarıcı. Token ve
+n-gram'lar sabit sayıda sütuna hash'lenir (scikit-learn HashingVectorizer,
+işaret değiştirmeden, böylece sayılar negatif olmaz); eğitimde sadece
+sütun başına IDF ağırlıkları (n_features uzunluğunda float64 dizi)
+öğrenilir. Eğitim sırasında tam unigram + bigram sözlüğü kurulmaz,
+artefakt boyutu veri setinden bağımsızdır ve dönüşümde sözlük araması
+yapılmaz.
+
+TF, IDF ve L2 normu TfidfTransformer ile aynı formül ve sırayla uygulanır.
+Farklı token'lar aynı sütuna düşebilir (çakışma); n_features büyüdükçe
+çakışmalar azalır, model ağırlıkları ise büyür.
+
+data_preprocessing.py --featurizer hashing ile seçilir ve
+'tfidf_vectorizer.joblib' adıyla kaydedilir; eğitim, birleşik çıkarım hattı
+ve web servisi bu nesneyi TfidfVectorizer gibi (transform) kullanır.
+"""
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+# Varsayılan sütun sayısı (2^14): 5000 kelimelik sözlükle benzer model boyutu, az çakışma
+DEFAULT_N_FEATURES = 2 ** 14
+
+class HashingTfidfVectorizer:
+    """Hash'lenmiş token sayılarına öğrenilmiş IDF ağırlıklarını uygulayan vektörleştirici."""
+
+    def __init__(self, n_features=DEFAULT_N_FEATURES, ngram_range=(1, 2), lowercase=True,
+                 norm='l2', use_idf=True, smooth_idf=True, sublinear_tf=False):
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.use_idf = use_idf
+        self.smooth_idf = smooth_idf
+        self.sublinear_tf = sublinear_tf
+        self.idf_ = None
+        self.hasher = HashingVectorizer(
+            n_features=n_features, ngram_range=self.ngram_range, lowercase=lowercase,
+            alternate_sign=False, norm=None, dtype=np.float64
+        )
+
+    def count(self, texts):
+        """Metinlerden hash'lenmiş token sayılarını (CSR) üretir."""
+        return self.hasher.transform(texts)
+
+    def fit(self, texts):
+        """Sadece sütun başına belge frekanslarından IDF ağırlıklarını öğrenir."""
+        self._fit_counts(self.count(texts))
+        return self
+
+    def _fit_counts(self, counts):
+        if self.use_idf:
+            n_samples = counts.shape[0]
+            document_frequency = np.bincount(counts.indices, minlength=self.n_features).astype(np.float64)
+            # TfidfTransformer ile aynı formül: log((1 + n) / (1 + df)) + 1
+            n_samples += int(self.smooth_idf)
+            document_frequency += int(self.smooth_idf)
+            self.idf_ = np.log(n_samples / document_frequency) + 1
+        return counts
+
+    def transform(self, texts):
+        """Metinlerden TF-IDF CSR matrisini üretir."""
+        return self._weight(self.count(texts))
+
+    def fit_transform(self, texts):
+        return self._weight(self._fit_counts(self.count(texts)))
+
+    def _weight(self, counts):
+        X = sp.csr_matrix(counts, dtype=np.float64)
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.use_idf:
+            X.data *= self.idf_[X.indices]
+        if self.norm is not None:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
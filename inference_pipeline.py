@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Birleşik Çıkarım Hattı
+----------------------
+Servis tarafında ayrı ayrı yüklenen normalizasyon, TF-IDF vektörleştirici,
+model ve etiket kodlayıcı zincirini tek bir joblib artefaktında birleştirir.
+
+Naive Bayes ve Lojistik Regresyon için (düzeltmeler uygulandıktan sonra
+lojistik regresyonun yerini alan log_loss SGDClassifier dahil) model
+ağırlıkları sözlük -> sınıf satırları (kelime sayısı x sınıf, C sıralı) olarak önceden hazırlanır; bir
+ürünün skorları, TF-IDF değerleriyle bu satırların seyrek toplamıdır.
+Sınıf isimleri artefaktın içindedir. Tokenizasyon ve sözlük araması tüm
+isimler için tek geçişte yapılır, sayılar NumPy ile toplanır ve
+CountVectorizer/TfidfTransformer/inverse_transform ara nesneleri oluşmaz.
+
+TF-IDF ağırlığı ve L2 normu scikit-learn ile aynı işlem sırasıyla
+uygulanır; bu sayede skorlar (ve tahminler) mevcut zincirle bit düzeyinde
+aynıdır. Hash tabanlı özellikler (hashing_featurizer.HashingTfidfVectorizer)
+seçildiyse sözlük yoktur; vektörleştirme hash'leyicinin kendisine
+bırakılır. Karar ağacı gibi doğrusal olmayan modellerde aynı vektörleştirme
+kullanılır, tahmin modelin kendisine bırakılır.
+
+Kullanım:
+    python inference_pipeline.py                 # Tüm modeller için models/*_pipeline.joblib üret
+    python inference_pipeline.py --models naive_bayes
+"""
+import os
+import re
+import argparse
+import itertools
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import expit, logsumexp
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.preprocessing import normalize
+
+from hashing_featurizer import HashingTfidfVectorizer
+from text_normalizer import normalize_product_names
+
+# --- Ayarlar ---
+PROCESSED_DATA_DIR = 'processed_data'
+MODELS_DIR = 'models'
+
+# Artefakt biçim sürümü; hatta yeni alan eklendiğinde artırılır, eski artefaktlar kullanılmaz
+PIPELINE_FORMAT_VERSION = 3
+
+# Birleşik hattın desteklediği vektörleştirici ayarları (diğerleri mevcut davranışı değiştirir)
+SUPPORTED_VECTORIZER_PARAMS = {
+    'analyzer': 'word',
+    'binary': False,
+    'preprocessor': None,
+    'tokenizer': None,
+    'stop_words': None,
+    'strip_accents': None
+}
+
+def top_k_indices(scores, k):
+    """Her satır için en yüksek k skorun sütun indekslerini azalan sırada döndürür.
+
+    Tam sıralama yerine np.argpartition kullanılır; sadece seçilen k sütun
+    sıralanır. Eşit skorlarda küçük indeks önce gelir, böylece ilk sütun
+    her zaman argmax (predict) ile aynıdır.
+    """
+    n_rows, n_classes = scores.shape
+    k = min(k, n_classes)
+    if k < n_classes:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n_classes), (n_rows, n_classes))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    # Önce skora (azalan), eşitlikte indekse (artan) göre sırala
+    order = np.lexsort((candidates, -candidate_scores), axis=1)
+    top = np.take_along_axis(candidates, order, axis=1)
+
+    # argpartition eşit skorlar arasında rastgele seçebilir; argmax ile uyuşmayan
+    # (sadece eşitlik durumunda oluşan) satırlar tam kararlı sıralamayla düzeltilir
+    mismatched = np.flatnonzero(top[:, 0] != scores.argmax(axis=1))
+    if len(mismatched):
+        top[mismatched] = np.argsort(-scores[mismatched], axis=1, kind='stable')[:, :k]
+    return top
+
+def top_k_predictions(scores, probabilities, class_names, k):
+    """Skorlara göre seçilen ilk k sınıfı (kategori, olasılık) listeleri olarak döndürür."""
+    top = top_k_indices(scores, k)
+    top_probabilities = np.take_along_axis(probabilities, top, axis=1).tolist()
+    top_names = class_names[top].tolist()
+    return [list(zip(names, values)) for names, values in zip(top_names, top_probabilities)]
+
+def pipeline_filename(model_name):
+    """Model adına karşılık gelen birleşik hat dosya adını döndürür."""
+    return f"{model_name}_pipeline.joblib"
+
+class FusedInferencePipeline:
+    """Ham ürün isimlerinden kategori isimlerine tek çağrıda tahmin yapan hat."""
+
+    def __init__(self, vectorizer, label_encoder, model):
+        self.format_version = PIPELINE_FORMAT_VERSION
+
+        if isinstance(vectorizer, HashingTfidfVectorizer):
+            # Hash tabanlı özellikler: sözlük yok, sütun sayısı sabit
+            self.featurizer = vectorizer
+            self.n_features = vectorizer.n_features
+        else:
+            self.featurizer = None
+            self._init_vocabulary(vectorizer)
+
+        # Sınıf isimleri: modelin sınıf sırası -> kategori adı
+        self.label_names = np.asarray(label_encoder.classes_, dtype=object)
+        self.class_names = self.label_names[model.classes_]
+
+        # Doğrusal modellerde ağırlıklar sözlük -> sınıf satırları olarak saklanır
+        if isinstance(model, MultinomialNB):
+            self.kind = 'linear'
+            # Skorlar ortak log olasılıklardır: olasılık = exp(skor - logsumexp(skor))
+            self.probability = 'log_joint'
+            self.weights = np.ascontiguousarray(model.feature_log_prob_.T, dtype=np.float64)
+            self.bias = np.asarray(model.class_log_prior_, dtype=np.float64)
+            self.estimator = None
+        elif isinstance(model, LogisticRegression) and model.coef_.shape[0] == len(model.classes_):
+            self.kind = 'linear'
+            # Çok sınıflı lojistik regresyonda olasılıklar skorların softmax'ıdır
+            self.probability = 'softmax'
+            self.weights = np.ascontiguousarray(model.coef_.T, dtype=np.float64)
+            self.bias = np.asarray(model.intercept_, dtype=np.float64)
+            self.estimator = None
+        elif (isinstance(model, SGDClassifier) and model.loss == 'log_loss'
+              and model.coef_.shape[0] == len(model.classes_)):
+            self.kind = 'linear'
+            # online_learning'in dönüştürdüğü model: olasılıklar sınıf başına sigmoid, satır toplamına bölünür (OvR)
+            self.probability = 'ovr'
+            self.weights = np.ascontiguousarray(model.coef_.T, dtype=np.float64)
+            self.bias = np.asarray(model.intercept_, dtype=np.float64)
+            self.estimator = None
+        else:
+            self.kind = 'estimator'
+            self.probability = 'estimator'
+            self.weights = None
+            self.bias = None
+            self.estimator = model
+
+    def _init_vocabulary(self, vectorizer):
+        """TfidfVectorizer'ın sözlüğünü, idf değerlerini ve tokenizasyon ayarlarını alır."""
+        params = vectorizer.get_params()
+        unsupported = {key: params[key] for key, value in SUPPORTED_VECTORIZER_PARAMS.items() if params[key] != value}
+        if unsupported:
+            raise ValueError(f"Desteklenmeyen vektörleştirici ayarları: {unsupported}")
+
+        self.vocabulary = {term: int(index) for term, index in vectorizer.vocabulary_.items()}
+        self.n_features = len(self.vocabulary)
+        self.idf = np.asarray(vectorizer.idf_, dtype=np.float64) if vectorizer.use_idf else None
+        self.norm = vectorizer.norm
+        self.sublinear_tf = vectorizer.sublinear_tf
+        self.lowercase = vectorizer.lowercase
+        self.ngram_range = tuple(vectorizer.ngram_range)
+        self.token_pattern = re.compile(vectorizer.token_pattern)
+
+    # --- Vektörleştirme ---
+    def _analyze(self, text):
+        """TfidfVectorizer 'word' analizörünün aynısı: tokenlar ve n-gramlar."""
+        if self.lowercase:
+            text = text.lower()
+        tokens = self.token_pattern.findall(text)
+        min_n, max_n = self.ngram_range
+        if (min_n, max_n) == (1, 2):
+            # En sık kullanılan ayar için hızlı yol
+            tokens.extend([f"{first} {second}" for first, second in zip(tokens, tokens[1:])])
+            return tokens
+        features = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            features.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return features
+
+    def vectorize(self, names):
+        """Normalize edilmiş isimlerden TF-IDF CSR matrisini tek geçişte üretir."""
+        if self.featurizer is not None:
+            return self.featurizer.transform(names)
+        vocabulary_get = self.vocabulary.get
+        not_found = itertools.repeat(-1)
+        feature_ids = []
+        lengths = []
+        for name in names:
+            # Sözlük araması C seviyesinde (map + dict.get); sözlükte olmayanlar -1.
+            # N-gram metinleri hemen bırakılır, sadece sözlükteki int nesnelerine referans tutulur.
+            document_features = self._analyze(name)
+            feature_ids.extend(map(vocabulary_get, document_features, not_found))
+            lengths.append(len(document_features))
+
+        feature_ids = np.array(feature_ids, dtype=np.int64)
+        document_ids = np.repeat(np.arange(len(names), dtype=np.int64), lengths)
+        in_vocabulary = feature_ids >= 0
+        document_ids = document_ids[in_vocabulary]
+        feature_ids = feature_ids[in_vocabulary]
+
+        # (belge, özellik) çiftlerini say; np.unique sonucu belge ve sütun sırasına göre sıralıdır
+        keys = document_ids * self.n_features + feature_ids
+        keys, counts = np.unique(keys, return_counts=True)
+        rows, indices = np.divmod(keys, self.n_features)
+        indptr = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(names)), out=indptr[1:])
+
+        data = counts.astype(np.float64)
+        if self.sublinear_tf:
+            np.log(data, data)
+            data += 1.0
+        if self.idf is not None:
+            data *= self.idf[indices]
+        X = sp.csr_matrix((data, indices.astype(np.int32), indptr.astype(np.int32)), shape=(len(names), self.n_features))
+        if self.norm is not None:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
+
+    # --- Tahmin ---
+    def decision_scores(self, names):
+        """Doğrusal modeller için sınıf skorlarını (seyrek satır toplamı + sabit) döndürür."""
+        if self.kind != 'linear':
+            raise TypeError('Skorlar sadece doğrusal modeller için hesaplanabilir')
+        scores = self.vectorize(names) @ self.weights
+        scores += self.bias
+        return scores
+
+    def predict_indices_normalized(self, names):
+        """Tahminleri (indeksler, isim dizisi) olarak döndürür; isim_dizisi[indeksler] kategori isimleridir.
+
+        Süreçler arasında kategori metinleri yerine küçük tamsayı dizileri
+        taşınabilsin diye predict_normalized bu fonksiyonun üzerine kuruludur.
+        """
+        if self.kind == 'linear':
+            return self.decision_scores(names).argmax(axis=1), self.class_names
+        return self.estimator.predict(self.vectorize(names)), self.label_names
+
+    def top_k_indices_normalized(self, names, k):
+        """En olası k sınıfın class_names indekslerini ve olasılıklarını (n, k) diziler olarak döndürür."""
+        if self.kind == 'linear':
+            scores = self.decision_scores(names)
+            if self.probability == 'log_joint':
+                probabilities = np.exp(scores - logsumexp(scores, axis=1, keepdims=True))
+            elif self.probability == 'ovr':
+                probabilities = expit(scores)
+                probabilities /= probabilities.sum(axis=1, keepdims=True)
+            else:
+                probabilities = np.exp(scores - scores.max(axis=1, keepdims=True))
+                probabilities /= probabilities.sum(axis=1, keepdims=True)
+        else:
+            scores = probabilities = self.estimator.predict_proba(self.vectorize(names))
+        top = top_k_indices(scores, k)
+        return top, np.take_along_axis(probabilities, top, axis=1)
+
+    def predict_normalized(self, names):
+        """normalize_product_name uygulanmış isimler için kategori isimlerini döndürür."""
+        if not names:
+            return []
+        indices, class_names = self.predict_indices_normalized(names)
+        return class_names[indices].tolist()
+
+    def predict_top_k_normalized(self, names, k):
+        """Her isim için en olası k kategoriyi (kategori, olasılık) listesi olarak döndürür.
+
+        Skorlar ve olasılıklar tek geçişte hesaplanır; ilk eleman her zaman
+        predict_normalized sonucuyla aynıdır.
+        """
+        if not names:
+            return []
+        top, probabilities = self.top_k_indices_normalized(names, k)
+        return [list(zip(categories, values)) for categories, values in zip(self.class_names[top].tolist(), probabilities.tolist())]
+
+    def predict(self, products):
+        """Ham ürün isimlerinden kategori isimlerini döndürür."""
+        return self.predict_normalized(normalize_product_names(products))
+
+def export_pipelines(model_names, processed_data_dir=PROCESSED_DATA_DIR, models_dir=MODELS_DIR):
+    """Kayıtlı model artefaktlarından birleşik hatları üretip kaydeder."""
+    vectorizer = joblib.load(os.path.join(processed_data_dir, 'tfidf_vectorizer.joblib'))
+    label_encoder = joblib.load(os.path.join(processed_data_dir, 'label_encoder.joblib'))
+
+    exported = {}
+    for model_name in model_names:
+        model = joblib.load(os.path.join(models_dir, f"{model_name}_model.joblib"))
+        pipeline = FusedInferencePipeline(vectorizer, label_encoder, model)
+        path = os.path.join(models_dir, pipeline_filename(model_name))
+        # Yarım yazılmış dosya bırakmamak için önce geçici dosyaya yaz
+        joblib.dump(pipeline, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        exported[model_name] = path
+    return exported
+
+def main():
+    model_names = ['naive_bayes', 'decision_tree', 'logistic_regression']
+    parser = argparse.ArgumentParser(description='Modeller için birleşik çıkarım hattı artefaktı üretir.')
+    parser.add_argument('--models', nargs='+', choices=model_names, default=model_names)
+    args = parser.parse_args()
+
+    for model_name, path in export_pipelines(args.models).items():
+        print(f"{model_name}: '{path}' kaydedildi.")
+
+if __name__ == '__main__':
+    # Hatlar '__main__.FusedInferencePipeline' olarak değil, modül yoluyla kaydedilmeli
+    import inference_pipeline
+    inference_pipeline.main()
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+İş Kuyruğu
+----------
+Uzun süren istekleri (milyonlarca satırlık toplu tahmin, raf optimizasyonu)
+Flask istek iş parçacığının dışında, bir süreç havuzunda çalıştırır.
+
+İş kayıtları (durum, ilerleme, hata, zaman bilgileri) bir SQLite
+veritabanında tutulur; her iş süreci ilerlemesini aynı veritabanına yazar
+ve iptal isteğini oradan okur. Girdi dosyası ve JSON sonucu iş dizininde
+saklanır, böylece sonuçlar sunucu yeniden başlatılsa da tekrar
+indirilebilir. Bekleyen ve çalışan iş sayısı sınırlıdır; sınır aşılırsa
+submit JobQueueFull fırlatır (web tarafında 429). Harici bir aracı
+(broker) gerekmez.
+
+İş fonksiyonları modül seviyesinde tanımlanmalıdır (süreçlere isimle
+aktarılırlar) ve handler(context, input_path, params) imzasına sahip
+olmalıdır; context.report(progress, stage) hem ilerlemeyi kaydeder hem de
+iş iptal edildiyse JobCancelled fırlatır.
+
+Havuz, istek iş parçacıkları ve arka plan iş parçacıkları çalışırken
+oluşturulduğu için fork kullanılmaz (başka bir iş parçacığının tuttuğu
+kilitler alt süreçte sonsuza kadar kilitli kalabilir): işçiler forkserver
+(yoksa spawn) ile temiz bir süreçte başlar, artefaktları initializer ile
+kendileri (bellek eşlemeli) yükler.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import threading
+import functools
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# --- Ayarlar ---
+# Aynı anda kuyrukta bekleyen veya çalışan en fazla iş sayısı
+DEFAULT_MAX_PENDING = 16
+# Tamamlanan işlerin (kayıt, girdi ve sonuç dosyası) saklanma süresi
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 3600
+# İlerleme bilgisinin veritabanına en sık yazılma aralığı (saniye)
+PROGRESS_WRITE_INTERVAL = 0.5
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINAL_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+DATABASE_FILENAME = 'jobs.sqlite3'
+INPUT_FILENAME = 'input'
+RESULT_FILENAME = 'result.json'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    stage TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner_pid INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+class JobQueueFull(Exception):
+    """Kuyruktaki iş sayısı sınıra ulaştığında fırlatılır."""
+
+class JobCancelled(Exception):
+    """Çalışan iş iptal edildiğinde context.report tarafından fırlatılır."""
+
+# --- Veritabanı Yardımcıları ---
+@contextlib.contextmanager
+def _connect(db_path):
+    """Otomatik commit modunda kısa ömürlü bir SQLite bağlantısı açar."""
+    connection = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+def _finish(db_path, job_id, status, error=None):
+    """Aktif bir işi verilen son duruma geçirir; iş zaten bitmişse değiştirmez."""
+    with _connect(db_path) as connection:
+        connection.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, "
+            "progress = CASE WHEN ? = 'succeeded' THEN 1.0 ELSE progress END "
+            "WHERE id = ? AND status IN ('queued', 'running')",
+            (status, error, time.time(), status, job_id)
+        )
+
+def _job_dir(jobs_dir, job_id):
+    return os.path.join(jobs_dir, job_id)
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# --- İş Süreci Tarafı ---
+class JobContext:
+    """Çalışan işin ilerlemesini kaydeder ve iptal isteğini kontrol eder."""
+
+    def __init__(self, db_path, job_id):
+        self.db_path = db_path
+        self.job_id = job_id
+        self._last_write = 0.0
+        self._stage = None
+
+    def report(self, progress=None, stage=None):
+        """İlerlemeyi (0-1) ve aşama adını yazar; iş iptal edildiyse JobCancelled fırlatır.
+
+        Aşama değişmediyse en fazla PROGRESS_WRITE_INTERVAL saniyede bir yazılır.
+        """
+        now = time.monotonic()
+        if (stage is None or stage == self._stage) and now - self._last_write < PROGRESS_WRITE_INTERVAL:
+            return
+        self._last_write = now
+        self._stage = stage or self._stage
+        with _connect(self.db_path) as connection:
+            connection.execute(
+                "UPDATE jobs SET progress = COALESCE(?, progress), stage = COALESCE(?, stage) WHERE id = ?",
+                (None if progress is None else min(max(float(progress), 0.0), 1.0), stage, self.job_id)
+            )
+            row = connection.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.job_id,)).fetchone()
+        if row is None or row['cancel_requested']:
+            raise JobCancelled()
+
+def _run_job(db_path, jobs_dir, job_id, handler, params):
+    """Süreç havuzunda çalışır: işi başlatır, sonucu diske yazar ve son durumu kaydeder."""
+    with _connect(db_path) as connection:
+        # Kuyrukta beklerken iptal edilen işler hiç başlatılmaz
+        started = connection.execute(
+            "UPDATE jobs SET status = 'running', started_at = ? "
+            "WHERE id = ? AND status = 'queued' AND cancel_requested = 0",
+            (time.time(), job_id)
+        ).rowcount
+    if not started:
+        return
+
+    job_dir = _job_dir(jobs_dir, job_id)
+    try:
+        result = handler(JobContext(db_path, job_id), os.path.join(job_dir, INPUT_FILENAME), params)
+        # Yarım yazılmış sonuç dosyası bırakmamak için önce geçici dosyaya yaz
+        result_path = os.path.join(job_dir, RESULT_FILENAME)
+        with open(f"{result_path}.tmp", 'w', encoding='utf-8') as file:
+            json.dump(result, file, ensure_ascii=False)
+        os.replace(f"{result_path}.tmp", result_path)
+        _finish(db_path, job_id, 'succeeded')
+    except JobCancelled:
+        _finish(db_path, job_id, 'cancelled')
+    except Exception as e:
+        _finish(db_path, job_id, 'failed', error=str(e))
+
+# --- Kuyruk ---
+class JobQueue:
+    """SQLite kayıtlı, süreç havuzunda çalışan ve sınırlı derinlikli iş kuyruğu."""
+
+    def __init__(self, jobs_dir, max_workers=None, max_pending=DEFAULT_MAX_PENDING,
+                 retention_seconds=DEFAULT_RETENTION_SECONDS, initializer=None):
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        # Her işçi sürecinde bir kez çağrılır (modül seviyesinde tanımlı olmalı)
+        self.initializer = initializer
+        self.db_path = os.path.join(jobs_dir, DATABASE_FILENAME)
+        self._handlers = {}
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(jobs_dir, exist_ok=True)
+        with _connect(self.db_path) as connection:
+            # WAL modu, işler ilerleme yazarken okumaların beklemesini önler
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(SCHEMA)
+        self._recover_orphans()
+
+    def register(self, kind, handler):
+        """Bir iş türü için (modül seviyesinde tanımlı) çalıştırıcı fonksiyonu kaydeder."""
+        self._handlers[kind] = handler
+
+    def _recover_orphans(self):
+        """Sahibi olan süreç artık çalışmayan aktif işleri başarısız olarak işaretler."""
+        with _connect(self.db_path) as connection:
+            rows = connection.execute(
+                "SELECT id, owner_pid FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        for row in rows:
+            if not _pid_alive(row['owner_pid']):
+                _finish(self.db_path, row['id'], 'failed', error='Sunucu yeniden başlatıldığı için iş yarıda kaldı')
+
+    def _purge_expired(self):
+        """Saklama süresi dolan işlerin kayıtlarını ve dosyalarını siler."""
+        cutoff = time.time() - self.retention_seconds
+        with _connect(self.db_path) as connection:
+            expired = [row['id'] for row in connection.execute(
+                "SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            )]
+            connection.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in expired])
+        for job_id in expired:
+            shutil.rmtree(_job_dir(self.jobs_dir, job_id), ignore_errors=True)
+
+    def _get_executor(self):
+        if self._executor is None:
+            # Çok iş parçacıklı süreçten fork güvenli değil; işçiler temiz süreçte başlar
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                                 initializer=self.initializer)
+        return self._executor
+
+    def active_count(self):
+        with _connect(self.db_path) as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+
+    # --- İş Gönderme ve İzleme ---
+    def submit(self, kind, params, save_input=None):
+        """Yeni iş oluşturur ve iş kimliğini döndürür; kuyruk doluysa JobQueueFull fırlatır.
+
+        save_input verilirse girdi dosyasının yolu ile çağrılır (ör. yüklenen
+        dosyayı diske kaydetmek için).
+        """
+        handler = self._handlers[kind]
+        with self._lock:
+            self._purge_expired()
+            if self.active_count() >= self.max_pending:
+                raise JobQueueFull(f'Kuyrukta en fazla {self.max_pending} iş bekleyebilir')
+
+            job_id = uuid.uuid4().hex
+            job_dir = _job_dir(self.jobs_dir, job_id)
+            os.makedirs(job_dir)
+            if save_input is not None:
+                save_input(os.path.join(job_dir, INPUT_FILENAME))
+
+            with _connect(self.db_path) as connection:
+                connection.execute(
+                    "INSERT INTO jobs (id, kind, status, params, owner_pid, created_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                    (job_id, kind, json.dumps(params, ensure_ascii=False), os.getpid(), time.time())
+                )
+            try:
+                future = self._get_executor().submit(_run_job, self.db_path, self.jobs_dir, job_id, handler, params)
+            except BrokenProcessPool:
+                # Bir işçi süreci öldüyse havuzu yeniden kur
+                self._executor = None
+                future = self._get_executor().submit(_run_job, self.db_path, self.jobs_dir, job_id, handler, params)
+            self._futures[job_id] = future
+        future.add_done_callback(functools.partial(self._on_done, job_id))
+        return job_id
+
+    def _on_done(self, job_id, future):
+        """Süreç dışında sonlanan (iptal edilen veya çöken) işlerin durumunu düzeltir."""
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            _finish(self.db_path, job_id, 'cancelled')
+            return
+        error = future.exception()
+        if error is not None:
+            if isinstance(error, BrokenProcessPool):
+                with self._lock:
+                    self._executor = None
+            _finish(self.db_path, job_id, 'failed', error=f'İş süreci beklenmedik şekilde sonlandı: {error}')
+
+    def get(self, job_id):
+        """İş kaydını sözlük olarak döndürür; iş yoksa None döner."""
+        with _connect(self.db_path) as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def list(self, limit=50):
+        """En yeni işleri döndürür."""
+        with _connect(self.db_path) as connection:
+            rows = connection.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def cancel(self, job_id):
+        """İşi iptal eder: bekleyen iş hemen, çalışan iş bir sonraki ilerleme raporunda durur."""
+        with _connect(self.db_path) as connection:
+            connection.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN ('queued', 'running')", (job_id,)
+            )
+            connection.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+        return self.get(job_id)
+
+    def result_path(self, job_id):
+        """Tamamlanan işin sonuç dosyasının yolunu döndürür."""
+        return os.path.join(_job_dir(self.jobs_dir, job_id), RESULT_FILENAME)
+
+    def stats(self):
+        """Durumlara göre iş sayılarını ve kuyruk ayarlarını döndürür."""
+        with _connect(self.db_path) as connection:
+            counts = dict(connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            'counts': {status: counts.get(status, 0) for status in ACTIVE_STATUSES + FINAL_STATUSES},
+            'max_pending': self.max_pending,
+            'max_workers': self.max_workers
+        }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        del job['owner_pid']
+        return job
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Hafif Ölçüm (Metrik) Altyapısı
+------------------------------
+Tahmin ve raf optimizasyonu hatlarının aşama sürelerini ve işlenen öğe
+sayılarını toplar, Prometheus metin biçiminde (/metrics) dışa aktarır.
+
+    with span('association.mine'):     # Süre -> stage_duration_seconds{stage=...}
+        ...
+    count('products', len(products))   # Sayı -> pipeline_items_total{kind=...}
+
+Her kayıt iki perf_counter çağrısı ve kilit altında birkaç toplamadan
+ibarettir; üretimde açık bırakılabilir. Bir istek için RequestTrace
+etkinleştirildiyse aynı süre ve sayılar o isteğin dökümüne de eklenir
+(contextvars ile; iş parçacıkları birbirini etkilemez).
+
+Metrikler süreç başınadır: birden çok gunicorn işçisinde her kazıma
+(scrape) yanıt veren işçinin sayılarını döndürür.
+"""
+import time
+import bisect
+import threading
+import contextlib
+import contextvars
+
+# Metrik isimlerinin ön eki
+NAMESPACE = 'market'
+# Süre histogramlarının varsayılan kova sınırları (saniye)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# --- Metrik Türleri ---
+class Counter:
+    """Etiket değerleri başına artan sayaç."""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(f"{self.name}_total", _format_labels(self.labelnames, labels), value)
+                for labels, value in sorted(values.items())]
+
+class Gauge:
+    """Kazıma anında bir fonksiyondan okunan değerler ({etiket demeti: değer})."""
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+
+    def samples(self):
+        values = self.function() if self.function is not None else {}
+        return [(self.name, _format_labels(self.labelnames, labels), value)
+                for labels, value in sorted(values.items())]
+
+class Histogram:
+    """Sabit kovalı süre histogramı (kova sayıları, toplam ve adet)."""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                # Kova sayıları (son eleman +Inf), toplam, adet
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {labels: (list(counts), total, n) for labels, (counts, total, n) in self._values.items()}
+        samples = []
+        for labels, (counts, total, n) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket",
+                                _format_labels(self.labelnames, labels, [('le', _format_value(bound))]), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, labels), total))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, labels), n))
+        return samples
+
+class MetricsRegistry:
+    """Metrikleri isimleriyle tutar ve Prometheus metin biçiminde yazar."""
+
+    def __init__(self, namespace=NAMESPACE):
+        self.namespace = namespace
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name, *args, **kwargs):
+        full_name = f"{self.namespace}_{name}" if self.namespace else name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = metric_class(full_name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self._register(Gauge, name, documentation, labelnames, function)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self):
+        """Tüm metrikleri Prometheus metin biçiminde (0.0.4) döndürür."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram('stage_duration_seconds', 'Hat aşamalarının süresi (saniye)', ['stage'])
+ITEMS = REGISTRY.counter('pipeline_items', 'Hat aşamalarında işlenen öğe sayısı', ['kind'])
+
+# --- İstek Dökümü ---
+_current_trace = contextvars.ContextVar('request_trace', default=None)
+
+class RequestTrace:
+    """Bir isteğin aşama sürelerini (ms, tekrarlananlar toplanır) ve öğe sayılarını biriktirir."""
+
+    def __init__(self):
+        self.stages_ms = {}
+        self.counts = {}
+        self._start = time.perf_counter()
+
+    def add_stage(self, stage, seconds):
+        self.stages_ms[stage] = self.stages_ms.get(stage, 0.0) + seconds * 1000
+
+    def add_count(self, kind, amount):
+        self.counts[kind] = self.counts.get(kind, 0) + amount
+
+    def report(self):
+        return {
+            'stages_ms': {stage: round(value, 3) for stage, value in self.stages_ms.items()},
+            'counts': dict(self.counts),
+            'total_ms': round((time.perf_counter() - self._start) * 1000, 3)
+        }
+
+def start_request_trace(enabled=True):
+    """Bu bağlam için yeni bir istek dökümü başlatır (enabled=False önceki dökümü kapatır)."""
+    trace = RequestTrace() if enabled else None
+    _current_trace.set(trace)
+    return trace
+
+def current_trace():
+    """Etkin istek dökümünü döndürür; yoksa None."""
+    return _current_trace.get()
+
+# --- Kayıt Fonksiyonları ---
+def observe_stage(stage, seconds):
+    """Ölçülmüş bir aşama süresini histograma ve etkin istek dökümüne ekler."""
+    STAGE_SECONDS.observe(seconds, stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_stage(stage, seconds)
+
+@contextlib.contextmanager
+def span(stage):
+    """Bloğun süresini aşama olarak kaydeder (hata durumunda da)."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start_time)
+
+def count(kind, amount=1):
+    """İşlenen öğe sayısını sayaca ve etkin istek dökümüne ekler."""
+    ITEMS.inc(amount, kind)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_count(kind, amount)
+
+def timed_iter(iterable, stage, kind=None):
+    """Öğeleri aynen geçirir; sadece next() içinde geçen süreyi (okuma/ayrıştırma) aşama olarak kaydeder.
+
+    Tüketici tarafındaki işler (ör. tahmin) süreye dahil edilmez. kind
+    verilirse üretilen öğe sayısı da sayılır.
+    """
+    iterator = iter(iterable)
+    elapsed = 0.0
+    produced = 0
+    try:
+        while True:
+            start_time = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start_time
+                return
+            elapsed += time.perf_counter() - start_time
+            produced += 1
+            yield item
+    finally:
+        observe_stage(stage, elapsed)
+        if kind is not None:
+            count(kind, produced)
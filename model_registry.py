@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+"""
+Model Kayıt Defteri
+-------------------
+Joblib artefaktlarını ilk kullanımda yükleyen, NumPy dizilerini
+`mmap_mode='r'` ile bellek eşlemeli açan ve her model için yükleme
+süresi ile bellek kullanımını raporlayan kayıt defteri.
+
+Bellek eşlemeli diziler işletim sisteminin sayfa önbelleğinden okunduğu
+için aynı makinedeki gunicorn işçileri bu sayfaları paylaşır. Bir
+artefakt eksik veya bozuksa sadece o model kullanılamaz hale gelir;
+diğer modeller hizmet vermeye devam eder.
+
+ModelHolder, kayıt defterlerini sürümlü bir küme (ModelSet) olarak tutar;
+artefakt dosyaları değiştiğinde yeni kümeyi arka planda yükleyip atomik
+olarak takas eder. ModelSetView, güncel kümedeki bir kayıt defterine
+yönlendiren ve kayıt defteri gibi kullanılabilen görünümdür.
+"""
+import os
+import time
+import inspect
+import weakref
+import functools
+import threading
+import contextlib
+import contextvars
+
+import joblib
+
+# Bellek ölçümü için sayfa boyutu (Linux /proc/self/statm sayfa cinsindendir)
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+def current_rss_bytes():
+    """İşlemin güncel yerleşik bellek (RSS) miktarını bayt olarak döndürür."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        # /proc olmayan sistemlerde ölçüm yapılamaz
+        return None
+
+def _file_signature(path):
+    """Dosyanın değişip değişmediğini anlamak için (mtime, boyut) döndürür."""
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+class ModelUnavailableError(LookupError):
+    """İstenen artefakt yüklenemediğinde fırlatılır."""
+
+class ModelRegistry:
+    """İsim -> joblib dosyası eşlemesinden tembel (lazy) yükleme yapan kayıt defteri.
+
+    `registry[name]` artefaktı ilk erişimde yükler, `name in registry`
+    artefaktın kullanılabilir olup olmadığını dosyayı yüklemeden kontrol eder.
+    """
+
+    def __init__(self, artifact_paths, mmap_mode='r'):
+        self.artifact_paths = dict(artifact_paths)
+        self.mmap_mode = mmap_mode
+        self._objects = {}
+        self._load_info = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+        self._name_locks = {name: threading.Lock() for name in self.artifact_paths}
+
+    # --- Erişim ---
+    def __contains__(self, name):
+        if name not in self.artifact_paths:
+            return False
+        if name in self._objects:
+            return True
+        signature = _file_signature(self.artifact_paths[name])
+        if signature is None:
+            return False
+        # Aynı dosya daha önce yüklenemediyse tekrar deneme
+        error = self._errors.get(name)
+        return error is None or error['signature'] != signature
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def __iter__(self):
+        return iter(self.artifact_paths)
+
+    def __len__(self):
+        return len(self.artifact_paths)
+
+    def names(self):
+        """Kayıtlı artefakt isimlerini döndürür."""
+        return list(self.artifact_paths)
+
+    def get(self, name):
+        """Artefaktı döndürür; henüz yüklenmediyse yükler."""
+        obj = self._objects.get(name)
+        if obj is not None:
+            return obj
+        if name not in self.artifact_paths:
+            raise ModelUnavailableError(f"Bilinmeyen artefakt: {name}")
+
+        # Farklı modeller paralel yüklenebilsin diye isim bazlı kilit
+        with self._name_locks[name]:
+            obj = self._objects.get(name)
+            if obj is None:
+                obj = self._load(name)
+        return obj
+
+    def _load(self, name):
+        path = self.artifact_paths[name]
+        signature = _file_signature(path)
+        rss_before = current_rss_bytes()
+        start_time = time.perf_counter()
+        try:
+            obj = joblib.load(path, mmap_mode=self.mmap_mode)
+        except Exception as e:
+            with self._lock:
+                self._errors[name] = {'signature': signature, 'message': f"{type(e).__name__}: {e}"}
+            raise ModelUnavailableError(f"{name} yüklenemedi: {e}") from e
+
+        load_seconds = time.perf_counter() - start_time
+        rss_after = current_rss_bytes()
+        with self._lock:
+            self._objects[name] = obj
+            self._errors.pop(name, None)
+            self._load_info[name] = {
+                'load_seconds': load_seconds,
+                'rss_delta_bytes': rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+                'file_size_bytes': signature[1] if signature else None,
+                'mmap_mode': self.mmap_mode
+            }
+        return obj
+
+    def preload(self, names=None):
+        """Verilen (varsayılan: tüm) artefaktları yükler; yüklenemeyenleri döndürür."""
+        failed = []
+        for name in names or self.artifact_paths:
+            try:
+                self.get(name)
+            except ModelUnavailableError:
+                failed.append(name)
+        return failed
+
+    def loaded_names(self):
+        """Yüklenmiş artefakt isimlerini döndürür."""
+        with self._lock:
+            return list(self._objects)
+
+    # --- Durum ---
+    def status(self):
+        """Her artefakt için yükleme durumu, süresi ve bellek bilgisini döndürür."""
+        with self._lock:
+            status = {}
+            for name, path in self.artifact_paths.items():
+                entry = {
+                    'path': path,
+                    'loaded': name in self._objects,
+                    'available': name in self
+                }
+                entry.update(self._load_info.get(name, {}))
+                if name in self._errors:
+                    entry['error'] = self._errors[name]['message']
+                status[name] = entry
+            return status
+
+# --- Sürümlü Model Kümeleri ---
+class ModelSet:
+    """Birlikte yüklenen kayıt defterleri (ör. işlemciler, modeller, hatlar) ve sürümleri."""
+
+    def __init__(self, version, registries):
+        self.version = version
+        self.registries = dict(registries)
+        self.loaded_at = time.time()
+
+    def loaded_names(self):
+        """Kayıt defteri adı -> yüklenmiş artefakt isimleri."""
+        return {name: registry.loaded_names() for name, registry in self.registries.items()}
+
+class ModelHolder:
+    """Güncel model kümesini tutan, dosyalar değişince yenisini yükleyip atomik olarak takas eden tutucu.
+
+    `signature()` artefakt dosyalarından bir sürüm dizesi üretir;
+    `load(version, previous)` o sürüm için yeni bir ModelSet döndürür. İzleyici
+    iş parçacığı sürümü poll_interval saniyede bir kontrol eder; değiştiyse
+    yeni küme tamamen yüklendikten sonra tek bir atamayla devreye alınır.
+
+    `pin()` (veya `pinned` dekoratörü) bir isteği çağrı anındaki kümeye
+    sabitler: takas sırasında devam eden istekler eski kümeyle tamamlanır,
+    eski küme son referans bırakıldığında bellekten silinir. Sabitleme
+    contextvars ile yapılır; iş parçacıkları birbirini etkilemez.
+    """
+
+    def __init__(self, load, signature, poll_interval=2.0):
+        self._load = load
+        self._signature = signature
+        self.poll_interval = poll_interval
+        self._current = None
+        self._pinned = contextvars.ContextVar('model_set', default=None)
+        self._reload_lock = threading.Lock()
+        self._retired = []
+        self._watcher = None
+        self._watcher_pid = None
+        self._stop = threading.Event()
+        self.swaps = 0
+        self.last_error = None
+        # Fork anında başka bir iş parçacığında tutulan kilit alt süreçte hiç bırakılmaz
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_pid = None
+
+    # --- Erişim ---
+    def current(self):
+        """Sabitlenmiş küme varsa onu, yoksa güncel kümeyi döndürür."""
+        model_set = self._pinned.get()
+        if model_set is not None:
+            return model_set
+        return self.latest()
+
+    def latest(self):
+        """Sabitlemeden bağımsız olarak en son devreye alınan kümeyi döndürür."""
+        model_set = self._current
+        if model_set is None:
+            self.refresh()
+            model_set = self._current
+        return model_set
+
+    @contextlib.contextmanager
+    def pin(self, model_set=None):
+        """Blok süresince current()'ın aynı kümeyi döndürmesini sağlar."""
+        self._ensure_watcher()
+        if model_set is None:
+            model_set = self.current()
+        previous = self._pinned.get()
+        self._pinned.set(model_set)
+        try:
+            yield model_set
+        finally:
+            self._pinned.set(previous)
+
+    def pinned(self, function):
+        """Fonksiyonu çağrı anındaki kümeye sabitleyen dekoratör; üreteçlerde küme akış boyunca korunur."""
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def generator_wrapper(*args, **kwargs):
+                # Küme üreteç oluşturulurken seçilir, ilk next() çağrısında değil
+                self._ensure_watcher()
+                model_set = self.current()
+                def generate():
+                    # Sabitleme sadece her adım çalışırken geçerlidir; yield öncesinde geri alınır,
+                    # aksi halde askıdaki üreteç next() çağıran bağlama eski kümeyi sızdırır
+                    generator = function(*args, **kwargs)
+                    try:
+                        while True:
+                            token = self._pinned.set(model_set)
+                            try:
+                                item = next(generator)
+                            except StopIteration as stop:
+                                return stop.value
+                            finally:
+                                self._pinned.reset(token)
+                            yield item
+                    finally:
+                        token = self._pinned.set(model_set)
+                        try:
+                            generator.close()
+                        finally:
+                            self._pinned.reset(token)
+                return generate()
+            return generator_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.pin():
+                return function(*args, **kwargs)
+        return wrapper
+
+    # --- Yeniden Yükleme ---
+    def refresh(self):
+        """Sürüm değiştiyse yeni kümeyi yükleyip takas eder; takas yapıldıysa True döndürür."""
+        with self._reload_lock:
+            version = self._signature()
+            previous = self._current
+            if previous is not None and previous.version == version:
+                return False
+            try:
+                model_set = self._load(version, previous)
+            except Exception as e:
+                # Yükleme başarısızsa eski küme hizmet vermeye devam eder
+                self.last_error = f"{type(e).__name__}: {e}"
+                if previous is None:
+                    raise
+                return False
+            self._current = model_set
+            self.last_error = None
+            if previous is not None:
+                self.swaps += 1
+                self._retired.append(weakref.ref(previous))
+            return True
+
+    def _ensure_watcher(self):
+        """İzleyici bu süreçte çalışmıyorsa başlatır (fork sonrası iş parçacıkları devralınmaz)."""
+        if self.poll_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._reload_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._stop = threading.Event()
+            self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+            self._watcher_pid = os.getpid()
+            self._watcher.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def stop(self):
+        """İzleyici iş parçacığını durdurur."""
+        self._stop.set()
+        self._watcher_pid = None
+
+    # --- Durum ---
+    def status(self):
+        """Güncel sürüm, takas sayısı ve hâlâ bellekte olan (boşalmayı bekleyen) eski sürümler."""
+        self._retired = [reference for reference in self._retired if reference() is not None]
+        current = self._current
+        return {
+            'version': current.version if current is not None else None,
+            'loaded_at': current.loaded_at if current is not None else None,
+            'swaps': self.swaps,
+            'draining_versions': [reference().version for reference in self._retired if reference() is not None],
+            'poll_interval': self.poll_interval,
+            'watching': self._watcher_pid == os.getpid() and not self._stop.is_set(),
+            'last_error': self.last_error
+        }
+
+class ModelSetView:
+    """Güncel (veya istek için sabitlenmiş) kümedeki bir kayıt defterine yönlendiren görünüm.
+
+    Kayıt defteri gibi kullanılır (`name in view`, `view[name]`, `view.status()`);
+    her erişim holder.current() üzerinden yapılır.
+    """
+
+    def __init__(self, holder, registry_name):
+        self._holder = holder
+        self._registry_name = registry_name
+
+    def _registry(self):
+        return self._holder.current().registries[self._registry_name]
+
+    def __getattr__(self, attribute):
+        return getattr(self._registry(), attribute)
+
+    def __contains__(self, name):
+        return name in self._registry()
+
+    def __getitem__(self, name):
+        return self._registry()[name]
+
+    def __iter__(self):
+        return iter(self._registry())
+
+    def __len__(self):
+        return len(self._registry())
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Artımlı Model Güncelleme
+------------------------
+Mağaza yöneticilerinin düzelttiği (ürün, kategori) çiftlerini tam yeniden
+eğitim yapmadan modellere ekler. Düzeltmeler küçük partiler halinde işlenir:
+
+    - Naive Bayes: MultinomialNB.partial_fit ile sınıf/özellik sayılarına eklenir.
+    - Lojistik Regresyon: ilk düzeltmede ağırlıkları aynen alan bir
+      SGDClassifier'a (log_loss, sabit öğrenme oranı) dönüştürülür; sonraki
+      partiler partial_fit ile uygulanır. Birleşik hat (inference_pipeline.py)
+      SGD modelini de doğrusal skorlama yolunda çalıştırır; top-k
+      olasılıkları SGD'nin OvR normalize predict_proba değerleridir
+      (dönüşümden önceki softmax olasılıklarından farklıdır).
+    - Karar ağacı artımlı eğitimi desteklemez.
+
+Etiket kodlayıcıda olmayan kategoriler sınıf listesinin sonuna eklenir
+(indeksler değişmez; bu yüzden sonrasında LabelEncoder.transform değil,
+sadece inverse_transform kullanılabilir). Modelin hiç görmediği sınıflar
+boş sayı/ağırlık satırlarıyla modele eklenir. Her parti, düzeltilen
+isimler doğru tahmin edilene kadar (en fazla max_passes kez) uygulanır.
+
+Güncellenen etiket kodlayıcı, model ve birleşik hat artefaktları atomik
+olarak yazılır; çalışan servis yeni artefakt kümesini yükleyip takas eder.
+Düzeltmeler ayrıca market_data.csv biçiminde (item_name, category_name)
+corrections.csv dosyasına eklenir; tam yeniden eğitim için bu satırlar
+veri setine eklenip data_preprocessing.py ve train_models.py --force
+çalıştırılır. Sözlük tabanlı TF-IDF'te sözlükte olmayan kelimeler
+özellik üretmez; hash tabanlı özellik çıkarıcıda bu sınır yoktur.
+
+Kullanım:
+    python online_learning.py duzeltmeler.csv --models naive_bayes logistic_regression
+"""
+import os
+import csv
+import copy
+import time
+import argparse
+import datetime
+import threading
+import contextlib
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+
+from inference_pipeline import export_pipelines
+from text_normalizer import normalize_product_names
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# --- Ayarlar ---
+PROCESSED_DATA_DIR = 'processed_data'
+MODELS_DIR = 'models'
+CORRECTIONS_FILE = 'corrections.csv'
+
+# Artımlı güncellenebilen modeller
+INCREMENTAL_MODELS = ('naive_bayes', 'logistic_regression')
+# Düzeltmelerin örnek ağırlığı: tek bir düzeltme binlerce eğitim örneği arasında kaybolmasın
+DEFAULT_SAMPLE_WEIGHT = 5.0
+# Bir partinin en fazla kaç kez uygulanacağı
+DEFAULT_MAX_PASSES = 10
+# Lojistik regresyondan dönüştürülen SGD modelinin ayarları
+SGD_PARAMS = {'loss': 'log_loss', 'learning_rate': 'constant', 'eta0': 0.5, 'alpha': 1e-4, 'random_state': 42}
+
+# --- Model Dönüşümleri ---
+def to_incremental(model):
+    """Modeli partial_fit destekleyen eşdeğerine dönüştürür (gerekirse kopyalayarak)."""
+    if isinstance(model, (MultinomialNB, SGDClassifier)):
+        return model
+    if isinstance(model, LogisticRegression):
+        # Ağırlıklar aynen alınır; tahminler (argmax) dönüşümden sonra değişmez
+        sgd = SGDClassifier(**SGD_PARAMS)
+        sgd.classes_ = np.array(model.classes_)
+        # SGD her sınıfın ağırlık satırını yerinde günceller; satırlar C sıralı olmalı
+        sgd.coef_ = np.ascontiguousarray(model.coef_, dtype=np.float64)
+        sgd.intercept_ = np.array(model.intercept_, dtype=np.float64)
+        sgd.n_features_in_ = model.n_features_in_
+        return sgd
+    raise TypeError(f"{type(model).__name__} artımlı güncellemeyi desteklemiyor")
+
+def add_classes(model, labels):
+    """Modelin görmediği etiketleri sıralı konumlarına boş satırlarla ekler; eklenenleri döndürür."""
+    missing = np.setdiff1d(np.unique(labels), model.classes_)
+    for label in missing:
+        position = int(np.searchsorted(model.classes_, label))
+        model.classes_ = np.insert(model.classes_, position, label)
+        if isinstance(model, MultinomialNB):
+            # Olasılıklar partial_fit içinde sayılardan yeniden hesaplanır
+            model.class_count_ = np.insert(model.class_count_, position, 0.0)
+            model.feature_count_ = np.insert(model.feature_count_, position, 0.0, axis=0)
+        else:
+            # Yeni sınıf, düzeltmeler öğrenilene kadar diğer sınıfları geçmesin
+            model.intercept_ = np.insert(model.intercept_, position, model.intercept_.min())
+            model.coef_ = np.ascontiguousarray(np.insert(model.coef_, position, 0.0, axis=0))
+    return missing
+
+def fit_corrections(model, X, y, sample_weight=DEFAULT_SAMPLE_WEIGHT, max_passes=DEFAULT_MAX_PASSES):
+    """Partiyi düzeltmeler doğru tahmin edilene kadar uygular; (geçiş sayısı, doğru sayısı) döndürür."""
+    weights = np.full(len(y), sample_weight, dtype=np.float64)
+    passes = 0
+    correct = int(np.sum(model.predict(X) == y))
+    while correct < len(y) and passes < max_passes:
+        model.partial_fit(X, y, sample_weight=weights)
+        passes += 1
+        correct = int(np.sum(model.predict(X) == y))
+    return passes, correct
+
+# --- Dosya Yardımcıları ---
+def dump_atomic(obj, path):
+    """Yarım yazılmış dosya bırakmamak için önce geçici dosyaya yazar."""
+    joblib.dump(obj, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+def append_corrections(path, products, categories):
+    """Düzeltmeleri market_data.csv biçiminde dosyaya ekler."""
+    is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'a', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        if is_new:
+            writer.writerow(['item_name', 'category_name'])
+        writer.writerows(zip(products, categories))
+
+def read_corrections(path):
+    """item_name ve category_name sütunlu CSV'den (ürünler, kategoriler) okur."""
+    with open(path, encoding='utf-8-sig', newline='') as file:
+        rows = [(row['item_name'], row['category_name']) for row in csv.DictReader(file)
+                if row.get('item_name') and row.get('category_name')]
+    return [product for product, _ in rows], [category for _, category in rows]
+
+# --- Güncelleyici ---
+class OnlineUpdater:
+    """Düzeltme partilerini diskteki modellere uygulayan güncelleyici.
+
+    Aynı süreçteki güncellemeler bir kilitle, farklı süreçlerdekiler (fcntl
+    varsa) model dizinindeki kilit dosyasıyla sıraya sokulur. Her güncelleme
+    artefaktları diskten mmap olmadan (yazılabilir) yükler; servisin
+    kullandığı nesneler değiştirilmez.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, processed_data_dir=PROCESSED_DATA_DIR, corrections_path=CORRECTIONS_FILE,
+                 sample_weight=DEFAULT_SAMPLE_WEIGHT, max_passes=DEFAULT_MAX_PASSES):
+        self.models_dir = models_dir
+        self.processed_data_dir = processed_data_dir
+        self.corrections_path = corrections_path
+        self.sample_weight = sample_weight
+        self.max_passes = max_passes
+        self._lock = threading.Lock()
+
+    def model_path(self, model_name):
+        return os.path.join(self.models_dir, f"{model_name}_model.joblib")
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.models_dir, '.online_update.lock'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def apply(self, products, categories, model_names=INCREMENTAL_MODELS):
+        """Düzeltme partisini modellere uygular, artefaktları kaydeder ve özet döndürür."""
+        if len(products) != len(categories):
+            raise ValueError('Ürün ve kategori sayıları eşit olmalıdır')
+        if not products:
+            raise ValueError('Düzeltme bulunamadı')
+        unsupported = [name for name in model_names if name not in INCREMENTAL_MODELS]
+        if unsupported:
+            raise ValueError(f"Artımlı güncellemeyi desteklemeyen modeller: {', '.join(unsupported)}")
+
+        start_time = time.perf_counter()
+        with self._exclusive():
+            vectorizer = joblib.load(os.path.join(self.processed_data_dir, 'tfidf_vectorizer.joblib'), mmap_mode='r')
+            encoder_path = os.path.join(self.processed_data_dir, 'label_encoder.joblib')
+            label_encoder = joblib.load(encoder_path)
+
+            # Bilinmeyen kategoriler sona eklenir; mevcut indeksler değişmez
+            label_ids = {str(name): index for index, name in enumerate(label_encoder.classes_)}
+            new_categories = [category for category in dict.fromkeys(categories) if category not in label_ids]
+            if new_categories:
+                label_encoder = copy.copy(label_encoder)
+                label_encoder.classes_ = np.concatenate([np.asarray(label_encoder.classes_, dtype=object),
+                                                         np.asarray(new_categories, dtype=object)])
+                label_ids.update((category, len(label_ids)) for category in new_categories)
+            y = np.array([label_ids[category] for category in categories], dtype=np.int64)
+
+            # Servisle aynı normalizasyon: düzeltilen isim, serviste aynı özelliklere dönüşür
+            X = vectorizer.transform(normalize_product_names(products))
+
+            updated = {}
+            models = {}
+            for model_name in model_names:
+                model = to_incremental(joblib.load(self.model_path(model_name)))
+                added_classes = add_classes(model, y)
+                passes, correct = fit_corrections(model, X, y, self.sample_weight, self.max_passes)
+                models[model_name] = model
+                updated[model_name] = {
+                    'estimator': type(model).__name__,
+                    'passes': passes,
+                    'corrected': correct,
+                    'added_classes': [str(label_encoder.classes_[label]) for label in added_classes]
+                }
+
+            # Sıra önemli: hatlar kaynak artefaktlardan sonra yazılmalı (aksi halde eski sayılır)
+            if new_categories:
+                dump_atomic(label_encoder, encoder_path)
+            for model_name, model in models.items():
+                dump_atomic(model, self.model_path(model_name))
+            export_pipelines(list(models), self.processed_data_dir, self.models_dir)
+
+            append_corrections(self.corrections_path, products, categories)
+
+        return {
+            'corrections': len(products),
+            'new_categories': new_categories,
+            'models': updated,
+            'updated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'seconds': time.perf_counter() - start_time
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description='Düzeltilmiş kategorileri modellere artımlı olarak ekler.')
+    parser.add_argument('corrections', help='item_name ve category_name sütunlu CSV dosyası')
+    parser.add_argument('--models', nargs='+', choices=INCREMENTAL_MODELS, default=list(INCREMENTAL_MODELS))
+    parser.add_argument('--sample-weight', type=float, default=DEFAULT_SAMPLE_WEIGHT)
+    parser.add_argument('--max-passes', type=int, default=DEFAULT_MAX_PASSES)
+    args = parser.parse_args()
+
+    products, categories = read_corrections(args.corrections)
+    updater = OnlineUpdater(sample_weight=args.sample_weight, max_passes=args.max_passes)
+    try:
+        summary = updater.apply(products, categories, args.models)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"{summary['corrections']} düzeltme {summary['seconds']:.2f} s içinde uygulandı.")
+    if summary['new_categories']:
+        print(f"Yeni kategoriler: {', '.join(summary['new_categories'])}")
+    for model_name, result in summary['models'].items():
+        print(f"{model_name:<22} {result['estimator']:<15} geçiş: {result['passes']:<3} "
+              f"doğru: {result['corrected']}/{summary['corrections']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Paralel (Parçalı) Toplu Tahmin
+------------------------------
+Tekilleştirilmiş ürün isimlerini parçalara (shard) bölüp bir süreç
+havuzunda tahmin eder; sonuçlar parça sırasıyla birleştirilir.
+
+Artefaktlar her işçide bir kez bulunur: fork ile başlatılan işçiler,
+ebeveynin bellek eşlemeli (mmap) yüklediği hattı kopyalamadan devralır;
+forkserver/spawn ile başlatılan işçilere artefakt yolları verilir ve her
+işçi dosyaları kendisi mmap ile açar (pickle edilen bir np.memmap işçide
+özel bir kopyaya dönüşeceği için tahminci aktarılmaz). Çok iş parçacıklı bir süreçten (ör. web
+sunucusu) havuz açılırken fork kullanılmamalıdır: başka bir iş
+parçacığının tuttuğu kilitler alt süreçte kilitli kalır. Görevlere
+sadece isim listeleri gider, geriye kategori metinleri yerine sınıf
+indeksleri (int32 / float64 dizileri) döner; böylece süreçler arası
+aktarım ve pickle maliyeti tahmin süresinin yanında küçük kalır.
+Normalizasyon da işçilerde yapılabilir (ham isimler gönderildiğinde).
+
+Kullanım:
+    python parallel_prediction.py katalog.csv --model naive_bayes --workers 16 -o kategoriler.csv
+    python parallel_prediction.py --benchmark --products 1000000 --workers 1 2 4 8 16
+"""
+import os
+import csv
+import sys
+import time
+import argparse
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+from inference_pipeline import PIPELINE_FORMAT_VERSION, pipeline_filename, top_k_indices
+from text_normalizer import normalize_product_names
+
+# --- Ayarlar ---
+PROCESSED_DATA_DIR = 'processed_data'
+MODELS_DIR = 'models'
+# Bir parçadaki en az isim sayısı; daha küçük parçalarda süreçler arası aktarım baskın olur
+MIN_SHARD_SIZE = 2000
+# Yük dengesi için işçi başına düşen parça sayısı
+SHARDS_PER_WORKER = 4
+
+# --- Tahminci ---
+class ShardPredictor:
+    """Bir modelin tahminlerini sınıf indeksleri olarak üreten, süreçler arasında paylaşılan nesne.
+
+    Birleşik hat (inference_pipeline.py) verilirse o kullanılır; verilmezse
+    vektörleştirici + model + etiket kodlayıcı zinciri kullanılır.
+    """
+
+    def __init__(self, pipeline=None, vectorizer=None, model=None, label_encoder=None):
+        self.pipeline = pipeline
+        self.vectorizer = vectorizer
+        self.model = model
+        if pipeline is not None:
+            # Top-k indeksleri modelin sınıf sırasındadır
+            self.class_names = pipeline.class_names
+        else:
+            self.label_names = np.asarray(label_encoder.classes_, dtype=object)
+            self.class_names = self.label_names[model.classes_]
+
+    @classmethod
+    def load(cls, model_name, models_dir=MODELS_DIR, processed_data_dir=PROCESSED_DATA_DIR, mmap_mode='r'):
+        """Model artefaktlarını diskten (varsayılan olarak bellek eşlemeli) yükler.
+
+        Birleşik hat yoksa, eski biçimdeyse veya kaynak artefaktlardan eskiyse
+        ayrı nesne zinciri kullanılır.
+        """
+        model_path = os.path.join(models_dir, f"{model_name}_model.joblib")
+        vectorizer_path = os.path.join(processed_data_dir, 'tfidf_vectorizer.joblib')
+        label_encoder_path = os.path.join(processed_data_dir, 'label_encoder.joblib')
+        pipeline_path = os.path.join(models_dir, pipeline_filename(model_name))
+        if os.path.exists(pipeline_path):
+            pipeline_mtime = os.stat(pipeline_path).st_mtime_ns
+            sources = [model_path, vectorizer_path, label_encoder_path]
+            if all(not os.path.exists(path) or os.stat(path).st_mtime_ns <= pipeline_mtime for path in sources):
+                pipeline = joblib.load(pipeline_path, mmap_mode=mmap_mode)
+                if getattr(pipeline, 'format_version', None) == PIPELINE_FORMAT_VERSION:
+                    return cls(pipeline=pipeline)
+        return cls(
+            vectorizer=joblib.load(vectorizer_path, mmap_mode=mmap_mode),
+            model=joblib.load(model_path, mmap_mode=mmap_mode),
+            label_encoder=joblib.load(label_encoder_path, mmap_mode=mmap_mode)
+        )
+
+    def predict_indices(self, names):
+        """Normalize edilmiş isimler için (indeksler, isim dizisi) döndürür."""
+        if self.pipeline is not None:
+            return self.pipeline.predict_indices_normalized(names)
+        return self.model.predict(self.vectorizer.transform(names)), self.label_names
+
+    def top_k_indices(self, names, k):
+        """En olası k sınıfın class_names indekslerini ve olasılıklarını döndürür."""
+        if self.pipeline is not None:
+            return self.pipeline.top_k_indices_normalized(names, k)
+        probabilities = self.model.predict_proba(self.vectorizer.transform(names))
+        top = top_k_indices(probabilities, k)
+        return top, np.take_along_axis(probabilities, top, axis=1)
+
+# --- İşçi Tarafı ---
+# Süreç havuzundaki işçinin tahmincisi (fork ile kopyalanmadan devralınır)
+_worker_predictor = None
+
+def _init_worker(predictor):
+    global _worker_predictor
+    _worker_predictor = predictor
+
+def _load_worker(artifacts, class_names):
+    """Artefaktları işçide bellek eşlemeli yükler; sınıflar ebeveyninkinden farklıysa başlamaz."""
+    predictor = ShardPredictor.load(mmap_mode='r', **artifacts)
+    if not np.array_equal(predictor.class_names, class_names):
+        # Havuz açıldıktan sonra artefaktlar değişti; indeksler ebeveynle uyuşmaz
+        raise RuntimeError('Model artefaktları tahminci oluşturulduktan sonra değişti')
+    _init_worker(predictor)
+
+def _predict_shard(names, top_k, normalized, predictor=None):
+    """Bir parçayı tahmin eder; (indeksler, isim dizisi) veya (top-k indeksleri, olasılıklar) döndürür."""
+    predictor = predictor or _worker_predictor
+    if not normalized:
+        names = normalize_product_names(names)
+    if top_k:
+        top, probabilities = predictor.top_k_indices(names, top_k)
+        return top.astype(np.int32), probabilities
+    indices, class_names = predictor.predict_indices(names)
+    return np.asarray(indices).astype(np.int32), class_names
+
+def shard_bounds(n_names, n_workers, min_shard_size=MIN_SHARD_SIZE):
+    """İsim listesini işçi sayısına göre dengeli (başlangıç, bitiş) parçalarına böler."""
+    shard_size = max(min_shard_size, -(-n_names // (n_workers * SHARDS_PER_WORKER)))
+    return [(start, min(start + shard_size, n_names)) for start in range(0, n_names, shard_size)]
+
+class ParallelPredictor:
+    """ShardPredictor tahminlerini bir süreç havuzunda parçalara bölerek çalıştırır.
+
+    start_method verilmezse fork (destekleniyorsa) kullanılır; sadece tek
+    iş parçacıklı süreçlerde (komut satırı) güvenlidir. artifacts
+    (ShardPredictor.load argümanları: model_name, models_dir,
+    processed_data_dir) verilirse işçiler tahminciyi bu dosyalardan mmap
+    ile yükler; fork dışındaki yöntemlerde verilmelidir. close() sonrasında
+    havuz yeniden açılmaz, tahmin çağrıları RuntimeError fırlatır.
+    """
+
+    def __init__(self, predictor, n_workers=None, min_shard_size=MIN_SHARD_SIZE, start_method=None, artifacts=None):
+        self.predictor = predictor
+        self.artifacts = artifacts
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.min_shard_size = min_shard_size
+        if start_method is None:
+            # fork destekleniyorsa tahminci işçilere pickle edilmeden aktarılır
+            start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+        self.start_method = start_method
+        self._executor = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('ParallelPredictor kapatıldı')
+            if self._executor is None:
+                if self.artifacts is not None:
+                    initializer, initargs = _load_worker, (self.artifacts, self.predictor.class_names)
+                else:
+                    initializer, initargs = _init_worker, (self.predictor,)
+                self._executor = ProcessPoolExecutor(max_workers=self.n_workers,
+                                                     mp_context=multiprocessing.get_context(self.start_method),
+                                                     initializer=initializer, initargs=initargs)
+            return self._executor
+
+    def _map_shards(self, names, top_k, normalized):
+        bounds = shard_bounds(len(names), self.n_workers, self.min_shard_size)
+        if self.n_workers <= 1 or len(bounds) <= 1:
+            # Süreç içinde: genel işçi tahmincisi değiştirilmez (aynı süreçte başka tahminciler olabilir)
+            return [_predict_shard(names, top_k, normalized, self.predictor)]
+        shards = (names[start:end] for start, end in bounds)
+        return list(self._get_executor().map(_predict_shard, shards, itertools.repeat(top_k),
+                                             itertools.repeat(normalized)))
+
+    def predict(self, names, normalized=True):
+        """İsimlerin kategori isimlerini giriş sırasıyla döndürür."""
+        if not names:
+            return []
+        results = self._map_shards(names, None, normalized)
+        indices = np.concatenate([shard_indices for shard_indices, _ in results])
+        return results[0][1][indices].tolist()
+
+    def predict_top_k(self, names, k, normalized=True):
+        """Her isim için en olası k kategoriyi (kategori, olasılık) listesi olarak döndürür."""
+        if not names:
+            return []
+        results = self._map_shards(names, k, normalized)
+        top = np.concatenate([shard_top for shard_top, _ in results])
+        probabilities = np.concatenate([shard_probabilities for _, shard_probabilities in results])
+        class_names = self.predictor.class_names[top].tolist()
+        return [list(zip(categories, values)) for categories, values in zip(class_names, probabilities.tolist())]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# --- Komut Satırı ---
+def read_product_names(path):
+    """Her satırın ilk sütununu ürün adı olarak okur; 'item_name' başlığı varsa atlanır."""
+    with open(path, encoding='utf-8-sig', newline='') as file:
+        for index, row in enumerate(csv.reader(file)):
+            if not row or not row[0].strip():
+                continue
+            if index == 0 and row[0].strip().lower() in ('item_name', 'product', 'product_name'):
+                continue
+            yield row[0].strip()
+
+def categorize_catalogue(input_path, output, model_name, n_workers=None):
+    """Katalogdaki benzersiz ürünleri paralel tahmin edip 'ürün,kategori' CSV'si yazar."""
+    products = list(dict.fromkeys(read_product_names(input_path)))
+    predictor = ShardPredictor.load(model_name)
+    start_time = time.perf_counter()
+    with ParallelPredictor(predictor, n_workers) as parallel:
+        categories = parallel.predict(products, normalized=False)
+    elapsed = time.perf_counter() - start_time
+
+    writer = csv.writer(output)
+    writer.writerow(['item_name', 'category_name'])
+    writer.writerows(zip(products, categories))
+    return len(products), elapsed
+
+def run_benchmark(model_name, n_products, worker_counts):
+    """Sentetik ürün listesinde farklı işçi sayılarıyla süre ve ölçeklenmeyi ölçer."""
+    base_names = list(dict.fromkeys(read_product_names('market_data.csv')))
+    # Benzersiz isimler üretmek için sonlarına sayı eklenir (sözlük dışı token, tahmini değiştirmez)
+    products = [f"{base_names[i % len(base_names)]} {i}" for i in range(n_products)]
+    predictor = ShardPredictor.load(model_name)
+    print(f"{n_products} ürün, model: {model_name}, CPU: {os.cpu_count()}")
+
+    baseline_seconds = None
+    reference = None
+    for n_workers in worker_counts:
+        with ParallelPredictor(predictor, n_workers) as parallel:
+            # Havuz kurulumunu ölçüme katmamak için küçük bir ısınma çağrısı
+            parallel.predict(products[:n_workers * MIN_SHARD_SIZE], normalized=False)
+            start_time = time.perf_counter()
+            categories = parallel.predict(products, normalized=False)
+            elapsed = time.perf_counter() - start_time
+        if reference is None:
+            reference, baseline_seconds = categories, elapsed
+        elif categories != reference:
+            raise AssertionError(f"{n_workers} işçi ile sonuçlar tek işçiden farklı")
+        print(f"{n_workers:>3} işçi: {elapsed:8.2f} s  {n_products / elapsed:>12,.0f} ürün/s  "
+              f"hızlanma x{baseline_seconds / elapsed:.2f}")
+
+def main():
+    model_names = ['naive_bayes', 'decision_tree', 'logistic_regression']
+    parser = argparse.ArgumentParser(description='Ürün kataloğunu çok çekirdekli (parçalı) olarak kategorize eder.')
+    parser.add_argument('input', nargs='?', help="Ürün isimleri (her satırın ilk sütunu) içeren CSV dosyası")
+    parser.add_argument('--model', choices=model_names, default='naive_bayes')
+    parser.add_argument('--workers', type=int, nargs='+', default=[os.cpu_count() or 1],
+                        help='İşçi süreç sayısı (benchmark modunda birden fazla verilebilir)')
+    parser.add_argument('-o', '--output', help='Çıktı CSV dosyası (varsayılan: standart çıktı)')
+    parser.add_argument('--benchmark', action='store_true', help='Sentetik veriyle ölçeklenme testi yap')
+    parser.add_argument('--products', type=int, default=1000000, help='Benchmark ürün sayısı')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark(args.model, args.products, args.workers)
+        return
+    if not args.input:
+        parser.error('Girdi dosyası veya --benchmark belirtilmelidir')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as output:
+            count, elapsed = categorize_catalogue(args.input, output, args.model, args.workers[0])
+    else:
+        count, elapsed = categorize_catalogue(args.input, sys.stdout, args.model, args.workers[0])
+    print(f"{count} benzersiz ürün {elapsed:.2f} s içinde tahmin edildi "
+          f"({count / max(elapsed, 1e-9):,.0f} ürün/s)", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
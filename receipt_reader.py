@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Sipariş CSV Okuyucu
+-------------------
+Sipariş dosyalarını (her satır bir fişin ürünleri, virgülle ayrılmış)
+parça parça okuyup satır satır ürün listesi olarak üreten yardımcılar.
+Karakter kodlaması dosyanın başından tespit edilir ve artımlı çözücüyle
+uygulanır; dosyanın tamamı belleğe alınmaz. Web servisi (web.py) ve
+komut satırı araçları (batch_categorize.py) aynı okuyucuyu kullanır.
+
+Okuyucular seek/read metotları olan her dosya benzeri nesneyle
+(Flask FileStorage, open(..., 'rb')) çalışır.
+"""
+import re
+import codecs
+import itertools
+
+import chardet
+
+# --- Ayarlar ---
+# Kodlama tespiti için okunacak en fazla bayt sayısı
+CSV_ENCODING_SAMPLE_SIZE = 64 * 1024
+# Akış halinde okurken her seferde okunacak bayt sayısı
+CSV_READ_CHUNK_SIZE = 1024 * 1024
+
+# --- Okuma ---
+def detect_csv_encoding(sample):
+    """Dosyanın başından alınan örnekten karakter kodlamasını tespit eder."""
+    encoding = chardet.detect(sample).get('encoding') or 'utf-8'
+    # Örnek yalnızca ASCII içerse bile dosyanın devamında Türkçe karakterler olabilir
+    if encoding.lower() == 'ascii':
+        encoding = 'utf-8'
+    return encoding
+
+def parse_csv_line(line):
+    """Tek bir CSV satırını ürün listesine dönüştürür."""
+    return [item.strip() for item in re.split(r',\s*', line) if item.strip()]
+
+def iter_csv_receipts(file_storage, chunk_size=CSV_READ_CHUNK_SIZE):
+    """CSV dosyasını parça parça çözerek her satırı ürün listesi olarak üretir."""
+    file_storage.seek(0)
+    chunk = file_storage.read(CSV_ENCODING_SAMPLE_SIZE)
+    decoder = codecs.getincrementaldecoder(detect_csv_encoding(chunk))(errors='replace')
+    
+    pending = ''
+    at_start = True
+    while chunk:
+        text = decoder.decode(chunk)
+        if at_start and text:
+            text = text.lstrip('\ufeff')
+            at_start = False
+        lines = (pending + text).splitlines(keepends=True)
+        # Son satır yarım kalmış olabilir, bir sonraki parçayla birleştir
+        pending = lines.pop() if lines else ''
+        for line in lines:
+            items = parse_csv_line(line)
+            if items:
+                yield items
+        chunk = file_storage.read(chunk_size)
+    
+    for line in (pending + decoder.decode(b'', final=True)).splitlines():
+        items = parse_csv_line(line)
+        if items:
+            yield items
+
+def open_csv_receipts(file_storage):
+    """CSV satırları için bir iterator döndürür; dosya boşsa hemen hata verir."""
+    receipts = iter_csv_receipts(file_storage)
+    first_receipt = next(receipts, None)
+    if first_receipt is None:
+        raise ValueError('CSV dosyası boş veya veri içermiyor.')
+    return itertools.chain([first_receipt], receipts)
+
+def iter_receipt_products(all_receipts_items):
+    """CSV satırlarından (fiş_id, ürünler) çiftleri üretir; boş satırları atlar."""
+    for index, row_items in enumerate(all_receipts_items, 1):
+        products_in_receipt = [str(item).strip() for item in row_items if str(item).strip()]
+        if products_in_receipt:
+            yield f"Siparis_{index:02d}", products_in_receipt
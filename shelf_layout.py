@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Raf Yerleşimi
+-------------
+Mağaza raflarını isim listesi ve (n, 2) koordinat dizisi olarak tutar.
+Mesafeler NumPy ile vektörel hesaplanır ve sadece istenen sütunlar veya
+çiftler için üretilir; n x n matris yalnızca açıkça istendiğinde oluşturulur
+(binlerce raflık yerleşimde bile bellek kullanımı O(n) kalır). En yakın raf
+sorguları ilk kullanımda kurulan bir KD-ağacı (scipy.spatial.cKDTree) ile
+yapılır.
+
+Mesafeler eski kodla aynı formülle (sqrt(dx² + dy²)) hesaplanır, bu sayede
+değerler ve eşit mesafeli rafların sırası değişmez.
+
+Kullanım (performans testi):
+    python shelf_layout.py --cabinets 5000
+"""
+import math
+import time
+import argparse
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+class ShelfLayout:
+    """Raf isimleri ve koordinatları üzerinde mesafe ve en yakın raf sorguları."""
+
+    def __init__(self, cabinets):
+        self.names = [cabinet['name'] for cabinet in cabinets]
+        self.positions = np.array([[cabinet['x'], cabinet['y']] for cabinet in cabinets], dtype=np.float64)
+        self.positions = self.positions.reshape(len(self.names), 2)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        # Merkez, eski kodla aynı sonucu vermesi için Python toplamıyla hesaplanır
+        self.center = (
+            sum(cabinet['x'] for cabinet in cabinets) / len(cabinets),
+            sum(cabinet['y'] for cabinet in cabinets) / len(cabinets)
+        ) if cabinets else (0.0, 0.0)
+        self._tree = None
+        self._matrix = None
+        # Yanıtlarda raporlanan mesafe modeli bilgisi
+        self.info = {'metric': 'euclidean'}
+
+    def __len__(self):
+        return len(self.names)
+
+    # --- Mesafeler ---
+    def distances_to_center(self):
+        """Her rafın yerleşim merkezine uzaklığını döndürür."""
+        dx = self.positions[:, 0] - self.center[0]
+        dy = self.positions[:, 1] - self.center[1]
+        return np.sqrt(dx * dx + dy * dy)
+
+    def columns(self, indices):
+        """Tüm rafların verilen raflara uzaklığını (n, k) matris olarak döndürür."""
+        targets = self.positions[np.asarray(indices, dtype=np.int64)]
+        dx = self.positions[:, 0, None] - targets[None, :, 0]
+        dy = self.positions[:, 1, None] - targets[None, :, 1]
+        return np.sqrt(dx * dx + dy * dy)
+
+    def pair_distances(self, first, second):
+        """first[i] ve second[i] rafları arasındaki mesafeleri döndürür."""
+        first = self.positions[np.asarray(first, dtype=np.int64)]
+        second = self.positions[np.asarray(second, dtype=np.int64)]
+        dx = first[:, 0] - second[:, 0]
+        dy = first[:, 1] - second[:, 1]
+        return np.sqrt(dx * dx + dy * dy)
+
+    def distance_matrix(self):
+        """Tam (n, n) mesafe matrisini döndürür; sadece istendiğinde oluşturulur ve saklanır."""
+        if self._matrix is None:
+            self._matrix = self.columns(np.arange(len(self)))
+        return self._matrix
+
+    # --- En Yakın Raflar ---
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = cKDTree(self.positions)
+        return self._tree
+
+    def nearest(self, name, k=5):
+        """Verilen rafa en yakın k rafı (isim, mesafe) listesi olarak döndürür (kendisi hariç)."""
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return []
+        distances, indices = self.tree.query(self.positions[self.index[name]], k=k + 1)
+        origin = self.index[name]
+        return [(self.names[i], float(d)) for d, i in zip(distances, indices) if i != origin][:k]
+
+    def nearest_indices(self, k=5):
+        """Her raf için en yakın k rafın indekslerini ve mesafelerini (n, k) dizileri olarak döndürür."""
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            empty = np.empty((len(self), 0))
+            return empty, empty.astype(np.int64)
+        distances, indices = self.tree.query(self.positions, k=k + 1)
+        # İlk sütun rafın kendisidir (aynı koordinatlı raflarda sıra değişebilir)
+        own = indices == np.arange(len(self))[:, None]
+        keep = ~own
+        keep[own.sum(axis=1) == 0, -1] = False
+        return distances[keep].reshape(len(self), k), indices[keep].reshape(len(self), k)
+
+    # --- Görselleştirme ---
+    def distance_dict(self, pairs=None):
+        """Mesafeleri {raf: {raf: mesafe}} biçiminde döndürür.
+
+        pairs verilmezse tüm çiftler (tam matris) yazılır; verilirse sadece
+        bu (kaynak, hedef) raf indeksi çiftleri yazılır.
+        """
+        if pairs is None:
+            matrix = self.distance_matrix().tolist()
+            return {
+                name: {other: row[j] for j, other in enumerate(self.names) if j != i}
+                for i, (name, row) in enumerate(zip(self.names, matrix))
+            }
+        pairs = sorted(set(pairs))
+        if not pairs:
+            return {}
+        first, second = zip(*pairs)
+        result = {}
+        for i, j, distance in zip(first, second, self.pair_distances(first, second).tolist()):
+            if i != j:
+                result.setdefault(self.names[i], {})[self.names[j]] = distance
+        return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Raf yerleşimi mesafe ve en yakın raf sorguları performans testi.')
+    parser.add_argument('--cabinets', type=int, default=5000, help='Raf sayısı')
+    parser.add_argument('--k', type=int, default=5, help='En yakın raf sayısı')
+    args = parser.parse_args()
+
+    columns = int(np.ceil(np.sqrt(args.cabinets)))
+    cabinets = [{'name': f"Raf {i}", 'x': (i % columns) * 90 + 10, 'y': (i // columns) * 40 + 10}
+                for i in range(args.cabinets)]
+
+    def timed(label, function):
+        start_time = time.perf_counter()
+        result = function()
+        print(f"{label:<44} {(time.perf_counter() - start_time) * 1000:>10.1f} ms")
+        return result
+
+    layout = timed('ShelfLayout oluşturma', lambda: ShelfLayout(cabinets))
+    timed('Merkeze uzaklıklar', layout.distances_to_center)
+    timed('KD-ağacı ile tüm raflar için en yakın k raf', lambda: layout.nearest_indices(args.k))
+    timed('Tek raf için en yakın k raf', lambda: layout.nearest(cabinets[0]['name'], args.k))
+    if args.cabinets <= 5000:
+        timed('Tam mesafe matrisi (NumPy)', layout.distance_matrix)
+        timed('Eski iç içe döngü (dict-of-dicts)', lambda: {
+            cab1['name']: {cab2['name']: math.sqrt((cab1['x'] - cab2['x'])**2 + (cab1['y'] - cab2['y'])**2)
+                           for cab2 in cabinets if cab1['name'] != cab2['name']}
+            for cab1 in cabinets
+        })
+
+if __name__ == '__main__':
+    main()
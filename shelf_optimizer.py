@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Raf Atama Optimizasyonu
+-----------------------
+Kategorilerin raflara atanmasını ikinci dereceden atama problemi (QAP)
+olarak çözer. Amaç fonksiyonu
+
+    f = Σ_{i<j} lift(i, j) · mesafe(raf(i), raf(j))
+
+'maximize' zaman hedefinde (ilişkili kategoriler yakın) en küçüklenir,
+'minimize' zaman hedefinde (ilişkili kategoriler uzak) en büyüklenir.
+
+Çözücü mevcut açgözlü yerleşimden başlar ve NumPy matrisleri üzerinde yerel
+arama yapar: iki kategorinin raflarını değiştirme (swap) ve bir kategoriyi
+boş bir rafa taşıma hamleleri. G[t, a] = Σ_j W[a, j] · D[t, raf(j)] matrisi
+tutulduğu için bir kategorinin tüm swap/taşıma hamlelerinin amaç
+fonksiyonundaki değişimi (delta) tek bir vektörel işlemle hesaplanır;
+uygulanan her hamle G'yi rank-1 güncellemeyle yeniler. Yerel optimuma ulaşıldığında rastgele swap'larla karıştırılıp
+(iterated local search) süre bütçesi dolana kadar aramaya devam edilir ve
+en iyi çözüm döndürülür.
+
+Kullanım (performans testi):
+    python shelf_optimizer.py --cabinets 500 --categories 500 --time-budget 0.5
+"""
+import time
+import argparse
+
+import numpy as np
+
+from shelf_layout import ShelfLayout
+
+# Zaman hedefi -> amaç fonksiyonunun yönü
+# 'maximize': ilişkili kategorileri yakın tut (toplam mesafeyi en küçükle)
+# 'minimize': ilişkili kategorileri uzak tut (toplam mesafeyi en büyükle)
+TIME_GOAL_DIRECTIONS = {'maximize': 'min', 'minimize': 'max'}
+
+# Varsayılan süre bütçesi (saniye)
+DEFAULT_TIME_BUDGET = 0.5
+
+# Art arda bu kadar karıştırma en iyi çözümü iyileştirmezse arama süre dolmadan biter
+DEFAULT_MAX_STALLED_RESTARTS = 50
+
+# Desteklenen çözücüler: 'greedy' eski yerleşimi değiştirmeden döndürür
+SHELF_SOLVERS = ('local_search', 'greedy')
+
+def build_affinity_matrix(positive_rules, categories):
+    """Pozitif kurallardaki lift değerlerinden simetrik kategori ilişki matrisini üretir.
+
+    Her kuralın lift değeri, öncül ve sonuç kategorilerinin her çiftine eklenir.
+    Listede olmayan kategoriler yok sayılır.
+    """
+    index = {category: i for i, category in enumerate(categories)}
+    affinity = np.zeros((len(categories), len(categories)), dtype=np.float64)
+    for rule in positive_rules:
+        for if_cat in rule['if_categories']:
+            i = index.get(if_cat)
+            if i is None:
+                continue
+            for then_cat in rule['then_categories']:
+                j = index.get(then_cat)
+                if j is not None and j != i:
+                    affinity[i, j] += rule['lift']
+    return affinity + affinity.T
+
+def distance_columns(distances, indices):
+    """Tüm rafların verilen raflara uzaklığını (n, k) döndürür.
+
+    distances bir (n, n) NumPy matrisi veya columns() metodu olan bir
+    mesafe kaynağı (örn. ShelfLayout) olabilir; ikincisinde tam matris
+    hiç oluşturulmaz.
+    """
+    if isinstance(distances, np.ndarray):
+        return distances[:, indices]
+    return distances.columns(indices)
+
+def greedy_assignment(layout, n_categories, time_goal):
+    """Eski açgözlü yerleşimi raf indeksleri olarak döndürür.
+
+    Kategoriler puana göre (azalan) sıralı kabul edilir. 'maximize' hedefinde
+    yüksek puanlı kategoriler merkeze en yakın raflara, 'minimize' hedefinde
+    çift/tek gruplama sonucu k. kategori k. rafa yerleşir.
+    """
+    if time_goal == 'maximize':
+        shelf_order = np.argsort(layout.distances_to_center(), kind='stable')
+    else:
+        shelf_order = np.arange(len(layout))
+    return shelf_order[:n_categories].copy()
+
+def assignment_objective(affinity, distances, assignment):
+    """Atamanın amaç fonksiyonu değerini (her çift bir kez) hesaplar."""
+    return float(0.5 * np.sum(affinity * distance_columns(distances, assignment)[assignment]))
+
+def optimize_assignment(affinity, distances, initial, direction='min', time_budget=DEFAULT_TIME_BUDGET,
+                        seed=0, max_iterations=None, max_stalled_restarts=DEFAULT_MAX_STALLED_RESTARTS):
+    """Başlangıç atamasını yerel arama ile iyileştirir.
+
+    affinity: (m, m) simetrik ilişki matrisi, distances: (n, n) mesafe matrisi
+    veya mesafe kaynağı (bkz. distance_columns), initial: her kategorinin raf indeksi (m <= n, tekrarsız).
+    (atama, rapor) döndürür; atama her kategori için raf indeksleridir.
+    Arama süre bütçesi dolduğunda veya art arda max_stalled_restarts
+    karıştırma en iyi çözümü iyileştirmediğinde durur.
+    """
+    start_time = time.perf_counter()
+    deadline = start_time + max(0.0, time_budget)
+    rng = np.random.default_rng(seed)
+
+    n_categories = len(initial)
+    n_shelves = len(distances)
+    # En küçükleme problemine çevir: en büyükleme için ağırlıkların işareti ters
+    sign = 1.0 if direction == 'min' else -1.0
+    weights = sign * np.asarray(affinity, dtype=np.float64)
+
+    assignment = np.asarray(initial, dtype=np.int64).copy()
+    occupied = np.zeros(n_shelves, dtype=bool)
+    occupied[assignment] = True
+
+    # C[:, a]: tüm rafların a kategorisinin rafına uzaklığı (sadece dolu rafların sütunları tutulur)
+    columns = np.ascontiguousarray(distance_columns(distances, assignment), dtype=np.float64)
+    # G[t, a]: a kategorisi t rafında olsaydı diğer kategorilerle toplam (ağırlıklı) mesafesi
+    gains = columns @ weights
+    category_ids = np.arange(n_categories)
+    cost = 0.5 * float(gains[assignment, category_ids].sum())
+    tolerance = 1e-9 * max(1.0, abs(cost))
+
+    def apply_swap(a, b):
+        p, q = assignment[a], assignment[b]
+        # a: p -> q ve b: q -> p hamlelerinin toplamı tek bir rank-1 güncellemedir
+        gains[...] += np.outer(columns[:, b] - columns[:, a], weights[a] - weights[b])
+        columns[:, [a, b]] = columns[:, [b, a]]
+        assignment[a], assignment[b] = q, p
+
+    def apply_move(a, t):
+        p = assignment[a]
+        column = distance_columns(distances, [t])[:, 0]
+        gains[...] += np.outer(column - columns[:, a], weights[a])
+        columns[:, a] = column
+        occupied[p], occupied[t] = False, True
+        assignment[a] = t
+
+    def improve_category(a):
+        """a kategorisi için en iyi swap/taşıma hamlesini uygular; delta değerini döndürür."""
+        p = assignment[a]
+        current = gains[assignment, category_ids]
+        best_delta, best_kind, target = 0.0, None, None
+        if n_categories > 1:
+            # delta(a, b) = G[q, a] - G[p, a] + G[p, b] - G[q, b] + 2 W[a, b] D[p, q]  (q = raf(b))
+            deltas = gains[assignment, a] - current[a] + gains[p] - current
+            deltas += 2.0 * weights[a] * columns[p]
+            deltas[a] = np.inf
+            b = int(np.argmin(deltas))
+            best_delta, best_kind, target = float(deltas[b]), 'swap', b
+        if n_shelves > n_categories:
+            empty = np.flatnonzero(~occupied)
+            deltas = gains[empty, a] - current[a]
+            row = int(np.argmin(deltas))
+            if deltas[row] < best_delta:
+                best_delta, best_kind, target = float(deltas[row]), 'move', int(empty[row])
+        if best_delta >= -tolerance:
+            return 0.0
+        if best_kind == 'swap':
+            apply_swap(a, target)
+        else:
+            apply_move(a, target)
+        return best_delta
+
+    iterations = 0
+    restarts = 0
+    stalled_restarts = 0
+    best_cost = cost
+    best_assignment = assignment.copy()
+    best_gains = best_columns = None
+    # Tek kategori ve boş raf yoksa yapılabilecek hamle yok
+    can_move = n_categories > 1 or n_shelves > n_categories
+    while can_move and time.perf_counter() < deadline:
+        # Kategorileri rastgele sırayla dolaşıp her biri için en iyi hamleyi uygula
+        improved = False
+        for a in rng.permutation(n_categories):
+            if time.perf_counter() >= deadline or (max_iterations is not None and iterations >= max_iterations):
+                break
+            delta = improve_category(a)
+            if delta < 0.0:
+                cost += delta
+                iterations += 1
+                improved = True
+        else:
+            if improved:
+                continue
+        if time.perf_counter() >= deadline or (max_iterations is not None and iterations >= max_iterations):
+            break
+
+        # Yerel optimum: en iyi çözümü sakla ve rastgele swap'larla karıştır
+        if cost < best_cost - tolerance or restarts == 0:
+            best_cost = cost
+            best_assignment = assignment.copy()
+            best_gains = gains.copy()
+            best_columns = columns.copy()
+            stalled_restarts = 0
+        else:
+            stalled_restarts += 1
+            if stalled_restarts >= max_stalled_restarts:
+                break
+        if cost > best_cost + tolerance:
+            # Karıştırma daha kötü bir optimuma götürdü, en iyi çözümden devam et
+            assignment[...] = best_assignment
+            occupied[...] = False
+            occupied[assignment] = True
+            gains[...] = best_gains
+            columns[...] = best_columns
+            cost = best_cost
+        restarts += 1
+        for _ in range(max(2, n_categories // 50)):
+            # Boş raf varsa hamlelerin yarısı taşıma, yoksa hepsi swap
+            if n_shelves > n_categories and (n_categories < 2 or rng.random() < 0.5):
+                a = int(rng.integers(n_categories))
+                t = int(rng.choice(np.flatnonzero(~occupied)))
+                cost += gains[t, a] - gains[assignment[a], a]
+                apply_move(a, t)
+            else:
+                a, b = rng.choice(n_categories, size=2, replace=False)
+                p, q = assignment[a], assignment[b]
+                cost += (gains[q, a] - gains[p, a] + gains[p, b] - gains[q, b]
+                         + 2.0 * weights[a, b] * columns[p, b])
+                apply_swap(a, b)
+
+    if cost < best_cost - tolerance:
+        best_assignment = assignment.copy()
+
+    # Birikmiş yuvarlama hatalarından bağımsız, kesin değerler
+    objective = assignment_objective(affinity, distances, best_assignment)
+    baseline = assignment_objective(affinity, distances, np.asarray(initial, dtype=np.int64))
+    improvement = baseline - objective if direction == 'min' else objective - baseline
+    report = {
+        'solver': 'local_search',
+        'direction': direction,
+        'objective': objective,
+        'baseline_objective': baseline,
+        'improvement': improvement,
+        'improvement_percent': 100.0 * improvement / abs(baseline) if baseline else 0.0,
+        'iterations': iterations,
+        'restarts': restarts,
+        'categories': n_categories,
+        'shelves': n_shelves,
+        'time_budget': time_budget,
+        'elapsed_seconds': time.perf_counter() - start_time
+    }
+    return best_assignment, report
+
+def greedy_report(affinity, distances, assignment, direction):
+    """Açgözlü yerleşim için optimize_assignment ile aynı biçimde rapor üretir."""
+    objective = assignment_objective(affinity, distances, assignment)
+    return {
+        'solver': 'greedy',
+        'direction': direction,
+        'objective': objective,
+        'baseline_objective': objective,
+        'improvement': 0.0,
+        'improvement_percent': 0.0,
+        'iterations': 0,
+        'restarts': 0,
+        'categories': len(assignment),
+        'shelves': len(distances),
+        'time_budget': 0.0,
+        'elapsed_seconds': 0.0
+    }
+
+# --- Performans Testi ---
+def generate_synthetic_instance(n_cabinets, n_categories, rule_count, seed=42):
+    """Izgara üzerinde raflar ve rastgele lift değerli kurallardan oluşan bir örnek üretir."""
+    rng = np.random.default_rng(seed)
+    columns = int(np.ceil(np.sqrt(n_cabinets)))
+    cabinets = [{'name': f"Raf {i}", 'x': (i % columns) * 90 + 10, 'y': (i // columns) * 40 + 10}
+                for i in range(n_cabinets)]
+    categories = [f"kategori_{i}" for i in range(n_categories)]
+    rules = []
+    for _ in range(rule_count):
+        first, second = rng.choice(n_categories, size=2, replace=False)
+        rules.append({
+            'if_categories': [categories[first]],
+            'then_categories': [categories[second]],
+            'lift': float(rng.uniform(1.01, 5.0))
+        })
+    return cabinets, categories, rules
+
+def main():
+    parser = argparse.ArgumentParser(description='Raf atama optimizasyonu performans testi.')
+    parser.add_argument('--cabinets', type=int, default=500, help='Raf sayısı')
+    parser.add_argument('--categories', type=int, default=None, help='Kategori sayısı (varsayılan: raf sayısı)')
+    parser.add_argument('--rules', type=int, default=None, help='Kural sayısı (varsayılan: 5 x kategori)')
+    parser.add_argument('--time-budget', type=float, default=DEFAULT_TIME_BUDGET, help='Süre bütçesi (saniye)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    n_categories = min(args.categories or args.cabinets, args.cabinets)
+    cabinets, categories, rules = generate_synthetic_instance(
+        args.cabinets, n_categories, args.rules or 5 * n_categories, args.seed)
+
+    start_time = time.perf_counter()
+    affinity = build_affinity_matrix(rules, categories)
+    layout = ShelfLayout(cabinets)
+    setup_seconds = time.perf_counter() - start_time
+    print(f"{args.cabinets} raf, {n_categories} kategori, {len(rules)} kural "
+          f"(matrisler {setup_seconds * 1000:.1f} ms)\n")
+
+    print(f"{'Hedef':<10} {'Açgözlü':>14} {'Yerel arama':>14} {'İyileşme':>9} {'Hamle':>7} {'Karıştırma':>10} {'Süre (s)':>9}")
+    for time_goal, direction in TIME_GOAL_DIRECTIONS.items():
+        initial = greedy_assignment(layout, n_categories, time_goal)
+        start_time = time.perf_counter()
+        _, report = optimize_assignment(affinity, layout, initial, direction, args.time_budget, seed=args.seed)
+        elapsed = time.perf_counter() - start_time
+        print(f"{time_goal:<10} {report['baseline_objective']:>14,.0f} {report['objective']:>14,.0f} "
+              f"{report['improvement_percent']:>8.1f}% {report['iterations']:>7} {report['restarts']:>10} {elapsed:>9.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -121,7 +121,9 @@ function getShelfData() {
         shelves.push({ 
             name: name, 
             x: x, // Send pixel coordinates 
-            y: y  // Send pixel coordinates
+            y: y, // Send pixel coordinates
+            width: shelf.offsetWidth,  // Rafın kapladığı alan (yürüme mesafesi için engel)
+            height: shelf.offsetHeight
         });
     });
     
@@ -175,6 +177,53 @@ document.getElementById('prediction-form').addEventListener('submit', async func
     }
 });
 
+// --- NDJSON Stream Reader ---
+async function readNdjsonStream(response, onRecord) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder('utf-8');
+    let buffer = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        // Son satır yarım kalmış olabilir, bir sonraki parçayı bekle
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.forEach(line => { if (line.trim()) onRecord(JSON.parse(line)); });
+        if (done) break;
+    }
+    if (buffer.trim()) onRecord(JSON.parse(buffer));
+}
+
+function buildReceiptHtml(receiptId, predictions) {
+    let receiptHtml = `<div class="receipt-container">
+        <div class="receipt-header" style="background-color: #f8f9fa; padding: 8px; border-bottom: 1px solid #eee; text-align: center; font-weight: bold;">
+            <div class="receipt-title">Fiş</div>
+        </div>
+        <div class="receipt-content" style="padding: 10px;">
+            <ul class="receipt-item-list">`;
+    
+    if (Array.isArray(predictions)) {
+        predictions.forEach(p => {
+            if (p.error) {
+                receiptHtml += `<li class="receipt-error">${p.error}</li>`;
+            } else {
+                receiptHtml += `<li class="receipt-item">
+                    <span class="product-name">${p.product}</span> 
+                    <span class="category-name">${toTitleCase(p.category)}</span>
+                </li>`;
+            }
+        });
+    }
+    
+    receiptHtml += `</ul>
+        </div>
+        <div class="receipt-footer" style="padding: 5px; text-align: right; border-top: 1px solid #eee;">
+            <div class="order-number">${receiptId.replace('Siparis_', '#')}</div>
+        </div>
+    </div>`;
+    return receiptHtml;
+}
+
 // --- Bulk Prediction & Association (Restored side-by-side receipt display) --- 
 document.getElementById('bulk-prediction-form').addEventListener('submit', async function(event) {
     event.preventDefault();
@@ -210,55 +259,41 @@ document.getElementById('bulk-prediction-form').addEventListener('submit', async
     formData.append('model_choice', modelChoice);
     
     try {
-        const response = await fetch('/predict_bulk', {
+        // Sonuçlar NDJSON akışı olarak alınır ve fişler geldikçe gösterilir
+        const response = await fetch('/predict_bulk?stream=1', {
             method: 'POST',
+            headers: { 'Accept': 'application/x-ndjson' },
             body: formData,
         });
         
-        const data = await response.json();
-        
-        if (!response.ok || data.error) {
-            throw new Error(data.error || `HTTP error! status: ${response.status}`);
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
         }
         
         contentDiv.style.display = 'block';
         
         // Tahmin sonuçlarını fiş şeklinde yan yana göster (RESTORED)
-        if (data.results && Object.keys(data.results).length > 0) {
-            let predictionsHtml = '<div class="receipts-container" style="display: flex; flex-wrap: nowrap; overflow-x: auto; gap: 15px; padding-bottom: 10px;">';
-            
-            for (const [receiptId, predictions] of Object.entries(data.results)) {
-                predictionsHtml += `<div class="receipt-container">
-                    <div class="receipt-header" style="background-color: #f8f9fa; padding: 8px; border-bottom: 1px solid #eee; text-align: center; font-weight: bold;">
-                        <div class="receipt-title">Fiş</div>
-                    </div>
-                    <div class="receipt-content" style="padding: 10px;">
-                        <ul class="receipt-item-list">`;
-                
-                if (Array.isArray(predictions)) {
-                    predictions.forEach(p => {
-                        if (p.error) {
-                            predictionsHtml += `<li class="receipt-error">${p.error}</li>`;
-                        } else {
-                            predictionsHtml += `<li class="receipt-item">
-                                <span class="product-name">${p.product}</span> 
-                                <span class="category-name">${toTitleCase(p.category)}</span>
-                            </li>`;
-                        }
-                    });
-                }
-                
-                predictionsHtml += `</ul>
-                    </div>
-                    <div class="receipt-footer" style="padding: 5px; text-align: right; border-top: 1px solid #eee;">
-                        <div class="order-number">${receiptId.replace('Siparis_', '#')}</div>
-                    </div>
-                </div>`;
+        const receiptsContainer = document.createElement('div');
+        receiptsContainer.className = 'receipts-container';
+        receiptsContainer.style.cssText = 'display: flex; flex-wrap: nowrap; overflow-x: auto; gap: 15px; padding-bottom: 10px;';
+        predictionsDiv.appendChild(receiptsContainer);
+        
+        const data = { association_analysis: null };
+        let receiptCount = 0;
+        
+        await readNdjsonStream(response, record => {
+            if (record.type === 'receipt') {
+                receiptsContainer.insertAdjacentHTML('beforeend', buildReceiptHtml(record.receipt_id, record.predictions));
+                receiptCount++;
+            } else if (record.type === 'association_analysis') {
+                data.association_analysis = record.association_analysis;
+            } else if (record.type === 'error') {
+                throw new Error(record.error);
             }
-            
-            predictionsHtml += '</div>';
-            predictionsDiv.innerHTML = predictionsHtml;
-        } else {
+        });
+        
+        if (receiptCount === 0) {
             predictionsDiv.innerHTML = '<p>Tahmin edilecek ürün bulunamadı.</p>';
         }
         
@@ -473,6 +508,7 @@ document.getElementById('playground-form').addEventListener('submit', async func
     const csvFile = document.getElementById('playground_csv_file').files[0];
     const modelChoice = document.getElementById('playground_model_choice').value;
     const timeGoal = document.getElementById('time_goal').value;
+    const distanceMetric = document.getElementById('distance_metric').value;
 
     const resultDiv = document.getElementById('playground-result');
     const loadingDiv = document.getElementById('playground-loading');
@@ -512,6 +548,7 @@ document.getElementById('playground-form').addEventListener('submit', async func
     formData.append('csv_file', csvFile);
     formData.append('model_choice', modelChoice);
     formData.append('time_goal', timeGoal);
+    formData.append('distance_metric', distanceMetric);
 
     try {
         const response = await fetch('/shelf_optimization', {
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Metin Normalizasyonu
+--------------------
+Eğitim (data_preprocessing.py) ve servis (web.py) tarafının paylaştığı ürün
+adı normalizasyon fonksiyonları.
+
+Toplu API'ler (`preprocess_texts`, `normalize_product_names`) isimleri
+ayırıcıyla tek bir metinde birleştirir ve her adımı (str.replace, lower,
+split, bytes.translate) bu metin üzerinde bir kez, C seviyesinde uygular;
+satır başına Python döngüsü ya da düzenli ifade eşleştirmesi yapılmaz.
+Tekil fonksiyonlar aynı sonucu veren önceden derlenmiş düzenli ifadeleri
+kullanır.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# Türkçe karakterlerin İngilizce karşılıkları
+# Not: str.translate Türkçe karakterlerde karakter başına sözlük araması
+# yaptığı için CPython'da ardışık str.replace çağrılarından yavaştır.
+TURKISH_TO_ENGLISH = (
+    ('ç', 'c'), ('Ç', 'C'),
+    ('ğ', 'g'), ('Ğ', 'G'),
+    ('ı', 'i'), ('İ', 'I'),
+    ('ö', 'o'), ('Ö', 'O'),
+    ('ş', 's'), ('Ş', 'S'),
+    ('ü', 'u'), ('Ü', 'U')
+)
+
+# Küçük harfe çevrilmiş metinde ASCII büyük harf kalmadığı için Türkçe
+# küçük harfler bayt tablosuna girmeden önce geçici olarak bunlara taşınır
+_TURKISH_LETTER_PLACEHOLDERS = (('ç', 'C'), ('ğ', 'G'), ('ı', 'I'), ('ö', 'O'), ('ş', 'S'), ('ü', 'U'))
+
+# Toplu işlemde isimleri birleştirmek için kullanılan ayırıcı
+_SEPARATOR = '\x00'
+_SEPARATOR_BYTES = _SEPARATOR.encode('ascii')
+
+def _build_letter_table():
+    """Harfleri ve ayırıcıyı koruyup diğer tüm baytları boşluğa çeviren tablo."""
+    table = bytearray(b' ' * 256)
+    for byte in b'abcdefghijklmnopqrstuvwxyz' + ''.join(p for _, p in _TURKISH_LETTER_PLACEHOLDERS).encode('ascii'):
+        table[byte] = byte
+    table[_SEPARATOR_BYTES[0]] = _SEPARATOR_BYTES[0]
+    return bytes(table)
+
+_LETTER_TABLE = _build_letter_table()
+
+# Türkçe harfler dışındaki her karakter dizisi (rakam, noktalama, boşluk) tek boşluk olur
+_NON_LETTER_RUN = re.compile(r'[^a-zçğıöşü]+')
+
+# Toplu işlemde tek seferde birleştirilen isim sayısı (bellek kullanımını sınırlar)
+BATCH_CHUNK_SIZE = 65536
+
+def _replace_turkish_chars(text):
+    for turkish_char, english_char in TURKISH_TO_ENGLISH:
+        text = text.replace(turkish_char, english_char)
+    return text
+
+def convert_turkish_to_english(text):
+    """Türkçe karakterleri İngilizce karşılıklarına dönüştürür."""
+    if not text:
+        return text
+    return _replace_turkish_chars(text)
+
+def preprocess_text(text):
+    """Eğitim için ürün adını küçük harfe çevirir ve Türkçe harfler dışındaki karakterleri temizler."""
+    # Gelen verinin string olduğundan emin olalım
+    if not isinstance(text, str):
+        text = str(text)
+    return _NON_LETTER_RUN.sub(' ', text.lower()).strip()
+
+def normalize_product_name(product):
+    """Ürün adını tahmin ve önbellek anahtarı için normalize eder."""
+    # Vektörleştirici küçük harfe çevirdiği ve boşlukları yok saydığı için
+    # bu dönüşümler tahmin sonucunu değiştirmez.
+    return ' '.join(_replace_turkish_chars(str(product)).lower().split())
+
+# --- Toplu API ---
+def _as_string_list(texts):
+    """pandas Series, NumPy dizisi veya listeyi str listesine dönüştürür."""
+    if isinstance(texts, pd.Series):
+        texts = texts.to_numpy()
+    if isinstance(texts, np.ndarray):
+        texts = texts.tolist()
+    return [text if isinstance(text, str) else str(text) for text in texts]
+
+def _join_for_batch(texts):
+    """İsimleri ayırıcıyla birleştirir; isimlerden biri ayırıcı içeriyorsa None döner."""
+    joined = _SEPARATOR.join(texts)
+    if joined.count(_SEPARATOR) != len(texts) - 1:
+        return None
+    return joined
+
+def _apply_in_chunks(texts, batch_function, single_function):
+    """Listeyi parçalara bölüp her parçayı birleştirilmiş tek metin olarak işler."""
+    texts = _as_string_list(texts)
+    results = []
+    for start in range(0, len(texts), BATCH_CHUNK_SIZE):
+        chunk = texts[start:start + BATCH_CHUNK_SIZE]
+        joined = _join_for_batch(chunk)
+        if joined is None:
+            # İsimlerden biri ayırıcı içeriyor, bu parçayı tek tek işle
+            results.extend(single_function(text) for text in chunk)
+        else:
+            results.extend(batch_function(joined))
+    return results
+
+def _preprocess_joined(joined):
+    text = joined.lower()
+    for letter, placeholder in _TURKISH_LETTER_PLACEHOLDERS:
+        text = text.replace(letter, placeholder)
+    # ASCII olmayan karakterler '?' olur ve tabloda harf dışı her bayt gibi boşluğa çevrilir
+    data = text.encode('ascii', errors='replace').translate(_LETTER_TABLE)
+    # Boşluk dizilerini tek boşluğa indir, ayırıcı çevresindeki boşlukları sil (strip)
+    data = b' '.join(data.split())
+    data = data.replace(b' ' + _SEPARATOR_BYTES, _SEPARATOR_BYTES).replace(_SEPARATOR_BYTES + b' ', _SEPARATOR_BYTES)
+    text = data.decode('ascii')
+    for letter, placeholder in _TURKISH_LETTER_PLACEHOLDERS:
+        text = text.replace(placeholder, letter)
+    return text.split(_SEPARATOR)
+
+def _normalize_joined(joined):
+    text = ' '.join(_replace_turkish_chars(joined).lower().split())
+    text = text.replace(' ' + _SEPARATOR, _SEPARATOR).replace(_SEPARATOR + ' ', _SEPARATOR)
+    return text.split(_SEPARATOR)
+
+def preprocess_texts(texts):
+    """preprocess_text fonksiyonunun toplu sürümü; str listesi döndürür."""
+    return _apply_in_chunks(texts, _preprocess_joined, preprocess_text)
+
+def normalize_product_names(products):
+    """normalize_product_name fonksiyonunun toplu sürümü; str listesi döndürür."""
+    return _apply_in_chunks(products, _normalize_joined, normalize_product_name)
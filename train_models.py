@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Model Eğitim Orkestratörü
+-------------------------
+İşlenmiş eğitim/test verilerini bir kez yükler ve Naive Bayes, Karar Ağacı
+ve Lojistik Regresyon modellerini bir süreç havuzunda eşzamanlı eğitir.
+Eğitim verisinin içeriği ve hiperparametreler `models/training_manifest.json`
+dosyasına özet (hash) olarak yazılır; bunlar değişmediyse ve model dosyası
+yerindeyse model yeniden eğitilmez. Böylece veri yenilendiğinde toplam süre
+modellerin toplamı değil, en yavaş modelin süresi kadar olur.
+
+Kullanım:
+    python train_models.py                      # Değişen modelleri paralel eğit
+    python train_models.py --models naive_bayes --report
+    python train_models.py --n-jobs 1 --force   # Hepsini sırayla yeniden eğit
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, classification_report
+
+from inference_pipeline import export_pipelines
+
+# --- Ayarlar ---
+# İşlenmiş verilerin ve kaydedilmiş nesnelerin bulunduğu dizin
+PROCESSED_DATA_DIR = 'processed_data'
+# Eğitilmiş modellerin kaydedileceği dizin
+MODEL_OUTPUT_DIR = 'models'
+# Eğitim önbelleği bilgilerinin tutulduğu dosya
+MANIFEST_FILENAME = 'training_manifest.json'
+
+# Model tanımları: sınıf, hiperparametreler ve çıktı dosyası
+MODEL_SPECS = {
+    # Metin sınıflandırmada hızlı ve etkili bir temel model.
+    # alpha: Laplace/Lidstone düzeltme parametresi, sıfır olasılıkları önler.
+    'naive_bayes': {
+        'label': 'Naive Bayes',
+        'estimator': MultinomialNB,
+        'params': {'alpha': 1.0},
+        'filename': 'naive_bayes_model.joblib'
+    },
+    # class_weight='balanced': Dengesiz veri setlerinde azınlık sınıflarına daha fazla ağırlık verir.
+    'decision_tree': {
+        'label': 'Decision Tree',
+        'estimator': DecisionTreeClassifier,
+        'params': {'random_state': 42, 'class_weight': 'balanced'},
+        'filename': 'decision_tree_model.joblib'
+    },
+    # solver='saga': Büyük, seyrek ve çok sınıflı veriler için uygun.
+    'logistic_regression': {
+        'label': 'Logistic Regression',
+        'estimator': LogisticRegression,
+        'params': {'solver': 'saga', 'random_state': 42, 'class_weight': 'balanced', 'max_iter': 5000, 'C': 1.0},
+        'filename': 'logistic_regression_model.joblib'
+    }
+}
+
+# --- Özet (Hash) Yardımcıları ---
+def file_digest(path, chunk_size=1024 * 1024):
+    """Dosya içeriğinin SHA-256 özetini döndürür."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def training_key(name, train_digest):
+    """Eğitim verisi, model sınıfı ve hiperparametrelerden önbellek anahtarı üretir."""
+    spec = MODEL_SPECS[name]
+    payload = {
+        'model': name,
+        'estimator': f"{spec['estimator'].__module__}.{spec['estimator'].__qualname__}",
+        'params': spec['params'],
+        'sklearn': sklearn.__version__,
+        'train_data': train_digest
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+def load_manifest(path):
+    """Eğitim manifestosunu okur; yoksa veya bozuksa boş döndürür."""
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest, path):
+    """Manifestoyu geçici dosya üzerinden atomik olarak yazar."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(temp_path, path)
+
+# --- Eğitim ---
+# Süreç havuzundaki işçilerin paylaştığı veri (fork ile kopyalanmadan devralınır)
+_worker_data = {}
+
+def _init_worker(data):
+    _worker_data.update(data)
+
+def build_report(data, y_pred):
+    """Test verisi için sınıflandırma raporu (precision, recall, F1) üretir."""
+    # Sadece test ve tahminde bulunan etiketleri raporla
+    unique_labels = np.unique(np.concatenate((data['y_test'], y_pred)))
+    return classification_report(
+        data['y_test'],
+        y_pred,
+        labels=unique_labels,
+        target_names=data['classes'][unique_labels],
+        zero_division=0
+    )
+
+def train_model(name, output_dir, include_report=False):
+    """Tek bir modeli eğitir, test verisinde değerlendirir ve kaydeder."""
+    spec = MODEL_SPECS[name]
+    data = _worker_data
+
+    start_time = time.perf_counter()
+    model = spec['estimator'](**spec['params'])
+    model.fit(data['X_train'], data['y_train'])
+    fit_seconds = time.perf_counter() - start_time
+
+    y_pred = model.predict(data['X_test'])
+    result = {
+        'name': name,
+        'fit_seconds': fit_seconds,
+        'accuracy': float(accuracy_score(data['y_test'], y_pred))
+    }
+
+    if include_report:
+        result['report'] = build_report(data, y_pred)
+
+    # Yarım yazılmış model dosyası bırakmamak için önce geçici dosyaya yaz
+    model_path = os.path.join(output_dir, spec['filename'])
+    temp_path = f"{model_path}.tmp"
+    joblib.dump(model, temp_path)
+    os.replace(temp_path, model_path)
+    result['total_seconds'] = time.perf_counter() - start_time
+    return result
+
+def load_training_data(processed_data_dir):
+    """Eğitim/test verisini ve etiket kodlayıcının sınıflarını bir kez yükler."""
+    train_data = joblib.load(os.path.join(processed_data_dir, 'train_data.joblib'))
+    test_data = joblib.load(os.path.join(processed_data_dir, 'test_data.joblib'))
+    label_encoder = joblib.load(os.path.join(processed_data_dir, 'label_encoder.joblib'))
+    return {
+        'X_train': train_data['X_train'],
+        'y_train': train_data['y_train'],
+        'X_test': test_data['X_test'],
+        'y_test': test_data['y_test'],
+        'classes': label_encoder.classes_
+    }
+
+def train_models(model_names=None, n_jobs=None, force=False, include_report=False,
+                 processed_data_dir=PROCESSED_DATA_DIR, output_dir=MODEL_OUTPUT_DIR):
+    """Değişen modelleri paralel eğitir; model adı -> sonuç sözlüğü döndürür."""
+    model_names = list(model_names or MODEL_SPECS)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    manifest = load_manifest(manifest_path)
+
+    train_digest = file_digest(os.path.join(processed_data_dir, 'train_data.joblib'))
+
+    # Girdileri ve hiperparametreleri değişmemiş modelleri atla
+    results = {}
+    pending = []
+    for name in model_names:
+        key = training_key(name, train_digest)
+        entry = manifest.get(name, {})
+        model_path = os.path.join(output_dir, MODEL_SPECS[name]['filename'])
+        if not force and entry.get('key') == key and os.path.exists(model_path):
+            results[name] = dict(entry, name=name, status='cached')
+        else:
+            pending.append((name, key))
+
+    if not pending and not include_report:
+        return results
+
+    data = load_training_data(processed_data_dir)
+    if include_report:
+        # Önbellekten gelen modellerin raporu kayıtlı model ile üretilir
+        for name, result in results.items():
+            model = joblib.load(os.path.join(output_dir, MODEL_SPECS[name]['filename']))
+            result['report'] = build_report(data, model.predict(data['X_test']))
+    if not pending:
+        return results
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, len(pending)))
+
+    def record(result, key):
+        manifest[result['name']] = {
+            'key': key,
+            'trained_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'fit_seconds': result['fit_seconds'],
+            'accuracy': result['accuracy']
+        }
+        results[result['name']] = dict(result, status='trained')
+
+    if n_jobs == 1:
+        _init_worker(data)
+        for name, key in pending:
+            record(train_model(name, output_dir, include_report), key)
+    else:
+        # fork destekleniyorsa veri işçilere kopyalanmadan (pickle olmadan) aktarılır
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        keys = dict(pending)
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=context,
+                                 initializer=_init_worker, initargs=(data,)) as executor:
+            futures = [executor.submit(train_model, name, output_dir, include_report) for name, _ in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                record(result, keys[result['name']])
+
+    save_manifest(manifest, manifest_path)
+    return results
+
+def export_model_pipelines(model_names, processed_data_dir=PROCESSED_DATA_DIR, output_dir=MODEL_OUTPUT_DIR):
+    """Modeller için birleşik çıkarım hatlarını yeniden üretir (hızlıdır, eğitim gerektirmez)."""
+    model_names = [name for name in model_names if os.path.exists(os.path.join(output_dir, MODEL_SPECS[name]['filename']))]
+    if model_names:
+        export_pipelines(model_names, processed_data_dir, output_dir)
+    return model_names
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Kategori tahmin modellerini paralel ve önbellekli eğitir.')
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_SPECS), default=list(MODEL_SPECS),
+                        help='Eğitilecek modeller (varsayılan: hepsi)')
+    parser.add_argument('--n-jobs', type=int, default=None,
+                        help='Paralel işçi sayısı (varsayılan: CPU sayısı)')
+    parser.add_argument('--force', action='store_true',
+                        help='Önbelleği yok sayıp modelleri yeniden eğit')
+    parser.add_argument('--report', action='store_true',
+                        help='Her model için sınıflandırma raporunu yazdır')
+    args = parser.parse_args(argv)
+
+    print("Modeller eğitiliyor...")
+    start_time = time.perf_counter()
+    try:
+        results = train_models(args.models, n_jobs=args.n_jobs, force=args.force, include_report=args.report)
+    except FileNotFoundError as e:
+        print(f"Hata: Gerekli veri dosyaları bulunamadı ({e}).")
+        print("Lütfen önce 'data_preprocessing.py' betiğini çalıştırdığınızdan emin olun.")
+        sys.exit(1)
+    # Servis tarafının kullandığı birleşik çıkarım hatlarını güncelle
+    exported = export_model_pipelines(args.models)
+    wall_seconds = time.perf_counter() - start_time
+
+    print(f"\n{'Model':<22} {'Durum':<10} {'Eğitim (s)':>11} {'Doğruluk':>9}")
+    for name in args.models:
+        result = results[name]
+        print(f"{MODEL_SPECS[name]['label']:<22} {result['status']:<10} "
+              f"{result['fit_seconds']:>11.2f} {result['accuracy']:>9.4f}")
+    if exported:
+        print(f"\nBirleşik çıkarım hatları güncellendi: {', '.join(exported)}")
+    print(f"\nToplam süre: {wall_seconds:.2f} s")
+
+    for name in args.models:
+        if 'report' in results[name]:
+            print(f"\n{MODEL_SPECS[name]['label']} Sınıflandırma Raporu:")
+            print(results[name]['report'])
+
+if __name__ == '__main__':
+    main()
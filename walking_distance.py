@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Yürüme Mesafesi
+---------------
+Raflar arası mesafeyi düz çizgi yerine müşterinin rafların etrafından
+dolaşarak yürüdüğü yol uzunluğu olarak hesaplar.
+
+Mağaza alanı `cell_size` piksellik hücrelerden oluşan bir ızgaraya bölünür.
+Ön yüzün çizdiği raf dikdörtgenleri (x, y sol üst köşe, width, height)
+engel hücreleridir. Her rafın erişim noktaları dikdörtgeni çevreleyen boş
+hücrelerdir. Boş hücreler 8 komşulu bir çizgeye dönüştürülür (köşegen
+adımlar √2 ağırlıklıdır ve raf köşelerinden geçilemez). Her raf için
+erişim noktalarından çok kaynaklı Dijkstra (scipy.sparse.csgraph) bir kez
+çalıştırılır ve tüm raf çiftleri arası yürüme mesafesi matrisi çıkarılır.
+
+Matris yerleşimin özetine (raf isimleri, dikdörtgenler, hücre boyutu)
+göre bellekte (LRU) ve diskte (joblib) saklanır. Hesaplama raf sayısı x
+hücre sayısı ile orantılıdır (500 raf için birkaç saniye); aynı kat planının
+tekrar optimize edilmesi yol hesabı gerektirmez.
+
+Kullanım (performans testi):
+    python walking_distance.py --cabinets 500
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import dijkstra
+
+from shelf_layout import ShelfLayout
+
+# --- Ayarlar ---
+# Ön yüzdeki .shelf-item boyutları (istekte width/height yoksa kullanılır)
+DEFAULT_CABINET_WIDTH = 86
+DEFAULT_CABINET_HEIGHT = 36
+# Izgara hücre boyutu (piksel); ızgara MAX_GRID_CELLS hücreyi aşarsa büyütülür
+DEFAULT_CELL_SIZE = 10
+MAX_GRID_CELLS = 100000
+# Yerleşimin çevresinde bırakılan yürüme alanı (hücre)
+GRID_MARGIN_CELLS = 2
+# Önbellek biçim sürümü; hesaplama değiştiğinde artırılır, eski kayıtlar kullanılmaz
+CACHE_FORMAT_VERSION = 1
+
+# --- Izgara ve Çizge ---
+def cabinet_rectangles(cabinets):
+    """Rafların (x, y, genişlik, yükseklik) dizisini döndürür."""
+    return np.array([
+        [cabinet['x'], cabinet['y'],
+         cabinet.get('width') or DEFAULT_CABINET_WIDTH, cabinet.get('height') or DEFAULT_CABINET_HEIGHT]
+        for cabinet in cabinets
+    ], dtype=np.float64).reshape(len(cabinets), 4)
+
+def choose_cell_size(rectangles, cell_size=DEFAULT_CELL_SIZE, max_cells=MAX_GRID_CELLS):
+    """Izgara en fazla max_cells hücre olacak şekilde hücre boyutunu seçer."""
+    extent = (rectangles[:, :2] + rectangles[:, 2:]).max(axis=0) - rectangles[:, :2].min(axis=0)
+    cells = np.prod(extent / cell_size + 2 * GRID_MARGIN_CELLS + 1)
+    if cells > max_cells:
+        cell_size *= float(np.sqrt(cells / max_cells))
+    return float(cell_size)
+
+def rectangle_cells(rectangles, origin, cell_size):
+    """Her dikdörtgenin kapladığı hücre aralıklarını (satır0, satır1, sütun0, sütun1) döndürür.
+
+    Merkezi dikdörtgenin içinde kalan hücreler kapsanır; hücreden küçük
+    raflar merkezlerinin bulunduğu hücreyi kaplar.
+    """
+    left = (rectangles[:, 0] - origin[0]) / cell_size
+    top = (rectangles[:, 1] - origin[1]) / cell_size
+    right = left + rectangles[:, 2] / cell_size
+    bottom = top + rectangles[:, 3] / cell_size
+    c0, c1 = np.ceil(left - 0.5), np.floor(right - 0.5)
+    r0, r1 = np.ceil(top - 0.5), np.floor(bottom - 0.5)
+    # En az bir hücre kaplansın
+    small = c1 < c0
+    c0[small] = c1[small] = np.floor((left[small] + right[small]) / 2)
+    small = r1 < r0
+    r0[small] = r1[small] = np.floor((top[small] + bottom[small]) / 2)
+    return np.stack([r0, r1, c0, c1], axis=1).astype(np.int64)
+
+def grid_edges(free, cell_size):
+    """Boş hücreler arası 8 komşulu kenarları (kaynak, hedef, ağırlık) dizileri olarak üretir.
+
+    Her kenar iki yönde de yazılır; hücre -> düğüm numarası dizisi de döndürülür.
+    """
+    node_ids = np.full(free.shape, -1, dtype=np.int64)
+    node_ids[free] = np.arange(int(free.sum()))
+
+    sources, targets, weights = [], [], []
+    def connect(source_cells, target_cells, allowed, weight):
+        source_ids, target_ids = source_cells[allowed], target_cells[allowed]
+        # Dijkstra'nın her çağrıda simetrikleştirme yapmaması için iki yön de eklenir
+        sources.extend((source_ids, target_ids))
+        targets.extend((target_ids, source_ids))
+        weights.append(np.full(2 * len(source_ids), weight))
+
+    # Yatay ve dikey komşular
+    connect(node_ids[:, :-1], node_ids[:, 1:], free[:, :-1] & free[:, 1:], cell_size)
+    connect(node_ids[:-1, :], node_ids[1:, :], free[:-1, :] & free[1:, :], cell_size)
+    # Köşegen komşular: iki ara hücre de boşsa (raf köşesinden geçilmez)
+    diagonal = cell_size * np.sqrt(2.0)
+    connect(node_ids[:-1, :-1], node_ids[1:, 1:],
+            free[:-1, :-1] & free[1:, 1:] & free[:-1, 1:] & free[1:, :-1], diagonal)
+    connect(node_ids[:-1, 1:], node_ids[1:, :-1],
+            free[:-1, 1:] & free[1:, :-1] & free[:-1, :-1] & free[1:, 1:], diagonal)
+
+    return np.concatenate(sources), np.concatenate(targets), np.concatenate(weights), node_ids
+
+def compute_walking_matrix(rectangles, cell_size):
+    """Raf dikdörtgenlerinden tüm raf çiftleri arası yürüme mesafesi matrisini hesaplar.
+
+    Mesafe, raf merkezinden bir erişim noktasına düz çizgi, erişim
+    noktaları arasında ızgara yolu ve diğer rafın erişim noktasından
+    merkezine düz çizgi toplamlarının en küçüğüdür. Bunun için her raf,
+    erişim noktalarına tek yönlü kenarlarla bağlı sanal bir düğüm olarak
+    çizgeye eklenir ve her raf için tek kaynaklı Dijkstra çalıştırılır.
+
+    (matris, bilgi) döndürür. Erişim noktası olmayan veya birbirine
+    ulaşılamayan raf çiftleri için mesafe np.inf olur.
+    """
+    n = len(rectangles)
+    margin = GRID_MARGIN_CELLS * cell_size
+    origin = rectangles[:, :2].min(axis=0) - margin
+    extent = (rectangles[:, :2] + rectangles[:, 2:]).max(axis=0) + margin - origin
+    shape = (int(np.ceil(extent[1] / cell_size)) + 1, int(np.ceil(extent[0] / cell_size)) + 1)
+
+    spans = rectangle_cells(rectangles, origin, cell_size)
+    free = np.ones(shape, dtype=bool)
+    for r0, r1, c0, c1 in spans.tolist():
+        free[r0:r1 + 1, c0:c1 + 1] = False
+    sources, targets, weights, node_ids = grid_edges(free, cell_size)
+    n_cells = int(free.sum())
+
+    # Erişim noktaları: dikdörtgeni çevreleyen halkadaki boş hücreler
+    cell_rows, cell_cols = np.nonzero(free)
+    access = []
+    for r0, r1, c0, c1 in spans.tolist():
+        ring = node_ids[max(r0 - 1, 0):r1 + 2, max(c0 - 1, 0):c1 + 2]
+        access.append(np.unique(ring[ring >= 0]))
+    counts = np.array([len(ids) for ids in access], dtype=np.int64)
+    all_access = np.concatenate(access) if n else np.empty(0, dtype=np.int64)
+    owners = np.repeat(np.arange(n), counts)
+    has_access = counts > 0
+
+    # Raf merkezinden erişim noktası hücre merkezine düz çizgi mesafe
+    centers = rectangles[:, :2] + rectangles[:, 2:] / 2
+    offsets = np.hypot(origin[0] + (cell_cols[all_access] + 0.5) * cell_size - centers[owners, 0],
+                       origin[1] + (cell_rows[all_access] + 0.5) * cell_size - centers[owners, 1])
+
+    # Sanal raf düğümleri (n_cells + i) sadece kendi erişim noktalarına doğru kenarlıdır,
+    # böylece yollar başka bir rafın içinden kestirme yapamaz
+    graph = sp.csr_matrix(
+        (np.concatenate((weights, offsets)),
+         (np.concatenate((sources, n_cells + owners)), np.concatenate((targets, all_access)))),
+        shape=(n_cells + n, n_cells + n)
+    )
+
+    matrix = np.full((n, n), np.inf)
+    if len(all_access):
+        # Sahibe göre gruplanmış erişim noktaları üzerinde min-reduce için başlangıç indeksleri
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[has_access]
+        for i in np.flatnonzero(has_access):
+            field = dijkstra(graph, directed=True, indices=n_cells + i)
+            matrix[i, has_access] = np.minimum.reduceat(field[all_access] + offsets, starts)
+    np.fill_diagonal(matrix, 0.0)
+    # Yuvarlama farklarına karşı simetrik yap
+    matrix = np.minimum(matrix, matrix.T)
+
+    info = {
+        'metric': 'walking',
+        'cell_size': cell_size,
+        'grid_shape': list(shape),
+        'walkable_cells': int(free.sum()),
+        'unreachable_pairs': int(np.isinf(matrix[np.triu_indices(n, 1)]).sum())
+    }
+    return matrix, info
+
+# --- Yerleşim ---
+class WalkingLayout(ShelfLayout):
+    """Mesafeleri önceden hesaplanmış yürüme mesafesi matrisinden okunan raf yerleşimi.
+
+    Merkeze uzaklık (açgözlü başlangıç yerleşimi için) düz çizgi olarak kalır.
+    Ulaşılamayan raf çiftlerinde düz çizgi mesafesi kullanılır.
+    """
+
+    def __init__(self, cabinets, matrix, info):
+        super().__init__(cabinets)
+        unreachable = np.isinf(matrix)
+        if unreachable.any():
+            matrix = np.where(unreachable, ShelfLayout.columns(self, np.arange(len(self))), matrix)
+        self._matrix = matrix
+        self.info = info
+
+    def columns(self, indices):
+        return self._matrix[:, np.asarray(indices, dtype=np.int64)]
+
+    def pair_distances(self, first, second):
+        return self._matrix[np.asarray(first, dtype=np.int64), np.asarray(second, dtype=np.int64)]
+
+    def distance_matrix(self):
+        return self._matrix
+
+    def nearest(self, name, k=5):
+        """Yürüme mesafesine göre en yakın k rafı döndürür (kendisi hariç)."""
+        origin = self.index[name]
+        order = [i for i in np.argsort(self._matrix[origin], kind='stable').tolist() if i != origin][:k]
+        return [(self.names[i], float(self._matrix[origin, i])) for i in order]
+
+    def nearest_indices(self, k=5):
+        k = min(k, len(self) - 1)
+        masked = self._matrix.copy()
+        np.fill_diagonal(masked, np.inf)
+        indices = np.argsort(masked, axis=1, kind='stable')[:, :max(k, 0)]
+        return np.take_along_axis(masked, indices, axis=1), indices
+
+# --- Önbellek ---
+def layout_key(cabinets, cell_size):
+    """Raf isimleri, dikdörtgenleri ve hücre boyutundan yerleşim özeti üretir."""
+    payload = {
+        'version': CACHE_FORMAT_VERSION,
+        'cell_size': cell_size,
+        'cabinets': [[cabinet['name']] + row for cabinet, row in zip(cabinets, cabinet_rectangles(cabinets).tolist())]
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+class WalkingDistanceCache:
+    """Yerleşim özeti -> yürüme mesafesi matrisi için bellek (LRU) ve disk önbelleği."""
+
+    def __init__(self, cache_dir=None, max_size=32, cell_size=DEFAULT_CELL_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.cell_size = cell_size
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.joblib")
+
+    def layout(self, cabinets):
+        """Yerleşim için WalkingLayout döndürür; matris gerekirse hesaplanır ve saklanır."""
+        rectangles = cabinet_rectangles(cabinets)
+        cell_size = choose_cell_size(rectangles, self.cell_size)
+        key = layout_key(cabinets, cell_size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return WalkingLayout(cabinets, entry['matrix'], dict(entry['info'], cache='memory'))
+
+        source = 'computed'
+        entry = None
+        if self.cache_dir and os.path.exists(self._disk_path(key)):
+            try:
+                entry = joblib.load(self._disk_path(key))
+                source = 'disk'
+            except Exception:
+                entry = None
+        if entry is None:
+            start_time = time.perf_counter()
+            matrix, info = compute_walking_matrix(rectangles, cell_size)
+            info['compute_seconds'] = time.perf_counter() - start_time
+            entry = {'matrix': matrix, 'info': info}
+            if self.cache_dir:
+                # Yarım yazılmış dosya bırakmamak için önce geçici dosyaya yaz
+                os.makedirs(self.cache_dir, exist_ok=True)
+                temp_path = f"{self._disk_path(key)}.{os.getpid()}.tmp"
+                joblib.dump(entry, temp_path)
+                os.replace(temp_path, self._disk_path(key))
+
+        with self._lock:
+            if source == 'disk':
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+            if self.max_size > 0:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return WalkingLayout(cabinets, entry['matrix'], dict(entry['info'], cache=source))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses
+            }
+
+def main():
+    parser = argparse.ArgumentParser(description='Yürüme mesafesi matrisi ve önbellek performans testi.')
+    parser.add_argument('--cabinets', type=int, default=500, help='Raf sayısı')
+    parser.add_argument('--cell-size', type=float, default=DEFAULT_CELL_SIZE, help='Izgara hücre boyutu (piksel)')
+    args = parser.parse_args()
+
+    # Koridorlarla ayrılmış raf sıraları: her sırada 10 raf yan yana
+    cabinets = [{'name': f"Raf {i}", 'x': (i % 10) * DEFAULT_CABINET_WIDTH + 10,
+                 'y': (i // 10) * (DEFAULT_CABINET_HEIGHT + 40) + 10} for i in range(args.cabinets)]
+    cache = WalkingDistanceCache(cell_size=args.cell_size)
+
+    for label in ('İlk hesaplama', 'Önbellekten'):
+        start_time = time.perf_counter()
+        layout = cache.layout(cabinets)
+        elapsed = time.perf_counter() - start_time
+        print(f"{label:<16} {elapsed * 1000:>10.1f} ms  ({layout.info['cache']})")
+    print(f"\nIzgara: {layout.info['grid_shape']} (hücre {layout.info['cell_size']:.1f} px), "
+          f"ulaşılamayan çift: {layout.info['unreachable_pairs']}")
+    euclidean = ShelfLayout(cabinets).distance_matrix()
+    ratio = layout.distance_matrix()[euclidean > 0] / euclidean[euclidean > 0]
+    print(f"Yürüme / düz çizgi oranı: ortalama {ratio.mean():.2f}, en fazla {ratio.max():.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -5,20 +5,36 @@ Market Ürün Kategori Tahmini ve Raf Düzeni Optimizasyonu
 Bu modül, ürün isimlerinden kategori tahmini yapan ve market raf düzenini
 birliktelik kurallarına göre optimize eden bir Flask web uygulamasıdır.
 """
+import io
 import os
-import sys
+import contextlib
+import multiprocessing
 import json
-import math
-import re
+import logging
+import datetime
+import hashlib
+import threading
+import time
 import traceback
 from collections import OrderedDict
 
-import joblib
-import pandas as pd
-import chardet
-from flask import Flask, request, jsonify, render_template
-from mlxtend.frequent_patterns import apriori, association_rules
-from mlxtend.preprocessing import TransactionEncoder
+import numpy as np
+from flask import Flask, Response, g, request, jsonify, render_template, send_file, stream_with_context, url_for
+
+from association_analysis import ASSOCIATION_ENGINES, DEFAULT_ASSOCIATION_ENGINE, perform_association_analysis
+from association_store import DEFAULT_WINDOW_DAYS, AssociationStatisticsStore
+from metrics import REGISTRY, count, current_trace, observe_stage, span, start_request_trace, timed_iter
+from job_queue import DEFAULT_MAX_PENDING, FINAL_STATUSES, JobQueue, JobQueueFull
+from model_registry import ModelHolder, ModelRegistry, ModelSet, ModelSetView, ModelUnavailableError
+from online_learning import DEFAULT_SAMPLE_WEIGHT, INCREMENTAL_MODELS, OnlineUpdater
+from parallel_prediction import ParallelPredictor, ShardPredictor
+from receipt_reader import CSV_READ_CHUNK_SIZE, iter_receipt_products, open_csv_receipts
+from shelf_layout import ShelfLayout
+from walking_distance import WalkingDistanceCache
+from shelf_optimizer import (DEFAULT_TIME_BUDGET, SHELF_SOLVERS, TIME_GOAL_DIRECTIONS, build_affinity_matrix,
+                             greedy_assignment, greedy_report, optimize_assignment)
+from inference_pipeline import PIPELINE_FORMAT_VERSION, pipeline_filename, top_k_predictions
+from text_normalizer import normalize_product_names
 
 # Flask uygulaması
 app = Flask(__name__, static_folder='static', static_url_path='')
@@ -29,147 +45,97 @@ MODELS_DIR = os.path.join(PROJECT_ROOT, 'models')
 PROCESSED_DATA_DIR = os.path.join(PROJECT_ROOT, 'processed_data')
 
 # Model ve işlemciler
-try:
-    # Vektörleştirici ve etiket kodlayıcıyı yükle
-    vectorizer = joblib.load(os.path.join(PROCESSED_DATA_DIR, 'tfidf_vectorizer.joblib'))
-    label_encoder = joblib.load(os.path.join(PROCESSED_DATA_DIR, 'label_encoder.joblib'))
-    
-    # Modelleri yükle
-    models = {
-        'naive_bayes': joblib.load(os.path.join(MODELS_DIR, 'naive_bayes_model.joblib')),
-        'decision_tree': joblib.load(os.path.join(MODELS_DIR, 'decision_tree_model.joblib')),
-        'logistic_regression': joblib.load(os.path.join(MODELS_DIR, 'logistic_regression_model.joblib'))
-    }
-    print("Modeller ve işlemciler başarıyla yüklendi.")
-except Exception as e:
-    print(f"Model veya işlemci yükleme hatası: {e}")
-    sys.exit(1)
+# Artefaktlar ilk kullanımda ve bellek eşlemeli (mmap) olarak yüklenir;
+# eksik bir model diğerlerinin hizmet vermesini engellemez.
+MODEL_MMAP_MODE = os.environ.get('MODEL_MMAP_MODE', 'r') or None
 
-# --- Yardımcı Fonksiyon: Birliktelik Analizi ---
-def perform_association_analysis(all_categories_by_receipt):
-    """Kategori birliktelik analizi yapar."""
-    if len(all_categories_by_receipt) <= 1:
-        return {'message': 'Birliktelik analizi için yeterli sipariş sayısı yok. En az 2 sipariş gerekiyor.'}
+MODEL_NAMES = ['naive_bayes', 'decision_tree', 'logistic_regression']
+ARTIFACT_PATHS = {
+    'processors': {
+        'tfidf_vectorizer': os.path.join(PROCESSED_DATA_DIR, 'tfidf_vectorizer.joblib'),
+        'label_encoder': os.path.join(PROCESSED_DATA_DIR, 'label_encoder.joblib')
+    },
+    'models': {name: os.path.join(MODELS_DIR, f"{name}_model.joblib") for name in MODEL_NAMES},
+    # Normalizasyon, vektörleştirici, model ve sınıf isimlerini tek artefaktta birleştiren hatlar
+    'pipelines': {name: os.path.join(MODELS_DIR, pipeline_filename(name)) for name in MODEL_NAMES}
+}
 
-    try:
-        # TransactionEncoder ile verileri hazırla
-        te = TransactionEncoder()
-        te_ary = te.fit_transform(all_categories_by_receipt)
-        df = pd.DataFrame(te_ary, columns=te.columns_)
-        
-        # Farklı min_support değerlerini dene
-        min_support = 0.1
-        frequent_itemsets = apriori(df, min_support=min_support, use_colnames=True)
-        
-        if frequent_itemsets.empty and len(all_categories_by_receipt) >= 2:
-            min_support = 2 / len(all_categories_by_receipt)
-            frequent_itemsets = apriori(df, min_support=min_support, use_colnames=True)
-        
-        if frequent_itemsets.empty and len(all_categories_by_receipt) >= 2:
-            min_support = 1 / len(all_categories_by_receipt)
-            frequent_itemsets = apriori(df, min_support=min_support, use_colnames=True)
-        
-        # Yeterli sıklıkta kategori bulunamadıysa
-        if frequent_itemsets.empty:
-            return {
-                'message': 'Yeterli sıklıkta birlikte bulunan kategori bulunamadı.',
-                'min_support_used': min_support,
-                'total_transactions': len(all_categories_by_receipt)
-            }
-        
-        # Birliktelik kurallarını oluştur
-        rules = association_rules(frequent_itemsets, metric="lift", min_threshold=0.0)
-        
-        if rules.empty:
-            return {
-                'message': 'Belirlenen destek eşiğinde ilişki kuralı bulunamadı.',
-                'min_support_used': min_support,
-                'total_transactions': len(all_categories_by_receipt)
-            }
-        
-        # Lift > 1 olan pozitif kuralları filtrele
-        positive_rules = rules[rules['lift'] > 1].copy()
-        
-        if positive_rules.empty:
-            return {
-                'message': 'Pozitif ilişki (lift > 1) gösteren kural bulunamadı.',
-                'min_support_used': min_support,
-                'total_transactions': len(all_categories_by_receipt)
-            }
-        
-        positive_rules.sort_values(by='lift', ascending=False, inplace=True)
-        
-        # Kuralları temizle (çift yönlü tekrarları kaldır)
-        positive_rules_list = []
-        processed_pairs = set()
-        
-        for _, row in positive_rules.iterrows():
-            antecedents = frozenset(row['antecedents'])
-            consequents = frozenset(row['consequents'])
-            pair_key = frozenset([antecedents, consequents])
-            
-            # Zaten işlenmiş bir çift ise atla
-            if pair_key in processed_pairs:
-                continue
-            
-            processed_pairs.add(pair_key)
-            reverse_found = False
-            higher_confidence_rule = None
-            
-            # Ters kuralı kontrol et
-            for _, rev_row in positive_rules.iterrows():
-                rev_antecedents = frozenset(rev_row['antecedents'])
-                rev_consequents = frozenset(rev_row['consequents'])
-                
-                if antecedents == rev_consequents and consequents == rev_antecedents:
-                    reverse_found = True
-                    if rev_row['confidence'] > row['confidence']:
-                        higher_confidence_rule = {
-                            'if_categories': list(rev_row['antecedents']),
-                            'then_categories': list(rev_row['consequents']),
-                            'support': float(rev_row['support']),
-                            'confidence': float(rev_row['confidence']),
-                            'lift': float(rev_row['lift'])
-                        }
-                    break
-            
-            # En yüksek güvene sahip kuralı ekle
-            if not reverse_found or higher_confidence_rule is None:
-                positive_rules_list.append({
-                    'if_categories': list(row['antecedents']),
-                    'then_categories': list(row['consequents']),
-                    'support': float(row['support']),
-                    'confidence': float(row['confidence']),
-                    'lift': float(row['lift'])
-                })
-            else:
-                positive_rules_list.append(higher_confidence_rule)
-        
-        # Sonuçları sırala ve hazırla
-        positive_rules_list = sorted(positive_rules_list, key=lambda x: x['lift'], reverse=True)
-        top_rules_display = positive_rules_list[:min(10, len(positive_rules_list))]
-        
-        return {
-            'rules_for_display': top_rules_display,
-            'all_positive_rules': positive_rules_list,
-            'total_positive_rules_found': len(positive_rules_list),
-            'min_support_used': min_support,
-            'total_transactions': len(all_categories_by_receipt)
-        }
-    
-    except Exception as e:
-        app.logger.error(f"Birliktelik analizi hatası: {e}")
-        traceback.print_exc()
-        return {'error': f'Birliktelik analizi sırasında bir hata oluştu: {str(e)}'}
+# Model sürümünü belirleyen artefakt dosyaları
+MODEL_ARTIFACT_PATHS = [path for paths in ARTIFACT_PATHS.values() for path in paths.values()]
+
+def artifact_version():
+    """Joblib artefaktlarının değişiklik zamanı ve boyutundan model sürümü üretir."""
+    signature = []
+    for path in MODEL_ARTIFACT_PATHS:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:12]
+
+def load_model_set(version, previous):
+    """Yeni artefakt kümesini oluşturur; önceki kümede yüklenmiş olanlar takastan önce yüklenir."""
+    registries = {name: ModelRegistry(paths, mmap_mode=MODEL_MMAP_MODE) for name, paths in ARTIFACT_PATHS.items()}
+    if previous is not None:
+        for name, loaded in previous.loaded_names().items():
+            if loaded:
+                registries[name].preload(loaded)
+    return ModelSet(version, registries)
+
+# Artefaktlar değiştiğinde yeni küme arka planda yüklenip takas edilir (0 izlemeyi kapatır)
+MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 2.0))
+model_holder = ModelHolder(load_model_set, artifact_version, poll_interval=MODEL_RELOAD_INTERVAL)
+
+# Her erişim güncel (istek içinde sabitlenmiş) kümeye yönlendirilir
+processors = ModelSetView(model_holder, 'processors')
+models = ModelSetView(model_holder, 'models')
+pipelines = ModelSetView(model_holder, 'pipelines')
+
+# gunicorn --preload ile kullanıldığında modeller fork öncesi bir kez yüklenir
+if os.environ.get('PRELOAD_MODELS', '').lower() in ('1', 'true', 'yes'):
+    failed_artifacts = processors.preload() + models.preload()
+    # Birleşik hatlar isteğe bağlıdır, sadece mevcut olanlar yüklenir
+    failed_artifacts += pipelines.preload([name for name in pipelines if name in pipelines])
+    if failed_artifacts:
+        print(f"Yüklenemeyen artefaktlar: {', '.join(failed_artifacts)}")
+    else:
+        print("Modeller ve işlemciler başarıyla yüklendi.")
+else:
+    missing_artifacts = [name for registry in (processors, models) for name in registry if name not in registry]
+    if missing_artifacts:
+        print(f"Eksik artefaktlar: {', '.join(missing_artifacts)}")
 
-# --- Euclidean Distance Helper ---
-def euclidean_distance(p1, p2):
-    """İki nokta arasındaki Öklidyen mesafeyi hesaplar."""
-    return math.sqrt((p1['x'] - p2['x'])**2 + (p1['y'] - p2['y'])**2)
+# Raf atama çözücüsü ve süre bütçesi (istekte 'shelf_solver' / 'time_budget' ile değiştirilebilir)
+DEFAULT_SHELF_SOLVER = os.environ.get('SHELF_SOLVER', 'local_search')
+# Tek istekte izin verilen en uzun süre bütçesi (saniye)
+MAX_SHELF_TIME_BUDGET = 10.0
+
+# Raflar arası mesafe ölçüsü: düz çizgi veya rafların etrafından yürüme yolu
+DISTANCE_METRICS = ('euclidean', 'walking')
+DEFAULT_DISTANCE_METRIC = os.environ.get('SHELF_DISTANCE_METRIC', 'euclidean')
+
+# Yürüme mesafesi matrisleri kat planı özetine göre bellekte ve diskte saklanır
+WALKING_DISTANCE_CACHE_DIR = os.path.join(PROJECT_ROOT, 'walking_distance_cache')
+walking_distances = WalkingDistanceCache(
+    WALKING_DISTANCE_CACHE_DIR,
+    max_size=int(os.environ.get('WALKING_DISTANCE_CACHE_SIZE', 32))
+)
 
 # --- Yardımcı Fonksiyon: Kategorileri Raflara Atama ---
-def assign_categories_to_shelves(cabinets, association_results, time_goal):
-    """Birliktelik analizi sonuçlarına göre kategorileri raflara atar."""
+def assign_categories_to_shelves(cabinets, association_results, time_goal, solver=DEFAULT_SHELF_SOLVER,
+                                 time_budget=DEFAULT_TIME_BUDGET, full_distances=False,
+                                 distance_metric=DEFAULT_DISTANCE_METRIC):
+    """Birliktelik analizi sonuçlarına göre kategorileri raflara atar.
+
+    solver='local_search' açgözlü yerleşimi shelf_optimizer ile iyileştirir,
+    solver='greedy' eski yerleşimi döndürür. Her iki durumda amaç fonksiyonu
+    raporu visualization_data['optimization_report'] altında döner.
+    visualization_data['all_shelf_distances'] varsayılan olarak sadece ilişkili
+    kategorilerin rafları arasındaki mesafeleri içerir; full_distances=True
+    tüm raf çiftlerini yazar. distance_metric='walking' tüm mesafeleri raf
+    dikdörtgenlerinin etrafından dolaşan yürüme yolu uzunluğu olarak alır.
+    """
     shelf_category_assignments = {}
     unassigned_info = {"message": None, "unassigned_cabinets": []}
     visualization_data = {
@@ -227,91 +193,70 @@ def assign_categories_to_shelves(cabinets, association_results, time_goal):
     # Kategorileri puanlarına göre sırala
     sorted_categories = sorted(category_scores.items(), key=lambda x: x[1], reverse=True)
     
-    # 2. Raf yerleşimini hazırla
-    shelf_names = [cabinet['name'] for cabinet in cabinets]
+    # 2. Raf yerleşimini hazırla (koordinat dizileri; tam mesafe matrisi oluşturulmaz).
+    # Yürüme mesafeleri aynı kat planı için önbellekten gelir.
+    if distance_metric == 'walking':
+        layout = walking_distances.layout(cabinets)
+    else:
+        layout = ShelfLayout(cabinets)
+    visualization_data["distance_model"] = layout.info
     
-    # Raflar arası mesafeleri hesapla
-    all_shelf_distances = {}
-    for i, cab1 in enumerate(cabinets):
-        all_shelf_distances[cab1['name']] = {}
-        for cab2 in cabinets:
-            if cab1['name'] != cab2['name']:
-                distance = math.sqrt((cab1['x'] - cab2['x'])**2 + (cab1['y'] - cab2['y'])**2)
-                all_shelf_distances[cab1['name']][cab2['name']] = distance
+    # Amaç fonksiyonu girdileri: yerleştirilecek kategoriler arası lift toplamları ve açgözlü başlangıç
+    placed_categories = sorted_categories[:len(layout)]
+    affinity = build_affinity_matrix(positive_rules, [category for category, _ in placed_categories])
+    initial = greedy_assignment(layout, len(placed_categories), time_goal)
+    direction = TIME_GOAL_DIRECTIONS[time_goal]
     
-    visualization_data["all_shelf_distances"] = all_shelf_distances
+    if solver == 'greedy':
+        # Eski yerleşim: 'maximize' hedefinde yüksek puanlı kategoriler merkeze yakın raflara,
+        # 'minimize' hedefinde çift/tek indeksli gruplara
+        assignment = initial
+        visualization_data["optimization_report"] = greedy_report(affinity, layout, initial, direction)
+    else:  # solver == 'local_search'
+        # Açgözlü yerleşimden başlayıp Σ lift · mesafe amacını yerel arama ile iyileştir
+        assignment, visualization_data["optimization_report"] = optimize_assignment(
+            affinity, layout, initial, direction, time_budget
+        )
     
     if time_goal == 'maximize':
-        # İlişkili kategorileri birbirine yakın yerleştir
-        # Merkez noktayı hesapla
-        if cabinets:
-            center_x = sum(c['x'] for c in cabinets) / len(cabinets)
-            center_y = sum(c['y'] for c in cabinets) / len(cabinets)
-            
-            # Rafları merkeze olan uzaklığına göre sırala
-            shelf_distances = {}
-            for cabinet in cabinets:
-                distance = math.sqrt((cabinet['x'] - center_x)**2 + (cabinet['y'] - center_y)**2)
-                shelf_distances[cabinet['name']] = distance
-                visualization_data["shelf_distances"][cabinet['name']] = distance
-            
-            # Merkeze yakınlığa göre sırala
-            shelf_names = [s[0] for s in sorted(shelf_distances.items(), key=lambda x: x[1])]
-            
-            # İlişkisi yüksek kategorileri merkeze yakın raflara yerleştir
-            for i, (category, score) in enumerate(sorted_categories):
-                if i < len(shelf_names):
-                    shelf_name = shelf_names[i]
-                    shelf_category_assignments[shelf_name] = category
-                    # Açıklama ekle
-                    visualization_data["assignment_explanation"][shelf_name] = {
-                        "category": category,
-                        "reason": "Yüksek ilişki puanı",
-                        "score": score,
-                        "distance_to_center": shelf_distances[shelf_name],
-                        "rank": i + 1
-                    }
-    
-    else:  # time_goal == 'minimize'
-        # İlişkili kategorileri birbirinden uzak yerleştir
-        # Rafları çift/tek olarak grupla
-        even_shelves = shelf_names[::2]  # Çift indeksli raflar
-        odd_shelves = shelf_names[1::2]  # Tek indeksli raflar
-        
-        # Kategorileri de benzer şekilde grupla
-        even_categories = [cat for i, (cat, score) in enumerate(sorted_categories) if i % 2 == 0]
-        even_scores = [score for i, (cat, score) in enumerate(sorted_categories) if i % 2 == 0]
-        odd_categories = [cat for i, (cat, score) in enumerate(sorted_categories) if i % 2 == 1]
-        odd_scores = [score for i, (cat, score) in enumerate(sorted_categories) if i % 2 == 1]
-        
-        # Eşleştirmeleri yap
-        for i, shelf in enumerate(even_shelves):
-            if i < len(even_categories):
-                category = even_categories[i]
-                score = even_scores[i]
-                shelf_category_assignments[shelf] = category
-                # Açıklama ekle
-                visualization_data["assignment_explanation"][shelf] = {
-                    "category": category,
-                    "reason": "İlişkili kategorilerden uzaklaştırma (çift indeksli raf)",
-                    "score": score,
-                    "group": "even",
-                    "rank": i * 2 + 1  # Orijinal sıralamayı geri hesapla
-                }
-                
-        for i, shelf in enumerate(odd_shelves):
-            if i < len(odd_categories):
-                category = odd_categories[i]
-                score = odd_scores[i]
-                shelf_category_assignments[shelf] = category
-                # Açıklama ekle
-                visualization_data["assignment_explanation"][shelf] = {
-                    "category": category,
-                    "reason": "İlişkili kategorilerden uzaklaştırma (tek indeksli raf)",
-                    "score": score,
-                    "group": "odd",
-                    "rank": i * 2 + 2  # Orijinal sıralamayı geri hesapla
-                }
+        visualization_data["shelf_distances"] = dict(zip(layout.names, layout.distances_to_center().tolist()))
+    
+    for i, ((category, score), shelf_index) in enumerate(zip(placed_categories, assignment.tolist())):
+        shelf_name = layout.names[shelf_index]
+        shelf_category_assignments[shelf_name] = category
+        # Açıklama ekle
+        explanation = {
+            "category": category,
+            "score": score,
+            "rank": i + 1
+        }
+        if time_goal == 'maximize':
+            explanation["reason"] = ("Yüksek ilişki puanı" if solver == 'greedy'
+                                     else "Yerel arama: ilişkili kategorilere toplam mesafe en aza indirildi")
+            explanation["distance_to_center"] = visualization_data["shelf_distances"][shelf_name]
+        else:
+            # Görselleştirmedeki iki renkli gruplama puan sırasına göre korunur
+            explanation["group"] = "even" if i % 2 == 0 else "odd"
+            if solver == 'greedy':
+                explanation["reason"] = ("İlişkili kategorilerden uzaklaştırma "
+                                         f"({'çift' if i % 2 == 0 else 'tek'} indeksli raf)")
+            else:
+                explanation["reason"] = "Yerel arama: ilişkili kategorilere toplam mesafe en üst düzeye çıkarıldı"
+        visualization_data["assignment_explanation"][shelf_name] = explanation
+    
+    # Raflar arası mesafeler: varsayılan olarak sadece görselleştirmenin çizdiği
+    # (ilişkili kategorilerin rafları arasındaki) çiftler, istenirse tüm çiftler
+    if full_distances:
+        visualization_data["all_shelf_distances"] = layout.distance_dict()
+    else:
+        category_shelves = {category: layout.index[shelf] for shelf, category in shelf_category_assignments.items()}
+        related_pairs = [
+            (category_shelves[if_cat], category_shelves[relation["category"]])
+            for if_cat, relations in category_relations.items() if if_cat in category_shelves
+            for relation in relations if relation["category"] in category_shelves
+        ]
+        visualization_data["all_shelf_distances"] = layout.distance_dict(related_pairs)
+    visualization_data["all_shelf_distances_scope"] = 'full' if full_distances else 'related'
     
     # 3. Atanmayan rafları belirle
     unassigned_cabinets = [cabinet['name'] for cabinet in cabinets 
@@ -326,51 +271,346 @@ def assign_categories_to_shelves(cabinets, association_results, time_goal):
     
     return shelf_category_assignments, unassigned_info, visualization_data
 
-# --- Türkçe Karakter Dönüştürme Fonksiyonu ---
-def convert_turkish_to_english(text):
-    """Türkçe karakterleri İngilizce karşılıklarına dönüştürür."""
-    if not text:
-        return text
-    
-    turkish_chars = {
-        'ç': 'c', 'Ç': 'C',
-        'ğ': 'g', 'Ğ': 'G',
-        'ı': 'i', 'I': 'I',
-        'İ': 'I', 'i': 'i',
-        'ö': 'o', 'Ö': 'O',
-        'ş': 's', 'Ş': 'S',
-        'ü': 'u', 'Ü': 'U'
-    }
+# --- Artımlı Birliktelik Deposu ---
+ASSOCIATION_STORE_DIR = os.path.join(PROJECT_ROOT, 'association_store')
+association_store = AssociationStatisticsStore(
+    ASSOCIATION_STORE_DIR,
+    window_days=int(os.environ.get('ASSOCIATION_WINDOW_DAYS', DEFAULT_WINDOW_DAYS))
+)
+
+# --- Tahmin Önbelleği ---
+# Önbellekte tutulacak en fazla ürün adı sayısı (0 önbelleği kapatır)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 100000))
+
+def get_model_version():
+    """İsteğin kullandığı (sabitlenmiş veya güncel) model kümesinin sürümünü döndürür."""
+    return model_holder.current().version
+
+class PredictionCache:
+    """Ürün adı -> kategori tahminleri için LRU önbellek (raf optimizasyonu katmanlarında da kullanılır)."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ensure_version(self, version):
+        """En son devreye alınan model sürümüne geçildiyse önbelleği bir kez boşaltır.
+
+        Anahtarlar sürümü içerdiği için eski sürüme sabitlenmiş (boşalmayı
+        bekleyen) istekler önbelleği boşaltmaz; eski kayıtları LRU çıkarır.
+        """
+        if version == self.version or version != model_holder.latest().version:
+            return
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def get(self, key):
+        """Önbellekteki değeri döndürür; yoksa None döner."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Değeri önbelleğe ekler, sınır aşılırsa en eski kaydı çıkarır."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Önbelleği ve sayaçları sıfırlar."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Önbellek istatistiklerini döndürür."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'model_version': self.version
+            }
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE)
+
+# --- Birleşik Çıkarım Hattı ---
+# Birleşik hat (inference_pipeline.py) varsa ve kaynak artefaktlardan eski değilse kullanılır
+USE_FUSED_PIPELINE = os.environ.get('USE_FUSED_PIPELINE', '1').lower() in ('1', 'true', 'yes')
+
+def _artifact_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+def get_inference_pipeline(model_choice):
+    """Güncel birleşik hattı döndürür; yoksa None döner ve ayrı nesne zinciri kullanılır."""
+    if not USE_FUSED_PIPELINE or model_choice not in pipelines:
+        return None
+    # Model veya vektörleştirici hattan sonra güncellendiyse hat eskidir
+    pipeline_mtime = _artifact_mtime(pipelines.artifact_paths[model_choice])
+    source_paths = [models.artifact_paths[model_choice]] + list(processors.artifact_paths.values())
+    if any(_artifact_mtime(path) > pipeline_mtime for path in source_paths):
+        return None
+    pipeline = pipelines[model_choice]
+    # Eski biçimde kaydedilmiş hatlar yeni alanları içermez
+    if getattr(pipeline, 'format_version', None) != PIPELINE_FORMAT_VERSION:
+        return None
+    return pipeline
+
+# --- Paralel Tahmin ---
+# 1'den büyükse çok sayıda isim içeren tahminler bu kadar süreçte parçalara bölünerek yapılır
+PREDICTION_WORKERS = int(os.environ.get('PREDICTION_WORKERS', 1))
+# Paralel tahmine geçmek için gereken en az (tekilleştirilmiş) isim sayısı
+PARALLEL_PREDICTION_MIN_NAMES = int(os.environ.get('PARALLEL_PREDICTION_MIN_NAMES', 20000))
+
+# Havuzlar istek iş parçacıklarından açıldığı için fork kullanılmaz
+PREDICTION_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+class _PredictorPool:
+    """Bir model sürümünün süreç havuzu ve onu kullanan istek sayısı."""
+
+    def __init__(self, pid, version, parallel):
+        self.pid = pid
+        self.version = version
+        self.parallel = parallel
+        self.users = 0
+        self.retired = False
+
+# Model adı -> güncel sürümün havuzu
+_parallel_predictors = {}
+_parallel_predictors_lock = threading.Lock()
+
+def _create_parallel_predictor(model_choice):
+    pipeline = get_inference_pipeline(model_choice)
+    if pipeline is not None:
+        predictor = ShardPredictor(pipeline=pipeline)
+    else:
+        if 'tfidf_vectorizer' not in processors or 'label_encoder' not in processors:
+            raise ModelUnavailableError('Vektörleştirici veya etiket kodlayıcı yüklenemedi')
+        predictor = ShardPredictor(vectorizer=processors['tfidf_vectorizer'], model=models[model_choice],
+                                   label_encoder=processors['label_encoder'])
+    # İşçiler artefaktları kendileri mmap ile açar; sayfalar süreçler arasında paylaşılır
+    artifacts = {'model_name': model_choice, 'models_dir': MODELS_DIR, 'processed_data_dir': PROCESSED_DATA_DIR}
+    return ParallelPredictor(predictor, PREDICTION_WORKERS, start_method=PREDICTION_START_METHOD, artifacts=artifacts)
+
+@contextlib.contextmanager
+def parallel_predictor(model_choice):
+    """Model için süreç havuzlu tahminciyi verir; paralel tahmin kullanılamıyorsa None verir.
+
+    Her model için sadece en son devreye alınan sürümün havuzu tutulur.
+    Yeni sürümün havuzu açılınca eskisi emekliye ayrılır ve son kullanan
+    istek bittiğinde kapatılır. Eski sürüme sabitlenmiş (boşalmayı bekleyen)
+    istekler yeni havuz açmaz, süreç içinde tahmin yapar.
+    """
+    if PREDICTION_WORKERS <= 1:
+        yield None
+        return
+    model_version = get_model_version()
+    retired = None
+    with _parallel_predictors_lock:
+        pool = _parallel_predictors.get(model_choice)
+        if pool is not None and pool.pid != os.getpid():
+            # Fork ile devralınan havuz bu süreçte kullanılamaz ve kapatılamaz
+            pool = None
+        if pool is None or pool.version != model_version:
+            if model_version != model_holder.latest().version:
+                # Eski sürüme sabitlenmiş istek: sürümler arasında gidip gelen havuz açılmasın
+                pool = None
+            else:
+                previous = _parallel_predictors.get(model_choice)
+                if previous is not None and previous.pid == os.getpid():
+                    previous.retired = True
+                    if previous.users == 0:
+                        retired = previous
+                pool = _PredictorPool(os.getpid(), model_version, _create_parallel_predictor(model_choice))
+                _parallel_predictors[model_choice] = pool
+        if pool is not None:
+            pool.users += 1
+    if retired is not None:
+        retired.parallel.close()
+    if pool is None:
+        yield None
+        return
+
+    try:
+        yield pool.parallel
+    finally:
+        with _parallel_predictors_lock:
+            pool.users -= 1
+            close = pool.retired and pool.users == 0
+        if close:
+            pool.parallel.close()
+
+def predict_normalized_names(names, model_choice, top_k=None):
+    """Normalize edilmiş ürün isimleri için modelden kategori isimlerini döndürür.
+
+    top_k verilirse her isim için en olası top_k kategori, olasılıklarıyla
+    birlikte tek bir skorlama geçişinden döndürülür. İsim sayısı
+    PARALLEL_PREDICTION_MIN_NAMES'i geçerse tahmin süreç havuzunda yapılır.
+    """
+    if len(names) >= PARALLEL_PREDICTION_MIN_NAMES:
+        with parallel_predictor(model_choice) as parallel:
+            if parallel is not None:
+                if top_k:
+                    return [format_top_k(top) for top in parallel.predict_top_k(names, top_k)]
+                return parallel.predict(names)
+    
+    pipeline = get_inference_pipeline(model_choice)
+    if pipeline is not None:
+        if top_k:
+            return [format_top_k(top) for top in pipeline.predict_top_k_normalized(names, top_k)]
+        return pipeline.predict_normalized(names)
     
-    for turkish_char, english_char in turkish_chars.items():
-        text = text.replace(turkish_char, english_char)
+    if 'tfidf_vectorizer' not in processors or 'label_encoder' not in processors:
+        raise ModelUnavailableError('Vektörleştirici veya etiket kodlayıcı yüklenemedi')
     
-    return text
+    # Ürün isimlerini vektörleştir
+    products_vectorized = processors['tfidf_vectorizer'].transform(names)
+    model = models[model_choice]
+    
+    if top_k:
+        # Tek predict_proba geçişinden ilk top_k sınıf
+        probabilities = model.predict_proba(products_vectorized)
+        class_names = np.asarray(processors['label_encoder'].classes_, dtype=object)[model.classes_]
+        return [format_top_k(top) for top in top_k_predictions(probabilities, probabilities, class_names, top_k)]
+    
+    # Tahmin yap
+    predictions_numeric = model.predict(products_vectorized)
+    
+    # Sonucu kategori isimlerine dönüştür
+    return [str(category) for category in processors['label_encoder'].inverse_transform(predictions_numeric)]
+
+# --- Top-k Tahmin Yardımcıları ---
+# Bir istekte istenebilecek en fazla aday kategori sayısı
+MAX_TOP_K = 20
+
+def parse_top_k(value):
+    """İstekteki top_k değerini doğrular; boşsa None döner, geçersizse ValueError fırlatır."""
+    if value is None or value == '':
+        return None
+    try:
+        top_k = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'top_k bir tam sayı olmalıdır: {value}')
+    if not 1 <= top_k <= MAX_TOP_K:
+        raise ValueError(f'top_k 1 ile {MAX_TOP_K} arasında olmalıdır')
+    return top_k
+
+def format_top_k(top):
+    """(kategori, olasılık) çiftlerini JSON yanıtı için sözlük listesine dönüştürür."""
+    return [{'category': str(category), 'probability': float(probability)} for category, probability in top]
 
 # --- Helper Function for Product Category Prediction ---
-def predict_product_categories(products, model_choice):
-    """Ürün isimlerinden kategori tahmini yapar."""
+def predict_product_categories(products, model_choice, top_k=None):
+    """Ürün isimlerinden kategori tahmini yapar.
+
+    top_k verilirse her ürün için kategori yerine en olası top_k kategori ve
+    olasılıklarından oluşan liste döner.
+    """
     if not products or not model_choice or model_choice not in models:
         return None
         
     try:
-        # Türkçe karakterleri İngilizce karşılıklarına dönüştür
-        processed_products = [convert_turkish_to_english(str(product)) for product in products]
+        model_version = get_model_version()
+        prediction_cache.ensure_version(model_version)
         
-        # Ürün isimlerini vektörleştir
-        products_vectorized = vectorizer.transform(processed_products)
+        # Türkçe karakterleri dönüştür ve istek içindeki tekrarları ayıkla
+        count('products', len(products))
+        with span('predict.normalize'):
+            processed_products = normalize_product_names(products)
+        categories_by_name = {}
+        missing_names = []
+        cache_suffix = (model_choice, model_version) if top_k is None else (model_choice, model_version, top_k)
+        for name in dict.fromkeys(processed_products):
+            category = prediction_cache.get((name,) + cache_suffix)
+            if category is None:
+                missing_names.append(name)
+            else:
+                categories_by_name[name] = category
         
-        # Tahmin yap
-        model = models[model_choice]
-        predictions_numeric = model.predict(products_vectorized)
+        # Sadece önbellekte olmayan ürünleri modele gönder
+        if missing_names:
+            count('predicted_names', len(missing_names))
+            with span('predict.model'):
+                predicted = predict_normalized_names(missing_names, model_choice, top_k)
+            for name, category in zip(missing_names, predicted):
+                categories_by_name[name] = category
+                prediction_cache.put((name,) + cache_suffix, category)
         
-        # Sonucu kategori isimlerine dönüştür
-        return label_encoder.inverse_transform(predictions_numeric)
+        return [categories_by_name[name] for name in processed_products]
     except Exception as e:
         app.logger.error(f"Kategori tahmini hatası: {e}")
         traceback.print_exc()
         raise
 
+# --- Toplu Tahmin Yardımcısı ---
+# Tek bir model çağrısında işlenecek en fazla ürün sayısı
+BULK_PREDICTION_BATCH_SIZE = int(os.environ.get('BULK_PREDICTION_BATCH_SIZE', 50000))
+
+def predict_receipts_batched(receipts, model_choice, batch_size=BULK_PREDICTION_BATCH_SIZE, top_k=None):
+    """Fişlerdeki ürünleri tek dizide toplayarak parçalar halinde tahmin eder.
+
+    `receipts` (fiş_id, ürünler) çiftlerinden oluşan herhangi bir iterable
+    olabilir; bellek kullanımı parça boyutuyla sınırlı kalır. Her fiş için
+    sırasıyla (fiş_id, ürünler, tahminler) üretir; tahmin başarısız olursa
+    tahminler yerine o fişe ait hata (Exception) döner. top_k verilirse
+    tahminler her ürün için top-k aday listesidir.
+    """
+    chunk_receipts = []
+    flat_products = []
+    offsets = [0]
+
+    def flush():
+        try:
+            predictions = predict_product_categories(flat_products, model_choice, top_k)
+            # Tahminleri ofsetlere göre fişlere geri dağıt
+            chunk_results = [list(predictions[start:end]) for start, end in zip(offsets, offsets[1:])]
+        except Exception:
+            # Parça başarısız olursa hataları fiş bazında raporlamak için tek tek dene
+            chunk_results = []
+            for start, end in zip(offsets, offsets[1:]):
+                try:
+                    chunk_results.append(list(predict_product_categories(flat_products[start:end], model_choice, top_k)))
+                except Exception as prediction_error:
+                    chunk_results.append(prediction_error)
+        return [(receipt_id, products, result)
+                for (receipt_id, products), result in zip(chunk_receipts, chunk_results)]
+
+    for receipt_id, products in receipts:
+        chunk_receipts.append((receipt_id, products))
+        flat_products.extend(products)
+        offsets.append(len(flat_products))
+        if len(flat_products) >= batch_size:
+            yield from flush()
+            chunk_receipts.clear()
+            flat_products.clear()
+            del offsets[1:]
+    if chunk_receipts:
+        yield from flush()
+
 # --- Ana Sayfa ---
 @app.route('/')
 def home():
@@ -379,6 +619,7 @@ def home():
 
 # --- Tekli Tahmin Endpoint ---
 @app.route('/predict', methods=['POST'])
+@model_holder.pinned
 def predict():
     """Tekli ürün tahmin endpoint'i."""
     try:
@@ -393,35 +634,311 @@ def predict():
         if model_choice not in models:
             return jsonify({'error': f'Geçersiz model seçimi: {model_choice}'}), 400
         
+        try:
+            top_k = parse_top_k(data.get('top_k'))
+        except ValueError as top_k_error:
+            return jsonify({'error': str(top_k_error)}), 400
+        
+        # Top-k: tahmin, aday listesinin ilk elemanıdır
+        if top_k:
+            candidates = predict_product_categories([product_name], model_choice, top_k)[0]
+            return jsonify(with_timings({'prediction': candidates[0]['category'], 'top_k': candidates,
+                                         'model_version': get_model_version()}))
+        
         # Tahmin yap
         categories = predict_product_categories([product_name], model_choice)
-        return jsonify({'prediction': categories[0]})
+        return jsonify(with_timings({'prediction': categories[0], 'model_version': get_model_version()}))
     
     except Exception as e:
         app.logger.error(f"Tahmin hatası: {str(e)}")
         return jsonify({'error': f'Tahmin sırasında bir hata oluştu: {str(e)}'}), 500
 
+# --- Tahmin Önbelleği İstatistikleri ---
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """Tahmin, yürüme mesafesi ve raf optimizasyonu önbelleklerinin isabet/ıskalama sayaçlarını döndürür."""
+    return jsonify(dict(
+        prediction_cache.stats(),
+        walking_distance=walking_distances.stats(),
+        shelf_optimization={tier: cache.stats() for tier, cache in shelf_caches.items()}
+    ))
+
+@app.route('/models', methods=['GET'])
+def model_status():
+    """Her model ve işlemci için yükleme durumu, süresi ve bellek kullanımını döndürür."""
+    return jsonify({
+        'processors': processors.status(),
+        'models': models.status(),
+        'pipelines': pipelines.status(),
+        'model_set': model_holder.status()
+    })
+
+# --- Ölçümler (Prometheus) ---
+# İstek süreleri; akış yanıtlarında ilk bayta kadar geçen süre ölçülür
+REQUEST_SECONDS = REGISTRY.histogram('http_request_duration_seconds', 'HTTP isteklerinin süresi (saniye)',
+                                     ['endpoint', 'method', 'status'])
+
+def _cache_gauge(attribute):
+    def read():
+        caches = {('prediction',): prediction_cache}
+        caches.update(((f"shelf_{tier}",), cache) for tier, cache in shelf_caches.items())
+        return {labels: cache.stats()[attribute] for labels, cache in caches.items()}
+    return read
+
+REGISTRY.gauge('cache_entries', 'Önbellekteki kayıt sayısı', ['cache'], _cache_gauge('size'))
+REGISTRY.gauge('cache_hit_ratio', 'Önbellek isabet oranı', ['cache'], _cache_gauge('hit_rate'))
+
+@app.before_request
+def start_request_timing():
+    """İstek süresini başlatır; ?timings=1 ile aşama dökümünü etkinleştirir."""
+    g.request_start = time.perf_counter()
+    start_request_trace(form_flag(request.args, 'timings'))
+
+@app.after_request
+def record_request_timing(response):
+    start_time = g.get('request_start')
+    if start_time is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - start_time,
+                                request.endpoint or 'unknown', request.method, str(response.status_code))
+    return response
+
+def with_timings(result):
+    """İstek dökümü etkinse (?timings=1) yanıta aşama sürelerini ve sayıları ekler."""
+    trace = current_trace()
+    if trace is not None:
+        result['timings'] = trace.report()
+    return result
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Aşama süresi histogramlarını, sayaçları ve önbellek durumunu Prometheus metin biçiminde döndürür."""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# --- Düzeltmeler (Artımlı Model Güncelleme) ---
+# Düzeltilen kategoriler market_data.csv biçiminde bu dosyaya da eklenir (tam yeniden eğitim için)
+CORRECTIONS_FILE = os.environ.get('CORRECTIONS_FILE', os.path.join(PROJECT_ROOT, 'corrections.csv'))
+# Bir istekte kabul edilen en fazla düzeltme sayısı
+MAX_CORRECTIONS_PER_REQUEST = 1000
+
+online_updater = OnlineUpdater(
+    MODELS_DIR, PROCESSED_DATA_DIR, CORRECTIONS_FILE,
+    sample_weight=float(os.environ.get('CORRECTION_SAMPLE_WEIGHT', DEFAULT_SAMPLE_WEIGHT))
+)
+
+def parse_corrections(data):
+    """İstekteki düzeltmeleri (ürünler, kategoriler, modeller) olarak döndürür; geçersizse ValueError fırlatır."""
+    if not data:
+        raise ValueError('Eksik veri: corrections')
+    entries = data['corrections'] if 'corrections' in data else [data]
+    if not isinstance(entries, list) or not entries:
+        raise ValueError('corrections boş olmayan bir liste olmalıdır')
+    if len(entries) > MAX_CORRECTIONS_PER_REQUEST:
+        raise ValueError(f'Bir istekte en fazla {MAX_CORRECTIONS_PER_REQUEST} düzeltme gönderilebilir')
+
+    products, categories = [], []
+    for entry in entries:
+        product = entry.get('product_name') if isinstance(entry, dict) else None
+        category = entry.get('category') if isinstance(entry, dict) else None
+        if not isinstance(product, str) or not product.strip() or not isinstance(category, str) or not category.strip():
+            raise ValueError('Her düzeltme product_name ve category içermelidir')
+        products.append(product)
+        categories.append(category.strip())
+
+    model_names = data.get('models') or list(INCREMENTAL_MODELS)
+    unsupported = [name for name in model_names if name not in INCREMENTAL_MODELS]
+    if unsupported:
+        raise ValueError(f"Artımlı güncellemeyi desteklemeyen modeller: {', '.join(map(str, unsupported))}")
+    return products, categories, model_names
+
+@app.route('/corrections', methods=['POST'])
+def add_corrections():
+    """Düzeltilmiş (ürün, kategori) çiftlerini modellere artımlı olarak ekler ve yeni modelleri devreye alır."""
+    try:
+        products, categories, model_names = parse_corrections(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        summary = online_updater.apply(products, categories, model_names)
+        # İzleyiciyi beklemeden yeni küme yüklenip takas edilir; devam eden istekler eski kümeyle biter
+        model_holder.refresh()
+        summary['model_version'] = get_model_version()
+        return jsonify(summary)
+    except Exception as e:
+        app.logger.error(f"Düzeltme güncelleme hatası: {e}")
+        traceback.print_exc()
+        return jsonify({'error': f'Beklenmeyen bir hata oluştu: {str(e)}'}), 500
+
 # --- Robust CSV Reading Helper ---
 def read_csv_robust(file_storage):
     """CSV dosyasını güvenli şekilde okur ve satırları ürün listelerine dönüştürür."""
-    file_storage.seek(0)
-    raw_bytes = file_storage.read()
-    encoding = chardet.detect(raw_bytes).get('encoding', 'utf-8')
-    text = raw_bytes.decode(encoding, errors='replace').lstrip('\ufeff').strip()
-    
-    all_receipts_items = []
-    for line in text.splitlines():
-        items = [item.strip() for item in re.split(r',\s*', line) if item.strip()]
-        if items:
-            all_receipts_items.append(items)
-            
-    if not all_receipts_items:
-        raise ValueError('CSV dosyası boş veya veri içermiyor.')
+    return list(open_csv_receipts(file_storage))
+
+def open_receipts(file_storage):
+    """open_csv_receipts'i ölçümle çağırır.
+
+    Kodlama tespiti ve ilk satır 'read_csv.open', sonraki satırların okunup
+    ayrıştırılması (tahmin süresi hariç) 'read_csv' aşamasına yazılır.
+    """
+    with span('read_csv.open'):
+        all_receipts_items = open_csv_receipts(file_storage)
+    return timed_iter(all_receipts_items, 'read_csv', kind='rows')
+
+# --- Toplu Tahmin Sonuç Yardımcıları ---
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def iter_bulk_receipt_results(all_receipts_items, model_choice, all_categories_by_receipt, top_k=None):
+    """Her fiş için (fiş_id, tahmin listesi) üretir ve fiş kategorilerini biriktirir."""
+    # Fişlerin ürünlerini sınırlı boyutlu parçalar halinde toplu olarak tahmin et
+    batched_predictions = predict_receipts_batched(iter_receipt_products(all_receipts_items), model_choice, top_k=top_k)
+    
+    for receipt_id, products_in_receipt, predictions_categories in batched_predictions:
+        if isinstance(predictions_categories, Exception):
+            app.logger.error(f"Tahmin hatası {receipt_id}: {predictions_categories}")
+            yield receipt_id, [
+                {'error': f'Bu siparişteki ürünler için tahmin başarısız oldu: {str(predictions_categories)}'}
+            ]
+            continue
+        
+        # Sonuçları kaydet
+        receipt_predictions = []
+        receipt_categories = set()
+        
+        for product_name, category in zip(products_in_receipt, predictions_categories):
+            if top_k:
+                # Aday listesinin ilki tahmin edilen kategoridir
+                prediction = {'product': product_name, 'category': category[0]['category'], 'top_k': category}
+            else:
+                prediction = {'product': product_name, 'category': category}
+            receipt_predictions.append(prediction)
+            receipt_categories.add(prediction['category'])
+        
+        if receipt_categories: 
+            all_categories_by_receipt.append(list(receipt_categories))
+        if receipt_predictions: 
+            yield receipt_id, receipt_predictions
+
+def wants_ndjson_stream():
+    """İstemcinin akış (NDJSON) yanıtı isteyip istemediğini kontrol eder."""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+def detach_upload_stream(file_storage):
+    """Yüklenen dosyanın akışını, istek kapanırken kapatılmayacak şekilde ayırır."""
+    stream = file_storage.stream
+    file_storage.stream = io.BytesIO()
+    return stream
+
+@model_holder.pinned
+def stream_bulk_results(receipt_results, all_categories_by_receipt, upload, association_engine):
+    """Fiş tahminlerini ve ardından birliktelik analizini NDJSON satırları olarak üretir."""
+    def to_line(record):
+        return json.dumps(record, ensure_ascii=False) + '\n'
+    
+    try:
+        receipt_count = 0
+        for receipt_id, receipt_predictions in receipt_results:
+            receipt_count += 1
+            yield to_line({'type': 'receipt', 'receipt_id': receipt_id, 'predictions': receipt_predictions})
+        
+        if not receipt_count:
+            yield to_line({'type': 'error', 'error': 'CSV satırlarında geçerli ürün bulunamadı veya işlenemedi.'})
+            return
+        
+        # Birliktelik analizi yap
+        association_results = perform_association_analysis(all_categories_by_receipt, association_engine)
+        yield to_line(with_timings({'type': 'association_analysis', 'association_analysis': association_results,
+                                    'model_version': get_model_version()}))
+    except Exception as e:
+        app.logger.error(f"Toplu tahmin akış hatası: {e}")
+        traceback.print_exc()
+        yield to_line({'type': 'error', 'error': f'İşlem sırasında beklenmeyen bir hata oluştu: {str(e)}'})
+    finally:
+        upload.close()
+
+def collect_receipt_categories(all_receipts_items, model_choice):
+    """Her fiş için tahmin edilen benzersiz kategori listelerini toplar."""
+    all_categories_by_receipt = []
+    batched_predictions = predict_receipts_batched(iter_receipt_products(all_receipts_items), model_choice)
+    
+    for _, _, predictions_categories in batched_predictions:
+        if isinstance(predictions_categories, Exception):
+            app.logger.error(f"Tahmin hatası: {predictions_categories}")
+            continue
+        
+        # Kategorileri kaydet
+        receipt_categories = set(predictions_categories)
+        if receipt_categories:
+            all_categories_by_receipt.append(list(receipt_categories))
+    
+    return all_categories_by_receipt
+
+# --- Toplu Tahmin ve Birliktelik Analizi ---
+# Arka plan işlerinde ilerleme bu kadar fişte bir raporlanır
+PROGRESS_REPORT_INTERVAL = 1000
+
+def track_progress(all_receipts_items, progress, every=PROGRESS_REPORT_INTERVAL):
+    """Satırları aynen geçirir, her `every` satırda progress('predicting') çağırır."""
+    for index, row_items in enumerate(all_receipts_items, 1):
+        if index % every == 0:
+            progress('predicting')
+        yield row_items
+
+def parse_bulk_form(form):
+    """Toplu tahmin form alanlarını doğrular; geçersizse ValueError fırlatır."""
+    if 'model_choice' not in form: 
+        raise ValueError('Model seçimi belirtilmedi')
+    
+    model_choice = form['model_choice']
+    if model_choice not in models: 
+        raise ValueError(f'Geçersiz model seçimi: {model_choice}')
+    
+    association_engine = form.get('association_engine', DEFAULT_ASSOCIATION_ENGINE)
+    if association_engine not in ASSOCIATION_ENGINES: 
+        raise ValueError(f'Geçersiz birliktelik algoritması: {association_engine}')
+    
+    return {
+        'model_choice': model_choice,
+        'association_engine': association_engine,
+        'top_k': parse_top_k(form.get('top_k'))
+    }
+
+@model_holder.pinned
+def bulk_prediction_result(file_storage, params, progress=None):
+    """Toplu tahmin ve birliktelik analizini yapar; (yanıt sözlüğü, HTTP durum kodu) döndürür."""
+    # CSV dosyasını akış halinde oku
+    try:
+        all_receipts_items = open_receipts(file_storage)
+    except Exception as csv_err:
+        app.logger.error(f"CSV verileri işlenemedi: {csv_err}")
+        return {'error': f'CSV verileri işlenemedi: {str(csv_err)}'}, 400
+    if progress is not None:
+        all_receipts_items = track_progress(all_receipts_items, progress)
+
+    # Sipariş sonuçlarını ve kategori listelerini oluştur
+    all_categories_by_receipt = []
+    results_by_receipt = OrderedDict(iter_bulk_receipt_results(
+        all_receipts_items, params['model_choice'], all_categories_by_receipt, params['top_k']
+    ))
+
+    # Sonuçların geçerliliğini kontrol et
+    if not results_by_receipt: 
+        return {'error': 'CSV satırlarında geçerli ürün bulunamadı veya işlenemedi.'}, 400
         
-    return all_receipts_items
+    # Birliktelik analizi yap
+    if progress is not None:
+        progress('association')
+    association_results = perform_association_analysis(all_categories_by_receipt, params['association_engine'])
+    
+    return with_timings({
+        'results': OrderedDict(sorted(results_by_receipt.items())),
+        'association_analysis': association_results,
+        'model_version': get_model_version()
+    }), 200
 
-# --- Toplu Tahmin ve Birliktelik Analizi Endpoint ---
 @app.route("/predict_bulk", methods=["POST"])
+@model_holder.pinned
 def predict_bulk():
     """Toplu tahmin ve birliktelik analizi endpoint'i."""
     # İstek doğrulama
@@ -432,183 +949,512 @@ def predict_bulk():
     if file.filename == '' or not file.filename.endswith('.csv'): 
         return jsonify({'error': 'Geçerli bir CSV dosyası seçilmedi'}), 400
     
-    if 'model_choice' not in request.form: 
-        return jsonify({'error': 'Model seçimi belirtilmedi'}), 400
-    
-    model_choice = request.form['model_choice']
-    if model_choice not in models: 
-        return jsonify({'error': f'Geçersiz model seçimi: {model_choice}'}), 400
+    try:
+        params = parse_bulk_form(request.form)
+    except ValueError as form_error:
+        return jsonify({'error': str(form_error)}), 400
 
     try:
-        # CSV dosyasını oku
+        if not wants_ndjson_stream():
+            result, status = bulk_prediction_result(file, params)
+            return jsonify(result), status
+        
+        # Akış modunda dosya, yanıt üretilirken okunmaya devam edilir
+        upload = detach_upload_stream(file)
         try:
-            all_receipts_items = read_csv_robust(file)
+            all_receipts_items = open_receipts(upload)
         except Exception as csv_err:
+            upload.close()
             app.logger.error(f"CSV verileri işlenemedi: {csv_err}")
             return jsonify({'error': f'CSV verileri işlenemedi: {str(csv_err)}'}), 400
 
-        # Sipariş sonuçlarını ve kategori listelerini oluştur
-        results_by_receipt = OrderedDict()
+        # Her fiş hesaplandıkça NDJSON satırı olarak gönderilir
         all_categories_by_receipt = []
-        
-        for index, row_items in enumerate(all_receipts_items, 1):
-            receipt_id = f"Siparis_{index:02d}"
-            products_in_receipt = [str(item).strip() for item in row_items if str(item).strip()]
-            
-            if not products_in_receipt: 
-                continue
-                
-            try:
-                # Tahmin yap
-                predictions_categories = predict_product_categories(products_in_receipt, model_choice)
-                
-                # Sonuçları kaydet
-                receipt_predictions = []
-                receipt_categories = set()
-                
-                for product_name, category in zip(products_in_receipt, predictions_categories):
-                    receipt_predictions.append({'product': product_name, 'category': category})
-                    receipt_categories.add(category)
-                
-                if receipt_categories: 
-                    all_categories_by_receipt.append(list(receipt_categories))
-                if receipt_predictions: 
-                    results_by_receipt[receipt_id] = receipt_predictions
-                    
-            except Exception as prediction_error:
-                app.logger.error(f"Tahmin hatası {receipt_id}: {prediction_error}")
-                results_by_receipt[receipt_id] = [
-                    {'error': f'Bu siparişteki ürünler için tahmin başarısız oldu: {str(prediction_error)}'}
-                ]
-
-        # Sonuçların geçerliliğini kontrol et
-        if not results_by_receipt: 
-            return jsonify({'error': 'CSV satırlarında geçerli ürün bulunamadı veya işlenemedi.'}), 400
-            
-        # Birliktelik analizi yap
-        association_results = perform_association_analysis(all_categories_by_receipt)
-        
-        # Sonuçları döndür
-        return jsonify({
-            'results': OrderedDict(sorted(results_by_receipt.items())),
-            'association_analysis': association_results
-        })
+        receipt_results = iter_bulk_receipt_results(
+            all_receipts_items, params['model_choice'], all_categories_by_receipt, params['top_k']
+        )
+        return Response(
+            stream_with_context(stream_bulk_results(receipt_results, all_categories_by_receipt, upload,
+                                                    params['association_engine'])),
+            mimetype=NDJSON_MIMETYPE
+        )
 
     except Exception as e:
         app.logger.error(f"Toplu tahmin hatası: {e}")
         traceback.print_exc()
         return jsonify({'error': f'İşlem sırasında beklenmeyen bir hata oluştu: {str(e)}'}), 500
 
-# --- Shelf Optimization Endpoint --- 
+# --- Raf Optimizasyonu Önbellekleri ---
+# Aynı dosya ve raf düzeniyle tekrarlanan istekler üç katmanlı önbellekten yanıtlanır:
+#   baskets:     dosya içeriği özeti + model (+ sürüm)     -> fiş kategori listeleri
+#   association: sepet özeti + birliktelik algoritması      -> birliktelik analizi sonucu
+#   assignment:  birliktelik anahtarı + raflar + ayarlar    -> raf ataması ve görselleştirme verisi
+# Her katman ayrı boyut sınırına sahip bir LRU önbellektir (0 katmanı kapatır).
+SHELF_CACHE_SIZES = {
+    'baskets': int(os.environ.get('SHELF_BASKET_CACHE_SIZE', 8)),
+    'association': int(os.environ.get('SHELF_ASSOCIATION_CACHE_SIZE', 32)),
+    'assignment': int(os.environ.get('SHELF_ASSIGNMENT_CACHE_SIZE', 128))
+}
+shelf_caches = {tier: PredictionCache(size) for tier, size in SHELF_CACHE_SIZES.items()}
+
+def upload_digest(file_storage, chunk_size=CSV_READ_CHUNK_SIZE):
+    """Yüklenen dosyanın SHA-256 özetini parça parça okuyarak hesaplar ve dosyayı başa sarar."""
+    digest = hashlib.sha256()
+    file_storage.seek(0)
+    for chunk in iter(lambda: file_storage.read(chunk_size), b''):
+        digest.update(chunk)
+    file_storage.seek(0)
+    return digest.hexdigest()
+
+def basket_digest(all_categories_by_receipt):
+    """Fiş kategori listelerinin sıradan bağımsız (fiş içi) SHA-256 özetini döndürür."""
+    digest = hashlib.sha256()
+    for categories in all_categories_by_receipt:
+        digest.update('\x1f'.join(sorted(categories)).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+def cabinets_digest(cabinets):
+    """Raf listesinin (isim, konum, boyut) kanonik JSON özetini döndürür."""
+    payload = json.dumps(cabinets, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ShelfCacheTrace:
+    """Bir isteğin hangi önbellek katmanlarından yanıtlandığını ve adım sürelerini kaydeder."""
+
+    def __init__(self):
+        self.tiers = {tier: 'skipped' for tier in shelf_caches}
+        self.timings_ms = {}
+        self._start = time.perf_counter()
+
+    def lookup(self, tier, key, compute):
+        """Katmanda anahtarı arar; yoksa compute() ile hesaplayıp önbelleğe ekler."""
+        start_time = time.perf_counter()
+        value = shelf_caches[tier].get(key)
+        if value is None:
+            value = compute()
+            shelf_caches[tier].put(key, value)
+            self.tiers[tier] = 'miss'
+        else:
+            self.tiers[tier] = 'hit'
+        seconds = time.perf_counter() - start_time
+        self.timings_ms[tier] = seconds * 1000
+        observe_stage(f"shelf.{tier}", seconds)
+        return value
+
+    def timed(self, step, function):
+        """Önbelleğe alınmayan bir adımı süresini kaydederek çalıştırır."""
+        start_time = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start_time
+        self.timings_ms[step] = seconds * 1000
+        observe_stage(f"shelf.{step}", seconds)
+        return result
+
+    def report(self):
+        timings = {step: round(value, 3) for step, value in self.timings_ms.items()}
+        timings['total'] = round((time.perf_counter() - self._start) * 1000, 3)
+        return {'tiers': dict(self.tiers), 'timings_ms': timings}
+
+def load_receipt_baskets(file_storage, model_choice, progress=None):
+    """CSV dosyasından fiş kategori listelerini ve sepet özetini üretir; dosya boşsa ValueError verir."""
+    all_receipts_items = open_receipts(file_storage)
+    if progress is not None:
+        all_receipts_items = track_progress(all_receipts_items, progress)
+    all_categories_by_receipt = collect_receipt_categories(all_receipts_items, model_choice)
+    # Yeterli veri yoksa, veriyi çoğalt
+    if len(all_categories_by_receipt) == 1:
+        all_categories_by_receipt.append(all_categories_by_receipt[0])
+    return all_categories_by_receipt, basket_digest(all_categories_by_receipt)
+
+# --- Raf Optimizasyonu ---
+def form_flag(form, name):
+    """Formdaki evet/hayır alanını okur."""
+    return form.get(name, '').lower() in ('1', 'true', 'yes')
+
+def parse_shelf_form(form):
+    """Raf optimizasyonu form alanlarını doğrular; geçersizse ValueError fırlatır."""
+    if 'model_choice' not in form: 
+        raise ValueError('Model seçimi belirtilmedi')
+        
+    model_choice = form['model_choice']
+    if model_choice not in models: 
+        raise ValueError(f'Geçersiz model seçimi: {model_choice}')
+        
+    if 'time_goal' not in form or form['time_goal'] not in ['maximize', 'minimize']: 
+        raise ValueError('Geçerli bir zaman hedefi belirtilmedi')
+    
+    association_engine = form.get('association_engine', DEFAULT_ASSOCIATION_ENGINE)
+    if association_engine not in ASSOCIATION_ENGINES: 
+        raise ValueError(f'Geçersiz birliktelik algoritması: {association_engine}')
+    
+    if 'cabinets' not in form: 
+        raise ValueError('Raf verileri bulunamadı')
+        
+    try:
+        cabinets = json.loads(form['cabinets'])
+        if not cabinets or not isinstance(cabinets, list): 
+            raise ValueError('Geçersiz raf verisi')
+    except Exception as e:
+        raise ValueError(f'Raf bilgisi geçersiz format: {str(e)}')
+    
+    shelf_solver = form.get('shelf_solver', DEFAULT_SHELF_SOLVER)
+    if shelf_solver not in SHELF_SOLVERS: 
+        raise ValueError(f'Geçersiz raf atama çözücüsü: {shelf_solver}')
+    
+    try:
+        time_budget = float(form.get('time_budget', DEFAULT_TIME_BUDGET))
+        if not 0 <= time_budget <= MAX_SHELF_TIME_BUDGET:
+            raise ValueError
+    except ValueError:
+        raise ValueError(f'time_budget 0 ile {MAX_SHELF_TIME_BUDGET:g} saniye arasında olmalıdır')
+    
+    distance_metric = form.get('distance_metric', DEFAULT_DISTANCE_METRIC)
+    if distance_metric not in DISTANCE_METRICS: 
+        raise ValueError(f'Geçersiz mesafe ölçüsü: {distance_metric}')
+    
+    return {
+        # Geçmiş modu: kurallar yüklenen CSV yerine artımlı depodan alınır
+        'use_history': form_flag(form, 'use_history'),
+        'model_choice': model_choice,
+        'time_goal': form['time_goal'],
+        'association_engine': association_engine,
+        'cabinets': cabinets,
+        'shelf_solver': shelf_solver,
+        'time_budget': time_budget,
+        'distance_metric': distance_metric,
+        # Tüm raf çiftleri arası mesafeler sadece istendiğinde yanıta eklenir (büyük yerleşimlerde MB'larca JSON)
+        'full_distances': form.get('all_shelf_distances', 'related') == 'full'
+    }
+
+@model_holder.pinned
+def shelf_optimization_result(file_storage, params, progress=None):
+    """Raf kategori önerilerini hesaplar; (yanıt sözlüğü, HTTP durum kodu) döndürür."""
+    trace = ShelfCacheTrace()
+    count('cabinets', len(params['cabinets']))
+    model_choice = params['model_choice']
+    association_engine = params['association_engine']
+    if params['use_history']:
+        # Kayan penceredeki sayılardan birliktelik kurallarını hesapla (depo kendi sonucunu saklar)
+        revision, association_results = trace.timed('association', association_store.analyze_with_revision)
+        association_key = ('history', revision)
+        total_transactions = association_results.get('total_transactions', 0)
+    else:
+        # Dosya içeriği özeti, aynı dosyanın tekrar yüklenmesinde tahminlerin atlanmasını sağlar
+        file_hash = trace.timed('upload_hash', lambda: upload_digest(file_storage))
+        model_version = get_model_version()
+        shelf_caches['baskets'].ensure_version(model_version)
+        try:
+            # CSV dosyasını akış halinde oku, tahminleri yap ve kategorileri topla
+            all_categories_by_receipt, basket_hash = trace.lookup(
+                'baskets', (file_hash, model_choice, model_version),
+                lambda: load_receipt_baskets(file_storage, model_choice, progress)
+            )
+        except ValueError as csv_err:
+            return {'error': f'CSV verileri işlenemedi: {str(csv_err)}'}, 400
+
+        # Verilerin geçerliliğini kontrol et
+        if not all_categories_by_receipt:
+            return {
+                'error': 'CSV dosyasında işlenebilir ürün bulunamadı. Geçerli ürün isimleri içeren bir CSV yükleyin.'
+            }, 400
+        
+        # Birliktelik analizi yap (min_support merdiveni sepetlerden belirlenir)
+        if progress is not None:
+            progress('association')
+        association_key = (basket_hash, association_engine)
+        association_results = trace.lookup(
+            'association', association_key,
+            lambda: perform_association_analysis(all_categories_by_receipt, association_engine)
+        )
+        total_transactions = len(all_categories_by_receipt)
+    
+    if 'message' in association_results:
+        return {
+            'error': f"Kategori ataması yapılamadı: {association_results['message']}"
+        }, 400
+    
+    # Kategorileri raflara ata
+    if progress is not None:
+        progress('assignment')
+    assignment_key = (association_key, cabinets_digest(params['cabinets']), params['time_goal'],
+                      params['shelf_solver'], params['time_budget'], params['distance_metric'],
+                      params['full_distances'])
+    shelf_category_assignments, unassigned_info, visualization_data = trace.lookup(
+        'assignment', assignment_key,
+        lambda: assign_categories_to_shelves(
+            params['cabinets'], association_results, params['time_goal'], params['shelf_solver'],
+            params['time_budget'], params['full_distances'], params['distance_metric']
+        )
+    )
+    
+    # Özet bilgileri hazırla
+    association_analysis_summary = {
+        'total_transactions': total_transactions,
+        'min_support_used': association_results.get('min_support_used', None),
+        'total_positive_rules_found': len(association_results.get('all_positive_rules', [])), 
+        'top_rules_for_display': association_results.get('rules_for_display', [])
+    }
+    
+    # Visualization data'yı logla (büyük yük; sadece debug seviyesinde serileştirilir)
+    if app.logger.isEnabledFor(logging.DEBUG):
+        app.logger.debug("Visualization data: %s", json.dumps(visualization_data, indent=2))
+    
+    result = {
+        'recommendations': shelf_category_assignments,
+        'unassigned_info': unassigned_info,
+        'association_analysis_summary': association_analysis_summary,
+        'visualization_data': visualization_data,
+        'cache': trace.report()
+    }
+    if not params['use_history']:
+        # Geçmiş modunda sepetler önceki isteklerde (farklı sürümlerle) tahmin edilmiş olabilir
+        result['model_version'] = model_version
+    return with_timings(result), 200
+
 @app.route('/shelf_optimization', methods=['POST'])
 def shelf_optimization():
     """Raf kategori önerileri endpoint'i."""
     # İstek doğrulama
+    file = None
+    if not form_flag(request.form, 'use_history'):
+        if 'csv_file' not in request.files: 
+            return jsonify({'error': 'CSV dosyası eksik'}), 400
+            
+        file = request.files['csv_file']
+        if file.filename == '': 
+            return jsonify({'error': 'CSV dosyası seçilmedi'}), 400
+    
+    try:
+        params = parse_shelf_form(request.form)
+    except ValueError as form_error:
+        return jsonify({'error': str(form_error)}), 400
+
+    try:
+        result, status = shelf_optimization_result(file, params)
+        return jsonify(result), status
+        
+    except Exception as e:
+        app.logger.error(f"Shelf optimization hatası: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': f'Beklenmeyen bir hata oluştu: {str(e)}'}), 500
+
+# --- Birliktelik Geçmişi Endpoint'leri ---
+@app.route('/association_history', methods=['POST'])
+@model_holder.pinned
+def add_association_history():
+    """Bir günün sipariş dosyasını artımlı birliktelik deposuna ekler."""
+    # İstek doğrulama
     if 'csv_file' not in request.files: 
         return jsonify({'error': 'CSV dosyası eksik'}), 400
-        
+    
     file = request.files['csv_file']
     if file.filename == '': 
         return jsonify({'error': 'CSV dosyası seçilmedi'}), 400
-        
-    if 'model_choice' not in request.form: 
-        return jsonify({'error': 'Model seçimi belirtilmedi'}), 400
-        
-    model_choice = request.form['model_choice']
+    
+    model_choice = request.form.get('model_choice')
     if model_choice not in models: 
         return jsonify({'error': f'Geçersiz model seçimi: {model_choice}'}), 400
-        
-    if 'time_goal' not in request.form or request.form['time_goal'] not in ['maximize', 'minimize']: 
-        return jsonify({'error': 'Geçerli bir zaman hedefi belirtilmedi'}), 400
-        
-    time_goal = request.form['time_goal']
     
-    if 'cabinets' not in request.form: 
-        return jsonify({'error': 'Raf verileri bulunamadı'}), 400
-        
     try:
-        cabinets = json.loads(request.form['cabinets'])
-        if not cabinets or not isinstance(cabinets, list): 
-            raise ValueError('Geçersiz raf verisi')
-    except Exception as e:
-        return jsonify({'error': f'Raf bilgisi geçersiz format: {str(e)}'}), 400
+        day = datetime.date.fromisoformat(request.form['date']) if request.form.get('date') else None
+    except ValueError:
+        return jsonify({'error': 'Tarih YYYY-AA-GG biçiminde olmalıdır'}), 400
 
     try:
-        # CSV dosyasını oku
         try:
-            all_receipts_items = read_csv_robust(file)
+            all_receipts_items = open_receipts(file)
         except Exception as csv_err:
             return jsonify({'error': f'CSV verileri işlenemedi: {str(csv_err)}'}), 400
-
-        # Tahminleri yap ve kategorileri topla
-        all_categories_by_receipt = []
         
-        for row_items in all_receipts_items:
-            products_in_receipt = [str(item).strip() for item in row_items if str(item).strip()]
-            
-            if not products_in_receipt:
-                continue
-                
-            try:
-                # Tahmin yap
-                predictions_categories = predict_product_categories(products_in_receipt, model_choice)
-                
-                # Kategorileri kaydet
-                receipt_categories = set(predictions_categories)
-                if receipt_categories:
-                    all_categories_by_receipt.append(list(receipt_categories))
-                    
-            except Exception as e:
-                app.logger.error(f"Tahmin hatası: {e}")
-                continue
+        all_categories_by_receipt = collect_receipt_categories(all_receipts_items, model_choice)
+        return jsonify(association_store.add_receipts(all_categories_by_receipt, day))
+    
+    except Exception as e:
+        app.logger.error(f"Birliktelik geçmişi güncelleme hatası: {e}")
+        traceback.print_exc()
+        return jsonify({'error': f'Beklenmeyen bir hata oluştu: {str(e)}'}), 500
 
-        # Verilerin geçerliliğini kontrol et
-        if not all_categories_by_receipt:
-            return jsonify({
-                'error': 'CSV dosyasında işlenebilir ürün bulunamadı. Geçerli ürün isimleri içeren bir CSV yükleyin.'
-            }), 400
-            
-        # Yeterli veri yoksa, veriyi çoğalt
-        if len(all_categories_by_receipt) < 2:
-            all_categories_by_receipt.append(all_categories_by_receipt[0])
-        
-        # Birliktelik analizi yap
-        association_results = perform_association_analysis(all_categories_by_receipt)
-        
-        if 'message' in association_results:
-            return jsonify({
-                'error': f"Kategori ataması yapılamadı: {association_results['message']}"
-            }), 400
-        
-        # Kategorileri raflara ata
-        shelf_category_assignments, unassigned_info, visualization_data = assign_categories_to_shelves(
-            cabinets, association_results, time_goal
-        )
-        
-        # Özet bilgileri hazırla
-        association_analysis_summary = {
-            'total_transactions': len(all_categories_by_receipt),
-            'min_support_used': association_results.get('min_support_used', None),
-            'total_positive_rules_found': len(association_results.get('all_positive_rules', [])), 
-            'top_rules_for_display': association_results.get('rules_for_display', [])
-        }
-        
-        # Visualization data'yı logla
-        app.logger.info(f"Visualization data: {json.dumps(visualization_data, indent=2)}")
-        
-        # Sonuçları döndür
+@app.route('/association_history', methods=['GET'])
+def association_history():
+    """Kayan penceredeki sayılardan hesaplanan birliktelik analizini döndürür."""
+    try:
+        association_store.expire()
         return jsonify({
-            'recommendations': shelf_category_assignments,
-            'unassigned_info': unassigned_info,
-            'association_analysis_summary': association_analysis_summary,
-            'visualization_data': visualization_data
+            'association_analysis': association_store.analyze(),
+            'history': association_store.summary()
         })
-        
     except Exception as e:
-        app.logger.error(f"Shelf optimization hatası: {str(e)}")
+        app.logger.error(f"Birliktelik geçmişi okuma hatası: {e}")
         traceback.print_exc()
         return jsonify({'error': f'Beklenmeyen bir hata oluştu: {str(e)}'}), 500
 
+# --- Arka Plan İşleri ---
+# Uzun süren toplu tahmin ve raf optimizasyonu istekleri süreç havuzunda iş olarak çalıştırılır
+JOBS_DIR = os.environ.get('JOBS_DIR', os.path.join(PROJECT_ROOT, 'jobs'))
+
+def init_job_worker():
+    """İş süreci başlarken güncel model kümesinin artefaktlarını (mmap ile) yükler."""
+    for registry in model_holder.current().registries.values():
+        registry.preload()
+
+job_queue = JobQueue(
+    JOBS_DIR,
+    max_workers=int(os.environ.get('JOB_WORKERS', 0)) or None,
+    max_pending=int(os.environ.get('JOB_MAX_PENDING', DEFAULT_MAX_PENDING)),
+    initializer=init_job_worker
+)
+# Kuyruk dolu olduğunda istemciye önerilen bekleme süresi (saniye)
+JOB_RETRY_AFTER_SECONDS = 5
+# İş olaylarını (SSE) yayınlarken durumun kontrol edilme aralığı (saniye)
+JOB_EVENT_POLL_INTERVAL = 0.5
+
+def job_progress(context, file=None):
+    """İş aşamasını ve (tahmin aşamasında) okunan dosya oranını context'e yazan fonksiyon döndürür."""
+    total_size = max(os.fstat(file.fileno()).st_size, 1) if file is not None else 1
+    # Tahmin aşaması işin büyük kısmıdır; kalan aşamalar sabit ilerleme noktalarıyla raporlanır
+    stage_progress = {'association': 0.9, 'assignment': 0.95}
+
+    def progress(stage):
+        if stage == 'predicting' and file is not None:
+            context.report(0.9 * min(file.tell() / total_size, 1.0), stage)
+        else:
+            context.report(stage_progress.get(stage), stage)
+    return progress
+
+def run_job_result(compute, context, input_path, params, needs_input=True):
+    """compute(dosya, params, progress) sonucunu döndürür; hata yanıtlarında ValueError fırlatır."""
+    context.report(0.0, 'predicting' if needs_input else 'association')
+    if needs_input:
+        with open(input_path, 'rb') as file:
+            result, status = compute(file, params, job_progress(context, file))
+    else:
+        result, status = compute(None, params, job_progress(context))
+    if status != 200:
+        raise ValueError(result['error'])
+    return result
+
+def run_bulk_prediction_job(context, input_path, params):
+    """İş kuyruğunda toplu tahmin ve birliktelik analizi yapar."""
+    return run_job_result(bulk_prediction_result, context, input_path, params)
+
+def run_shelf_optimization_job(context, input_path, params):
+    """İş kuyruğunda raf kategori önerilerini hesaplar."""
+    return run_job_result(shelf_optimization_result, context, input_path, params,
+                          needs_input=not params['use_history'])
+
+job_queue.register('predict_bulk', run_bulk_prediction_job)
+job_queue.register('shelf_optimization', run_shelf_optimization_job)
+
+def job_response(job):
+    """İş kaydına durum ve sonuç adreslerini ekler."""
+    job = dict(job, status_url=url_for('job_status', job_id=job['id']))
+    if job['status'] == 'succeeded':
+        job['result_url'] = url_for('job_result', job_id=job['id'])
+    return job
+
+def submit_job(kind, params, file_storage=None):
+    """İşi kuyruğa ekler; kuyruk doluysa 429 döndürür."""
+    try:
+        job_id = job_queue.submit(kind, params, save_input=file_storage.save if file_storage is not None else None)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': str(JOB_RETRY_AFTER_SECONDS)}
+    return jsonify(job_response(job_queue.get(job_id))), 202
+
+@app.route('/jobs/predict_bulk', methods=['POST'])
+def submit_bulk_prediction_job():
+    """Toplu tahmini arka plan işi olarak başlatır; /predict_bulk ile aynı form alanlarını alır."""
+    if 'csv_file' not in request.files: 
+        return jsonify({'error': 'CSV dosyası eksik'}), 400
+    
+    file = request.files['csv_file']
+    if file.filename == '' or not file.filename.endswith('.csv'): 
+        return jsonify({'error': 'Geçerli bir CSV dosyası seçilmedi'}), 400
+    
+    try:
+        params = parse_bulk_form(request.form)
+    except ValueError as form_error:
+        return jsonify({'error': str(form_error)}), 400
+    return submit_job('predict_bulk', params, file)
+
+@app.route('/jobs/shelf_optimization', methods=['POST'])
+def submit_shelf_optimization_job():
+    """Raf optimizasyonunu arka plan işi olarak başlatır; /shelf_optimization ile aynı form alanlarını alır."""
+    file = None
+    if not form_flag(request.form, 'use_history'):
+        if 'csv_file' not in request.files: 
+            return jsonify({'error': 'CSV dosyası eksik'}), 400
+            
+        file = request.files['csv_file']
+        if file.filename == '': 
+            return jsonify({'error': 'CSV dosyası seçilmedi'}), 400
+    
+    try:
+        params = parse_shelf_form(request.form)
+    except ValueError as form_error:
+        return jsonify({'error': str(form_error)}), 400
+    return submit_job('shelf_optimization', params, file)
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Son işleri ve kuyruk istatistiklerini döndürür."""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({
+        'jobs': [job_response(job) for job in job_queue.list(limit)],
+        'queue': job_queue.stats()
+    })
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """İşin durumunu, ilerlemesini ve aşamasını döndürür."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f'İş bulunamadı: {job_id}'}), 404
+    return jsonify(job_response(job))
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """İşi iptal eder; çalışan iş bir sonraki ilerleme raporunda durur."""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'error': f'İş bulunamadı: {job_id}'}), 404
+    return jsonify(job_response(job))
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Tamamlanan işin JSON sonucunu döndürür (?download=1 ile dosya olarak)."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f'İş bulunamadı: {job_id}'}), 404
+    if job['status'] != 'succeeded':
+        return jsonify({'error': f"İş sonucu hazır değil (durum: {job['status']})", 'job': job_response(job)}), 409
+    return send_file(job_queue.result_path(job_id), mimetype='application/json',
+                     as_attachment=form_flag(request.args, 'download'),
+                     download_name=f"{job['kind']}_{job_id}.json")
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """İş durumu değiştikçe Server-Sent Events olarak yayınlar; iş bitince akış kapanır."""
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': f'İş bulunamadı: {job_id}'}), 404
+
+    def generate():
+        last_event = None
+        while True:
+            job = job_queue.get(job_id)
+            if job is None:
+                return
+            event = json.dumps(job_response(job), ensure_ascii=False)
+            if event != last_event:
+                last_event = event
+                yield f"data: {event}\n\n"
+            if job['status'] in FINAL_STATUSES:
+                return
+            time.sleep(JOB_EVENT_POLL_INTERVAL)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
 # --- Uygulamayı Çalıştır ---
 if __name__ == '__main__':
     print("Market Kategori Tahmini ve Raf Optimizasyon Uygulaması Başlatılıyor...")